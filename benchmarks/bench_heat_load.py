@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+"""Benchmarks of the heat load hot paths.
+
+Times every registered path over input sizes from 1 up to ``--max-size``
+(powers of ten), with the peak memory traced by ``tracemalloc``, and prints
+the results as JSON. With ``--compare`` a previous run is loaded and the
+command exits with status 1 when any case got slower than ``--tolerance``.
+
+Example::
+
+    $ python benchmarks/bench_heat_load.py --max-size 1e6 -o bench.json
+    $ python benchmarks/bench_heat_load.py --compare bench.json
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import labwelfare
+from labwelfare import approx, batch, heat_load, parallel
+
+CASES = {}
+
+
+def case(name, scalar=False):
+    """Register a benchmark case.
+
+    The decorated function receives the inputs of a size and returns the
+    callable to time. ``scalar`` cases loop in Python once per element.
+    """
+    def register(setup):
+        CASES[name] = (setup, scalar)
+        return setup
+    return register
+
+
+RANGES = {
+    'bg_temp': (15, 45),
+    'air_temp': (10, 40),
+    'solar_rad': (0, 1000),
+    'rel_hum': (10, 100),
+    'wind_speed': (0, 20),
+}
+
+
+class Readings(dict):
+    """Random readings of a size, each column generated on first use.
+
+    Columns a case does not touch are never allocated, which matters at
+    1e8 elements.
+    """
+
+    def __init__(self, size, seed=804):
+        super(Readings, self).__init__()
+        self.size = size
+        self.seed = seed
+
+    def __missing__(self, name):
+        low, high = RANGES[name]
+        rng = np.random.RandomState(self.seed + sorted(RANGES).index(name))
+        self[name] = rng.uniform(low, high, self.size)
+        return self[name]
+
+
+@case('scalar.hli_bg', scalar=True)
+def scalar_hli_bg(data):
+    rows = list(zip(data['bg_temp'].tolist(), data['rel_hum'].tolist(),
+                    data['wind_speed'].tolist()))
+    return lambda: [heat_load.hli_bg(*row) for row in rows]
+
+
+@case('scalar.hli_no_bg', scalar=True)
+def scalar_hli_no_bg(data):
+    rows = list(zip(data['air_temp'].tolist(), data['rel_hum'].tolist(),
+                    data['solar_rad'].tolist(), data['wind_speed'].tolist()))
+    return lambda: [heat_load.hli_no_bg(*row) for row in rows]
+
+
+@case('scalar.hli_indicator', scalar=True)
+def scalar_hli_indicator(data):
+    values = (data['bg_temp'] * 3).tolist()
+    return lambda: [heat_load.hli_indicator(v) for v in values]
+
+
+@case('scalar.hli', scalar=True)
+def scalar_hli(data):
+    rows = [{'bg_temp': bg, 'rel_hum': rh, 'wind_speed': ws}
+            for bg, rh, ws in zip(data['bg_temp'].tolist(),
+                                  data['rel_hum'].tolist(),
+                                  data['wind_speed'].tolist())]
+    return lambda: [heat_load.hli(True, **row) for row in rows]
+
+
+@case('scalar.hli_bg_fast', scalar=True)
+def scalar_hli_bg_fast(data):
+    rows = list(zip(data['bg_temp'].tolist(), data['rel_hum'].tolist(),
+                    data['wind_speed'].tolist()))
+    return lambda: [heat_load.hli_bg_fast(*row) for row in rows]
+
+
+@case('scalar.hli_fast', scalar=True)
+def scalar_hli_fast(data):
+    rows = list(zip(data['rel_hum'].tolist(), data['wind_speed'].tolist(),
+                    data['bg_temp'].tolist()))
+    return lambda: [heat_load.hli_fast(*row) for row in rows]
+
+
+@case('approx.hli_bg_array')
+def approx_hli_bg_array(data):
+    table = approx.default()
+    return lambda: table.hli_bg_array(data['bg_temp'], data['rel_hum'],
+                                      data['wind_speed'])
+
+
+@case('batch.hli_bg')
+def batch_hli_bg(data):
+    return lambda: batch.hli_bg(data['bg_temp'], data['rel_hum'],
+                                data['wind_speed'])
+
+
+@case('batch.hli_no_bg')
+def batch_hli_no_bg(data):
+    return lambda: batch.hli_no_bg(data['air_temp'], data['rel_hum'],
+                                   data['solar_rad'], data['wind_speed'])
+
+
+@case('batch.hli_indicator')
+def batch_hli_indicator(data):
+    values = data['bg_temp'] * 3
+    return lambda: batch.hli_indicator(values)
+
+
+@case('batch.hli')
+def batch_hli(data):
+    return lambda: batch.hli(True, bg_temp=data['bg_temp'],
+                             rel_hum=data['rel_hum'],
+                             wind_speed=data['wind_speed'])
+
+
+@case('parallel.hli')
+def parallel_hli(data):
+    return lambda: parallel.hli(True, bg_temp=data['bg_temp'],
+                                rel_hum=data['rel_hum'],
+                                wind_speed=data['wind_speed'])
+
+
+def measure(fn, size, repeat):
+    """Best wall time of ``repeat`` runs and the traced memory peak."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'size': size,
+        'seconds': best,
+        'ns_per_element': best / size * 1e9,
+        'elements_per_second': size / best if best else float('inf'),
+        'peak_bytes': peak,
+    }
+
+
+def run(names, max_size, max_scalar_size, repeat):
+    results = []
+    sizes = [10 ** e for e in range(int(np.log10(max_size)) + 1)]
+    for name in names:
+        setup, scalar = CASES[name]
+        for size in sizes:
+            if scalar and size > max_scalar_size:
+                break
+            fn = setup(Readings(size))
+            result = measure(fn, size, repeat if size < 10 ** 6 else 1)
+            result['case'] = name
+            results.append(result)
+            print('{:<24} {:>10} {:>12.1f} ns/element'.format(
+                name, size, result['ns_per_element']), file=sys.stderr)
+    return results
+
+
+def regressions(results, baseline, tolerance):
+    """Cases slower than the baseline by more than ``tolerance``."""
+    before = {(r['case'], r['size']): r['ns_per_element']
+              for r in baseline['results']}
+    slower = []
+    for result in results:
+        key = (result['case'], result['size'])
+        if key in before and \
+                result['ns_per_element'] > before[key] * (1 + tolerance):
+            slower.append({'case': key[0], 'size': key[1],
+                           'before': before[key],
+                           'after': result['ns_per_element']})
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('cases', nargs='*', default=sorted(CASES),
+                        help='cases to run, all by default')
+    parser.add_argument('--max-size', type=float, default=1e6,
+                        help='largest input size, up to 1e8')
+    parser.add_argument('--max-scalar-size', type=float, default=1e5,
+                        help='largest input size of the scalar loops')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('-o', '--output', help='write JSON to this file')
+    parser.add_argument('--compare', help='JSON of a previous run')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown against --compare')
+    args = parser.parse_args(argv)
+
+    unknown = set(args.cases) - set(CASES)
+    if unknown:
+        parser.error('unknown cases: {}'.format(', '.join(sorted(unknown))))
+
+    report = {
+        'labwelfare': labwelfare.__version__,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'results': run(args.cases, args.max_size, args.max_scalar_size,
+                       args.repeat),
+    }
+    status = 0
+    if args.compare:
+        with open(args.compare) as handle:
+            report['regressions'] = regressions(
+                report['results'], json.load(handle), args.tolerance)
+        status = 1 if report['regressions'] else 0
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(text + '\n')
+    else:
+        print(text)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
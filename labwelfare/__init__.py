@@ -2,11 +2,38 @@ __author__ = 'Murilo Ijanc, João Trevizoli'
 __email__ = 'mbsd@m0x.ru'
 __version__ = '0.0.1'
 
+import importlib
+
 from .heat_load import (
+    HLIResult,
     Indicator,
     hli,
     hli_bg,
+    hli_bg_fast,
+    hli_fast,
     hli_indicator,  # noqa: F401
-    hli_no_bg)
+    hli_indicator_fast,
+    hli_no_bg,
+    hli_no_bg_fast)
+
+__all__ = ['hli', 'hli_bg', 'hli_indicator', 'hli_no_bg', 'Indicator',
+           'HLIResult', 'hli_fast', 'hli_bg_fast', 'hli_indicator_fast',
+           'hli_no_bg_fast']
+
+# submodules imported on first attribute access, so ``import labwelfare``
+# loads only the scalar core and not NumPy or the I/O dependencies.
+_SUBMODULES = ('ahl', 'alerts', 'approx', 'batch', 'cache', 'columnar',
+               'forecast', 'heat_load', 'incremental', 'inverse', 'io',
+               'metrics', 'parallel', 'records', 'registry', 'reports',
+               'resample', 'serve', 'shared')
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError(
+        'module {!r} has no attribute {!r}'.format(__name__, name))
+
 
-__all__ = ['hli', 'hli_bg', 'hli_indicator', 'hli_no_bg', 'Indicator']
+def __dir__():
+    return sorted(set(globals()) | set(_SUBMODULES))
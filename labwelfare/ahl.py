@@ -0,0 +1,172 @@
+#
+# Copyright (c) Murilo Ijanc' <mbsd@m0x.ru>
+#
+# Permission to use, copy, modify, and distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+"""Module that accumulates heat load.
+
+Gaughan et al. (2008) define the Accumulated Heat Load (AHL) from hourly
+heat load index values: every hour above the upper threshold adds the
+excess to the load, every hour below the lower threshold dissipates the
+deficit, and hours in between leave it unchanged. The load never drops
+below zero.
+"""
+import logging
+
+import numpy as np
+
+from .heat_load import DEFAULT_THRESHOLD
+
+LOGGER = logging.getLogger(__name__)
+DEFAULT_LOWER_THRESHOLD = 77
+
+
+def _hli_values(hli):
+    """Heat load index values of a ``hli()`` result or an array of them."""
+    if isinstance(hli, tuple):
+        hli = hli[0]
+    return np.asarray(hli, dtype=np.float64)
+
+
+def ahl_delta(hli, upper=DEFAULT_THRESHOLD, lower=DEFAULT_LOWER_THRESHOLD,
+              hours=1.0):
+    """Change of the accumulated heat load over a reading.
+
+    Missing readings (NaN) leave the load unchanged.
+
+    Args:
+        hli (array_like): heat load index values.
+        upper (array_like): upper threshold, e.g. per genotype.
+        lower (array_like): lower threshold.
+        hours (array_like): hours covered by each reading.
+
+    Returns:
+        numpy.ndarray: load gained (positive) or dissipated (negative).
+    """
+    hli = _hli_values(hli)
+    delta = np.where(hli > upper, hli - upper,
+                     np.where(hli < lower, hli - lower, 0.0))
+    return delta * hours
+
+
+def ahl_series(hli, upper=DEFAULT_THRESHOLD, lower=DEFAULT_LOWER_THRESHOLD,
+               hours=1.0, initial=0.0, axis=0):
+    """Running accumulated heat load of a whole series.
+
+    The clamped recurrence ``ahl = max(0, ahl + delta)`` is evaluated
+    without a Python loop as ``S - min(-initial, cummin(S))`` where ``S``
+    is the cumulative sum of the deltas along ``axis``.
+
+    Args:
+        hli (array_like): heat load index values, time along ``axis``.
+        upper (array_like): upper threshold, broadcast against ``hli``.
+        lower (array_like): lower threshold, broadcast against ``hli``.
+        hours (array_like): hours covered by each reading.
+        initial (array_like): load before the first reading, shaped like
+                              ``hli`` without ``axis``.
+        axis (int): time axis.
+
+    Returns:
+        numpy.ndarray: accumulated heat load after each reading.
+    """
+    delta = ahl_delta(hli, upper, lower, hours)
+    total = np.cumsum(delta, axis=axis)
+    floor = np.minimum.accumulate(total, axis=axis)
+    initial = -np.asarray(initial, dtype=np.float64)
+    if initial.ndim:
+        initial = np.expand_dims(initial, axis)
+    return total - np.minimum(initial, floor)
+
+
+class AHLAccumulator(object):
+    """Streaming accumulated heat load.
+
+    Holds only the current load, one value per pen, so each new reading
+    costs O(1) per pen regardless of the length of the history. With
+    arrays the state is a NumPy array and a single :meth:`update` advances
+    every pen.
+
+    Args:
+        upper (array_like): upper threshold, scalar or one per pen.
+        lower (array_like): lower threshold, scalar or one per pen.
+        initial (array_like): starting load, scalar or one per pen.
+    """
+
+    def __init__(self, upper=DEFAULT_THRESHOLD,
+                 lower=DEFAULT_LOWER_THRESHOLD, initial=0.0):
+        self.upper = np.asarray(upper, dtype=np.float64)
+        self.lower = np.asarray(lower, dtype=np.float64)
+        self._initial = np.asarray(initial, dtype=np.float64)
+        self.reset()
+
+    def reset(self):
+        """Restore the starting load."""
+        self._ahl = self._initial.copy()
+
+    @property
+    def ahl(self):
+        """numpy.ndarray: current accumulated heat load."""
+        return self._ahl
+
+    def _advance(self, new):
+        # a scalar state takes the shape of the first batch of pens.
+        if self._ahl.ndim and new.shape != self._ahl.shape:
+            LOGGER.error('Expected readings for %s pens, got %s',
+                         self._ahl.shape, new.shape)
+            raise ValueError('Expected readings for {} pens, got {}'
+                             .format(self._ahl.shape, new.shape))
+        self._ahl = new
+        return self._ahl[()] if self._ahl.ndim == 0 else self._ahl
+
+    def update(self, hli, hours=1.0):
+        """Advance the load by one reading per pen.
+
+        Args:
+            hli (array_like): heat load index, a ``hli()`` result or an
+                              array with one value per pen.
+            hours (array_like): hours covered by the reading.
+
+        Returns:
+            numpy.ndarray: running accumulated heat load.
+        """
+        delta = ahl_delta(hli, self.upper, self.lower, hours)
+        return self._advance(np.maximum(self._ahl + delta, 0.0))
+
+    def extend(self, hli, hours=1.0):
+        """Advance the load by a block of readings, time along axis 0.
+
+        Args:
+            hli (array_like): heat load index values, shape
+                              ``(readings,) + pens``.
+            hours (array_like): hours covered by each reading.
+
+        Returns:
+            numpy.ndarray: accumulated heat load after each reading.
+        """
+        series = ahl_series(hli, self.upper, self.lower, hours, self._ahl)
+        if len(series):
+            self._advance(series[-1].copy())
+        return series
+
+    def ingest(self, readings, hours=1.0):
+        """Advance the load over a stream of readings.
+
+        Args:
+            readings (iterable): ``hli()`` results or per-pen arrays.
+            hours (array_like): hours covered by each reading.
+
+        Yields:
+            numpy.ndarray: running accumulated heat load.
+        """
+        for reading in readings:
+            yield self.update(reading, hours)
@@ -0,0 +1,130 @@
+#
+# Copyright (c) Murilo Ijanc' <mbsd@m0x.ru>
+#
+# Permission to use, copy, modify, and distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+"""Module that raises heat load alerts.
+
+A pen is in alert while its indicator is HIGH or EXTREME. The engine keeps
+the alert level of every pen in arrays and reports only the pens whose
+level changed, so a tick over any number of pens is a handful of vectorized
+comparisons.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from . import batch
+from .heat_load import DEFAULT_THRESHOLD, Indicator
+
+# alert level of a pen below HIGH.
+NO_ALERT = 0
+
+AlertEvents = namedtuple('AlertEvents', 'pen previous current')
+AlertEvents.__doc__ = """Alert level changes of a tick.
+
+Attributes:
+    pen (numpy.ndarray): indices of the pens that changed.
+    previous (numpy.ndarray): uint8 level before, ``NO_ALERT`` or an
+                              ``Indicator`` value.
+    current (numpy.ndarray): uint8 level after.
+"""
+
+
+def alert_level(hli, threshold=DEFAULT_THRESHOLD):
+    """Alert level of heat load index values.
+
+    Args:
+        hli (array_like): heat load index values, negative ones of cold
+                          readings included.
+        threshold (array_like): threshold value or values.
+
+    Returns:
+        numpy.ndarray: uint8 ``Indicator`` value for HIGH and EXTREME,
+        ``NO_ALERT`` otherwise.
+    """
+    ind = np.asarray(batch.hli_indicator(hli, threshold))
+    return np.where(ind >= Indicator.HIGH.value, ind,
+                    NO_ALERT).astype(np.uint8)
+
+
+class AlertEngine(object):
+    """Incremental HIGH/EXTREME alerts with hysteresis and dwell time.
+
+    A pen moves up a level as soon as its heat load index reaches it, and
+    down only once the index is ``hysteresis`` below the lower bound of its
+    current level. Either change must then hold for ``min_dwell`` (in the
+    units of ``now`` given to :meth:`update`, ticks by default) before it
+    is reported.
+
+    Args:
+        pens (int): number of pens.
+        threshold (array_like): threshold value, scalar or one per pen.
+        hysteresis (float): heat load index margin to leave a level.
+        min_dwell (float): time a new level must hold to be reported.
+    """
+
+    def __init__(self, pens, threshold=DEFAULT_THRESHOLD, hysteresis=2.0,
+                 min_dwell=0):
+        self.threshold = np.broadcast_to(
+            np.asarray(threshold, dtype=np.float64), (pens,))
+        self.hysteresis = hysteresis
+        self.min_dwell = min_dwell
+        self.level = np.full(pens, NO_ALERT, dtype=np.uint8)
+        self.candidate = self.level.copy()
+        self.since = np.zeros(pens, dtype=np.float64)
+        self.ticks = 0
+
+    def update(self, hli, now=None):
+        """Evaluate a tick of readings.
+
+        Args:
+            hli (array_like): heat load index, one value per pen; NaN keeps
+                              the pen unchanged.
+            now (float): time of the tick, the tick count when None.
+
+        Returns:
+            AlertEvents: pens whose alert level changed.
+        """
+        self.ticks += 1
+        now = self.ticks if now is None else now
+        hli = np.broadcast_to(np.asarray(hli, dtype=np.float64),
+                              self.level.shape)
+        missing = np.isnan(hli)
+        hli = np.where(missing, 0.0, hli)
+
+        raised = alert_level(hli, self.threshold)
+        # the level the reading would have ``hysteresis`` higher, so a pen
+        # only drops once the index is that far below its level.
+        held = alert_level(hli + self.hysteresis, self.threshold)
+        target = np.maximum(raised, np.minimum(self.level, held))
+        target[missing] = self.level[missing]
+
+        moved = target != self.candidate
+        self.candidate[moved] = target[moved]
+        self.since[moved] = now
+        commit = (target != self.level) & \
+            (now - self.since >= self.min_dwell)
+
+        pen = np.flatnonzero(commit)
+        events = AlertEvents(pen, self.level[pen], target[pen])
+        self.level[pen] = target[pen]
+        return events
+
+    def active(self):
+        """Indices of the pens in alert.
+
+        Returns:
+            numpy.ndarray: pen indices.
+        """
+        return np.flatnonzero(self.level != NO_ALERT)
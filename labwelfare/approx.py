@@ -0,0 +1,122 @@
+#
+# Copyright (c) Murilo Ijanc' <mbsd@m0x.ru>
+#
+# Permission to use, copy, modify, and distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+"""Module that approximates heat load index with lookup tables.
+
+The two exponentials of :func:`labwelfare.heat_load.hli_bg`, the sigmoid
+``frac_high`` of the black globe temperature and the ``exp(2.4 -
+wind_speed)`` term, are replaced by separable tables with linear
+interpolation over NumPy arrays; the rest of the formula is exact.
+
+Within ``bg_temp`` in ``BG_TEMP_RANGE``, ``rel_hum`` in [0, 100] and
+``wind_speed`` in ``WIND_SPEED_RANGE``, the default tables stay within
+``MAX_ABS_ERROR`` of the exact index. The bound follows from the linear
+interpolation error ``h**2 * max|f''| / 8`` of each table: 5.9e-6 for the
+sigmoid times at most 53 for the spread of the two blended indices, plus
+1.4e-4 for the wind term. Outside the ranges the tables clamp to their
+end values, where both terms are flat.
+
+The tables are not a speedup where NumPy vectorizes ``exp``. On x86-64
+with AVX-512, ``exp`` costs about as much as a multiply-add pass. There the
+``approx.hli_bg_array`` case of ``benchmarks/bench_heat_load.py`` measured
+74 to 155 ns per element for 1e4 to 1e6 readings, against 22 to 105 for
+``batch.hli_bg``. The tables can only pay off on builds whose ``exp`` is a
+scalar libm loop, so time both cases on the target before using them.
+Scalar lookups in pure Python run more bytecode than
+:func:`labwelfare.heat_load.hli_bg_fast` and are not provided.
+"""
+import numpy as np
+
+from . import batch
+
+BG_TEMP_RANGE = (-10.0, 60.0)
+WIND_SPEED_RANGE = (0.0, 60.0)
+BG_TEMP_STEP = 0.05
+WIND_SPEED_STEP = 0.01
+MAX_ABS_ERROR = 5e-4
+
+
+class _Table(object):
+    """Linear interpolation of ``fn`` on a regular grid."""
+
+    def __init__(self, fn, start, stop, step):
+        size = int(round((stop - start) / step)) + 1
+        self.start = start
+        self.stop = start + (size - 1) * step
+        self.step = step
+        self.scale = 1.0 / step
+        self.last = size - 1
+        self.values = fn(start + step * np.arange(size))
+        # a zero slope past the end, so the last node needs no special case.
+        self.slopes = np.append(np.diff(self.values), 0.0)
+
+    def array(self, x):
+        # the node index is computed, not searched for as in numpy.interp.
+        pos = (np.asarray(x, dtype=np.float64) - self.start) * self.scale
+        # fmax and fmin drop NaN, the clipped position keeps it.
+        i = np.fmin(np.fmax(pos, 0), self.last).astype(np.intp)
+        return self.values[i] + self.slopes[i] * (np.clip(pos, 0,
+                                                          self.last) - i)
+
+
+class HLIApprox(object):
+    """Heat load index from lookup tables.
+
+    Args:
+        bg_range (tuple): black globe temperature range of the sigmoid
+                          table (°C).
+        wind_range (tuple): wind speed range of the wind table (km/h).
+        bg_step (float): sigmoid table step (°C).
+        wind_step (float): wind table step (km/h).
+    """
+
+    def __init__(self, bg_range=BG_TEMP_RANGE, wind_range=WIND_SPEED_RANGE,
+                 bg_step=BG_TEMP_STEP, wind_step=WIND_SPEED_STEP):
+        self.frac_high = _Table(batch.high_weight, bg_range[0], bg_range[1],
+                                bg_step)
+        self.wind_term = _Table(batch.wind_term, wind_range[0],
+                                wind_range[1], wind_step)
+
+    def hli_bg_array(self, bg_temp, rel_hum, wind_speed):
+        """Approximate heat load index over NumPy arrays.
+
+        Args:
+            bg_temp (array_like): black globe temperature (°C).
+            rel_hum (array_like): relative humidity (%).
+            wind_speed (array_like): wind speed (km/h).
+
+        Returns:
+            numpy.ndarray: heat load index values.
+        """
+        bg_temp = np.asarray(bg_temp, dtype=np.float64)
+        rel_hum = np.asarray(rel_hum, dtype=np.float64)
+        wind_speed = np.asarray(wind_speed, dtype=np.float64)
+        return batch.hli_branches(self.frac_high.array(bg_temp),
+                                  self.wind_term.array(wind_speed), bg_temp,
+                                  rel_hum, wind_speed)[2]
+
+
+_DEFAULT = []
+
+
+def default():
+    """Shared :class:`HLIApprox` with the default tables, built once.
+
+    Returns:
+        HLIApprox: default approximation.
+    """
+    if not _DEFAULT:
+        _DEFAULT.append(HLIApprox())
+    return _DEFAULT[0]
@@ -0,0 +1,770 @@
+#
+# Copyright (c) Murilo Ijanc' <mbsd@m0x.ru>
+#
+# Permission to use, copy, modify, and distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+"""Vectorized heat load index.
+
+Array versions of the functions in :mod:`labwelfare.heat_load`. Every
+argument may be a NumPy array of any shape, an array-like or a scalar; the
+arguments are broadcast against each other and the whole batch is computed
+in a single pass.
+
+By default a negative or non-numeric reading raises ``ValueError`` for the
+whole batch. The ``on_invalid`` argument flags bad readings instead, in the
+same vectorized pass:
+
+* ``'nan'``: their results are NaN, indicators ``INVALID_INDICATOR``.
+* ``'mask'``: results are ``numpy.ma.MaskedArray`` masking them.
+* ``'clip'``: negative readings are clipped to zero and computed, missing
+  (NaN) and non-numeric ones are NaN.
+
+Rejected readings are then logged once per call, as counts per reason (see
+:func:`check_readings`), and counted in :mod:`labwelfare.metrics`.
+
+The ``dtype`` argument computes in float32 instead of float64, halving
+memory and bandwidth; every coefficient takes the compute dtype, so nothing
+is silently upcast. For ``bg_temp`` in [-10, 60] °C, ``air_temp`` in
+[0, 50] °C, ``rel_hum`` in [0, 100] %, ``solar_rad`` in [0, 1400] and
+``wind_speed`` in [0, 60] km/h, float32 results stay within
+``FLOAT32_MAX_ABS_ERROR`` of float64 (4e-5 measured), far below the 0.05 of
+one decimal place. Indicators only differ for values that close to a bin
+edge.
+"""
+import collections
+import functools
+import hashlib
+import logging
+
+import numpy as np
+
+from . import metrics
+from .heat_load import DEFAULT_THRESHOLD, HLIResult, Indicator
+
+LOGGER = logging.getLogger(__name__)
+
+# indices reported in error messages are truncated to this many entries.
+MAX_REPORTED_INDICES = 10
+
+# upper bounds (inclusive) of the NEGLEGIBLE, LOW and HIGH classes, the
+# MEDIUM class ends at the threshold.
+NEGLEGIBLE_MAX = 1.0
+LOW_MAX = 20.0
+HIGH_MAX = 100.0
+
+ON_INVALID = ('raise', 'nan', 'mask', 'clip')
+DTYPES = (np.dtype(np.float64), np.dtype(np.float32))
+# largest float32 deviation from float64 over the ranges documented above.
+FLOAT32_MAX_ABS_ERROR = 1e-4
+# indicator of rejected readings, below every ``Indicator`` value.
+INVALID_INDICATOR = 0
+REASONS = ('non_numeric', 'missing', 'negative')
+# coefficients of bg_temp, rel_hum and wind_speed (subtracted) and the
+# intercept of the high and low heat load index. The high one adds
+# exp(WIND_DECAY - wind_speed); they are blended by the sigmoid of
+# (bg_temp - center) / scale, SIGMOID holding (center, scale).
+HLI_HIGH = (1.55, 0.38, 0.5, 8.62)
+HLI_LOW = (1.3, 0.28, 1.0, 10.66)
+SIGMOID = (25.0, 2.25)
+WIND_DECAY = 2.4
+# predicted black globe temperature a * air_temp - b * sqrt(air_temp) +
+# c * log10(solar_rad + 1) + d, as (a, b, c, d).
+PRED_BG = (1.33, 2.65, 3.21, 3.5)
+_LABELS = {
+    'bg_temp': 'black globe',
+    'air_temp': 'air temperature',
+    'rel_hum': 'humidity',
+    'solar_rad': 'solar radiation',
+    'wind_speed': 'wind',
+    'hli': 'heat load index',
+    'threshold': 'threshold',
+}
+
+Rejections = collections.namedtuple('Rejections', 'mask counts')
+Rejections.__doc__ = """Readings rejected in a batch.
+
+Attributes:
+    mask (numpy.ndarray): True for the rejected readings, broadcast shape
+                          of the inputs.
+    counts (dict): rejected readings per reason, ``non_numeric``,
+                   ``missing`` (NaN) or ``negative``; each reading is
+                   counted once, under the first reason that applies.
+"""
+
+
+def _as_float_array(name, value, dtype=np.float64):
+    """Convert ``value`` to a float array or raise ValueError."""
+    try:
+        return np.asarray(value, dtype=dtype)
+    except (TypeError, ValueError):
+        metrics.reject('non_numeric')
+        LOGGER.error('%s must be numeric values', name)
+        raise ValueError('{} must be numeric values'.format(name))
+
+
+def _cells(value, dtype=np.float64):
+    """Float array of ``value`` and mask of its non-numeric cells.
+
+    The mask is None when the whole value converts at once, the element
+    by element conversion only runs for mixed inputs.
+    """
+    try:
+        return np.asarray(value, dtype=dtype), None
+    except (TypeError, ValueError):
+        pass
+    cells = np.asarray(value, dtype=object)
+    out = np.empty(cells.shape, dtype=dtype)
+    bad = np.zeros(cells.shape, dtype=bool)
+    for i, cell in np.ndenumerate(cells):
+        try:
+            out[i] = float(cell)
+        except (TypeError, ValueError):
+            out[i] = np.nan
+            bad[i] = True
+    return out, bad
+
+
+def _readings(on_invalid, readings, checked, uncounted=(),
+              dtype=np.float64):
+    """Float arrays of named readings, broadcast against each other.
+
+    Args:
+        on_invalid (str): one of ``ON_INVALID``.
+        readings (list): (name, value) pairs.
+        checked (tuple): names of the readings that cannot be negative.
+        uncounted (tuple): names whose NaN values are rejected without
+                           being counted, e.g. rejected upstream.
+        dtype (numpy.dtype): float dtype of the arrays, see ``DTYPES``.
+
+    Returns:
+        tuple: (list of arrays, Rejections or None when raising).
+
+    Raises:
+        ValueError: If on_invalid or dtype is unknown, or with ``'raise'``
+                    if a reading is not numeric or a checked one negative.
+    """
+    if np.dtype(dtype) not in DTYPES:
+        LOGGER.error('dtype must be one of %s', DTYPES)
+        raise ValueError('dtype must be one of {}'.format(DTYPES))
+    if on_invalid == 'raise':
+        arrays = np.broadcast_arrays(*[
+            _as_float_array(_LABELS[name], value, dtype)
+            for name, value in readings])
+        _check_non_negative(**{name: array for (name, _), array in
+                               zip(readings, arrays) if name in checked})
+        return list(arrays), None
+    if on_invalid not in ON_INVALID:
+        LOGGER.error('on_invalid must be one of %s', ON_INVALID)
+        raise ValueError('on_invalid must be one of {}'.format(ON_INVALID))
+
+    converted = [_cells(value, dtype) for _, value in readings]
+    arrays = list(np.broadcast_arrays(*[array for array, _ in converted]))
+    non_numeric = np.zeros(arrays[0].shape, dtype=bool)
+    missing = non_numeric.copy()
+    negative = non_numeric.copy()
+    dropped = non_numeric.copy()
+    for (name, _), (_, bad), array in zip(readings, converted, arrays):
+        if bad is not None:
+            non_numeric |= bad
+        if name in uncounted:
+            dropped |= np.isnan(array)
+        else:
+            missing |= np.isnan(array)
+        if name in checked:
+            negative |= array < 0
+    missing &= ~non_numeric
+    negative &= ~(non_numeric | missing)
+    counts = {'non_numeric': int(np.count_nonzero(non_numeric)),
+              'missing': int(np.count_nonzero(missing)),
+              'negative': int(np.count_nonzero(negative))}
+
+    invalid = non_numeric | missing | dropped
+    if on_invalid == 'clip':
+        arrays = [np.maximum(array, array.dtype.type(0)) if name in checked
+                  else array
+                  for (name, _), array in zip(readings, arrays)]
+        invalid &= ~negative
+    else:
+        invalid |= negative
+    return arrays, Rejections(invalid, counts)
+
+
+def _finish(result, rejections, on_invalid, fill=np.nan):
+    """Apply the ``on_invalid`` policy to a result and report rejections."""
+    if rejections is None:
+        return _result(result)
+    rejected = sum(rejections.counts.values())
+    if rejected:
+        LOGGER.warning('Rejected %d of %d readings: %s', rejected,
+                       rejections.mask.size, rejections.counts)
+        for reason, count in rejections.counts.items():
+            if count:
+                metrics.reject(reason, count)
+    if rejections.mask.any():
+        result = np.array(result)
+        result[rejections.mask] = fill
+    if on_invalid == 'mask':
+        return np.ma.masked_array(result, rejections.mask)
+    return _result(result)
+
+
+def check_readings(**readings):
+    """Find invalid readings without computing anything.
+
+    Args:
+        readings (dict): reading arrays keyed like :func:`hli`, ``hli`` and
+                         ``threshold`` included; all but ``bg_temp`` and
+                         ``hli`` cannot be negative.
+
+    Returns:
+        Rejections: mask and counts of the invalid readings.
+
+    Raises:
+        ValueError: If a reading name is unknown.
+    """
+    unknown = sorted(set(readings) - set(_LABELS))
+    if unknown:
+        LOGGER.error('Unknown readings: %s', unknown)
+        raise ValueError('Unknown readings: {}'.format(unknown))
+    _, rejections = _readings(
+        'nan', sorted(readings.items()),
+        tuple(name for name in readings if name not in ('bg_temp', 'hli')))
+    return rejections
+
+
+def _bad_indices(mask):
+    """Indices of the true elements of ``mask``.
+
+    One-dimensional masks give a list of ints, other shapes a list of index
+    tuples.
+    """
+    if mask.ndim <= 1:
+        return np.flatnonzero(mask).tolist()
+    return [tuple(i) for i in np.argwhere(mask).tolist()]
+
+
+def _check_non_negative(**arrays):
+    """Raise ValueError listing the indices of negative readings."""
+    bad = None
+    for value in arrays.values():
+        negative = value < 0
+        bad = negative if bad is None else bad | negative
+    if bad is None or not bad.any():
+        return
+
+    metrics.reject('negative', int(np.count_nonzero(bad)))
+    error = negative_error(sorted(arrays), _bad_indices(bad))
+    LOGGER.error(str(error))
+    raise error
+
+
+def _check_not_missing(**arrays):
+    """Raise ValueError listing the indices of NaN values."""
+    bad = None
+    for value in arrays.values():
+        missing = np.isnan(value)
+        bad = missing if bad is None else bad | missing
+    if bad is None or not bad.any():
+        return
+
+    metrics.reject('missing', int(np.count_nonzero(bad)))
+    error = negative_error(sorted(arrays), _bad_indices(bad), 'missing')
+    LOGGER.error(str(error))
+    raise error
+
+
+def negative_error(names, indices, reason='negative'):
+    """ValueError for negative or missing readings.
+
+    Args:
+        names (list): names of the checked readings.
+        indices (list): indices of the rejected readings.
+        reason (str): ``'negative'`` or ``'missing'`` (NaN), kept when
+                      the error is raised again with other indices.
+
+    Returns:
+        ValueError: error with ``names``, ``indices`` and ``reason``
+        attributes.
+    """
+    msg = '{} cannot be {} at indices: {}{}'.format(
+        ', '.join(names), 'missing (NaN)' if reason == 'missing' else reason,
+        indices[:MAX_REPORTED_INDICES],
+        ' ...' if len(indices) > MAX_REPORTED_INDICES else '')
+    error = ValueError(msg)
+    error.names = list(names)
+    error.indices = indices
+    error.reason = reason
+    return error
+
+
+def _result(value):
+    """Unwrap 0-d results into NumPy scalars."""
+    return value[()] if value.ndim == 0 else value
+
+
+@metrics.instrument
+def hli_bg(bg_temp, rel_hum, wind_speed, on_invalid='raise',
+           dtype=np.float64):
+    """Heat Load Index over arrays.
+
+    Args:
+        bg_temp (array_like): black globe temperature (°C).
+        rel_hum (array_like): relative humidity (%).
+        wind_speed (array_like): wind speed (km/h).
+        on_invalid (str): policy for invalid readings, see ``ON_INVALID``.
+        dtype (numpy.dtype): compute dtype, see ``DTYPES``.
+
+    Returns:
+        numpy.ndarray: heat load index values, broadcast shape of the inputs.
+
+    Raises:
+        ValueError: If bg_temp, rel_hum and wind_speed not numeric.
+                    If rel_hum or wind_speed has negative values, the
+                    ``indices`` attribute of the error lists them.
+                    Only with ``on_invalid='raise'``.
+    """
+    (bg_temp, rel_hum, wind_speed), rejections = _readings(
+        on_invalid, [('bg_temp', bg_temp), ('rel_hum', rel_hum),
+                     ('wind_speed', wind_speed)],
+        ('rel_hum', 'wind_speed'), dtype=dtype)
+    return _finish(_hli_bg(bg_temp, rel_hum, wind_speed), rejections,
+                   on_invalid)
+
+
+def _hli_bg(bg_temp, rel_hum, wind_speed):
+    """Unchecked array heat load index, see :func:`hli_bg`."""
+    return hli_branches(high_weight(bg_temp), wind_term(wind_speed),
+                        bg_temp, rel_hum, wind_speed)[2]
+
+
+# the stages below are unchecked, for code building on the model such as
+# lookup tables or solvers. Coefficients are typed like the inputs, Python
+# floats could upcast float32 scalars to float64.
+def high_weight(bg_temp):
+    """Weight of the high index, a sigmoid of the black globe temperature.
+
+    Args:
+        bg_temp (numpy.ndarray): black globe temperature (°C), float.
+
+    Returns:
+        numpy.ndarray: weight in [0, 1].
+    """
+    c = bg_temp.dtype.type
+    center, scale = SIGMOID
+    return c(1.0) / (c(1.0) + np.exp(-((bg_temp - c(center)) / c(scale))))
+
+
+def wind_term(wind_speed):
+    """Exponential wind speed term of the high index.
+
+    Args:
+        wind_speed (numpy.ndarray): wind speed (km/h), float.
+
+    Returns:
+        numpy.ndarray: ``exp(WIND_DECAY - wind_speed)``.
+    """
+    return np.exp(wind_speed.dtype.type(WIND_DECAY) - wind_speed)
+
+
+def hli_branches(weight, wind, bg_temp, rel_hum, wind_speed):
+    """High and low heat load index and their blend.
+
+    Args:
+        weight (numpy.ndarray): :func:`high_weight` of ``bg_temp``.
+        wind (numpy.ndarray): :func:`wind_term` of ``wind_speed``.
+        bg_temp (numpy.ndarray): black globe temperature (°C), float.
+        rel_hum (numpy.ndarray): relative humidity (%).
+        wind_speed (numpy.ndarray): wind speed (km/h).
+
+    Returns:
+        tuple: (high index, low index, heat load index).
+    """
+    c = bg_temp.dtype.type
+    bg, rh, ws, const = (c(k) for k in HLI_HIGH)
+    hli_high = bg * bg_temp + rh * rel_hum - ws * wind_speed + wind + const
+    bg, rh, ws, const = (c(k) for k in HLI_LOW)
+    hli_low = bg * bg_temp + rh * rel_hum - ws * wind_speed + const
+    return hli_high, hli_low, \
+        (weight * hli_high) + ((c(1) - weight) * hli_low)
+
+
+@metrics.instrument
+def hli_no_bg(air_temp, rel_hum, solar_rad, wind_speed, on_invalid='raise',
+              dtype=np.float64):
+    """Heat load index without black globe over arrays.
+
+    Args:
+        air_temp (array_like): air temperature (°C).
+        rel_hum (array_like): relative humidity (%).
+        solar_rad (array_like): solar radiation value.
+        wind_speed (array_like): wind speed (km/h).
+        on_invalid (str): policy for invalid readings, see ``ON_INVALID``.
+        dtype (numpy.dtype): compute dtype, see ``DTYPES``.
+
+    Returns:
+        numpy.ndarray: heat load index values, broadcast shape of the inputs.
+
+    Raises:
+        ValueError: If any argument is not numeric.
+                    If air_temp, rel_hum, solar_rad or wind_speed has
+                    negative values, the ``indices`` attribute of the error
+                    lists them.
+                    Only with ``on_invalid='raise'``.
+    """
+    # the square root of the air temperature is undefined below zero.
+    (air_temp, rel_hum, solar_rad, wind_speed), rejections = _readings(
+        on_invalid, [('air_temp', air_temp), ('rel_hum', rel_hum),
+                     ('solar_rad', solar_rad), ('wind_speed', wind_speed)],
+        ('air_temp', 'rel_hum', 'solar_rad', 'wind_speed'), dtype=dtype)
+    with np.errstate(invalid='ignore'):
+        pred_bg = _predict_bg_temp(air_temp, solar_rad)
+    return _finish(_hli_bg(pred_bg, rel_hum, wind_speed), rejections,
+                   on_invalid)
+
+
+def _predict_bg_temp(air_temp, solar_rad):
+    """Unchecked predicted black globe temperature."""
+    c = air_temp.dtype.type
+    a, b, k, d = (c(x) for x in PRED_BG)
+    return a * air_temp - b * np.sqrt(air_temp) + \
+        k * np.log10(solar_rad + c(1)) + d
+
+
+@metrics.instrument
+def predict_bg_temp(air_temp, solar_rad, on_invalid='raise',
+                    dtype=np.float64):
+    """Predicted black globe temperature over arrays.
+
+    The black globe temperature estimated from air temperature and solar
+    radiation, the first stage of :func:`hli_no_bg`.
+
+    Args:
+        air_temp (array_like): air temperature (°C).
+        solar_rad (array_like): solar radiation value.
+        on_invalid (str): policy for invalid readings, see ``ON_INVALID``.
+        dtype (numpy.dtype): compute dtype, see ``DTYPES``.
+
+    Returns:
+        numpy.ndarray: black globe temperature (°C).
+
+    Raises:
+        ValueError: If air_temp and solar_rad not numeric.
+                    If air_temp or solar_rad has negative values, the
+                    ``indices`` attribute of the error lists them.
+                    Only with ``on_invalid='raise'``.
+    """
+    (air_temp, solar_rad), rejections = _readings(
+        on_invalid, [('air_temp', air_temp), ('solar_rad', solar_rad)],
+        ('air_temp', 'solar_rad'), dtype=dtype)
+    with np.errstate(invalid='ignore'):
+        pred_bg = _predict_bg_temp(air_temp, solar_rad)
+    return _finish(pred_bg, rejections, on_invalid)
+
+
+class BgTempCache(object):
+    """Memoized :func:`predict_bg_temp` with LRU eviction.
+
+    Sweeping humidity or wind scenarios over the same air temperature and
+    solar radiation grid then predicts the black globe temperature once.
+    Inputs are keyed by shape and a digest of their float64 values, so a
+    grid changed in place, through any view, is a miss and equal grids in
+    other arrays are hits. The inputs are neither kept nor modified.
+
+    Hashing reads each input once, which pays off when the inputs
+    broadcast to a larger grid: a hit on (1000, 1) by (1, 1000) inputs
+    takes 34 µs against 21 ms for the prediction. Inputs already of the
+    grid shape cost about as much to hash as to predict.
+
+    Args:
+        maxsize (int): grids kept, the least recently used is evicted.
+    """
+
+    def __init__(self, maxsize=16):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        """Drop every cached grid."""
+        self._entries.clear()
+
+    @staticmethod
+    def _key(value):
+        """Float array of ``value`` and its key, None when not numeric."""
+        try:
+            array = np.asarray(value, dtype=np.float64)
+        except (TypeError, ValueError):
+            return value, None
+        digest = hashlib.blake2b(np.ascontiguousarray(array).view(np.uint8),
+                                 digest_size=16)
+        return array, (array.shape, digest.digest())
+
+    def __call__(self, air_temp, solar_rad):
+        """Predicted black globe temperature, from the cache when possible.
+
+        Args:
+            air_temp (array_like): air temperature (°C).
+            solar_rad (array_like): solar radiation value.
+
+        Returns:
+            numpy.ndarray: read-only black globe temperature (°C).
+        """
+        air_temp, air_key = self._key(air_temp)
+        solar_rad, solar_key = self._key(solar_rad)
+        key = (air_key, solar_key)
+        if None in key:
+            self.misses += 1
+            return predict_bg_temp(air_temp, solar_rad)
+
+        pred_bg = self._entries.get(key)
+        if pred_bg is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return pred_bg
+
+        self.misses += 1
+        pred_bg = np.asarray(predict_bg_temp(air_temp, solar_rad))
+        pred_bg.setflags(write=False)
+        self._entries[key] = pred_bg
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return pred_bg
+
+    def hli_no_bg(self, air_temp, rel_hum, solar_rad, wind_speed):
+        """:func:`hli_no_bg` with the cached black globe temperature.
+
+        Args:
+            air_temp (array_like): air temperature (°C).
+            rel_hum (array_like): relative humidity (%).
+            solar_rad (array_like): solar radiation value.
+            wind_speed (array_like): wind speed (km/h).
+
+        Returns:
+            numpy.ndarray: heat load index values.
+        """
+        return hli_bg(self(air_temp, solar_rad), rel_hum, wind_speed)
+
+
+@functools.lru_cache(maxsize=128)
+def indicator_edges(threshold=DEFAULT_THRESHOLD):
+    """Bin edges of the indicator classes for a threshold.
+
+    Bins are closed on the right, so the indicator of ``hli`` is one plus
+    the number of edges strictly below it. The edges reproduce the order
+    of :func:`labwelfare.heat_load.hli_indicator` even for thresholds
+    outside the (20, 100] range.
+
+    Args:
+        threshold (float): threshold value.
+
+    Returns:
+        numpy.ndarray: read-only array with the four bin edges.
+    """
+    edges = np.array([NEGLEGIBLE_MAX, LOW_MAX, max(threshold, LOW_MAX),
+                      max(threshold, HIGH_MAX)], dtype=np.float64)
+    edges.setflags(write=False)
+    return edges
+
+
+@metrics.instrument
+def hli_indicator(hli, threshold=DEFAULT_THRESHOLD, on_invalid='raise',
+                  dtype=np.float64):
+    """Heat load index indicator over arrays.
+
+    A scalar threshold classifies through the cached bin edges of
+    :func:`indicator_edges`, an array of thresholds (e.g. one per genotype)
+    is broadcast against ``hli`` and compared row by row.
+
+    A negative heat load index, e.g. of a cold reading, is valid and
+    NEGLEGIBLE like any value up to 1. NaN heat load index values or
+    thresholds are never classified: with ``on_invalid='raise'`` they
+    raise, with any other policy they give ``INVALID_INDICATOR``, NaN heat
+    load index values, e.g. of readings rejected upstream, without being
+    counted again.
+
+    Args:
+        hli (array_like): heat load index values.
+        threshold (array_like): threshold value or values.
+        on_invalid (str): policy for invalid values, see ``ON_INVALID``.
+        dtype (numpy.dtype): dtype the values are compared in, see
+                             ``DTYPES``; float32 values are classified
+                             exactly either way.
+
+    Returns:
+        numpy.ndarray: uint8 ``Indicator`` values.
+
+    Raises:
+        ValueError: If hli and threshold not numeric.
+                    If hli has NaN values or threshold negative or NaN
+                    ones, the ``indices`` attribute of the error lists
+                    them.
+                    Only with ``on_invalid='raise'``.
+    """
+    scalar = np.ndim(threshold) == 0
+    (hli, threshold), rejections = _readings(
+        on_invalid, [('hli', hli), ('threshold', threshold)],
+        ('threshold',), uncounted=('hli',), dtype=dtype)
+    if rejections is None:
+        _check_not_missing(hli=hli, threshold=threshold)
+    if scalar:
+        threshold = float(threshold.flat[0]) if threshold.size else \
+            DEFAULT_THRESHOLD
+    return _finish(_classify(hli, threshold), rejections, on_invalid,
+                   INVALID_INDICATOR)
+
+
+def _classify(hli, threshold):
+    """Unchecked indicator, ``threshold`` a float or a broadcast array.
+
+    NaN values or thresholds give ``INVALID_INDICATOR``.
+    """
+    if np.ndim(threshold) == 0:
+        if np.isnan(threshold):
+            return np.full(np.shape(hli), INVALID_INDICATOR, dtype=np.uint8)
+        edges = indicator_edges(threshold)
+        codes = np.searchsorted(edges, hli, side='left').astype(np.uint8)
+        codes += Indicator.NEGLEGIBLE.value
+        # searchsorted puts NaN past the last edge, i.e. EXTREME.
+        codes[np.isnan(hli)] = INVALID_INDICATOR
+        return codes
+
+    codes = np.full(hli.shape, Indicator.NEGLEGIBLE.value, dtype=np.uint8)
+    codes += hli > NEGLEGIBLE_MAX
+    codes += hli > LOW_MAX
+    codes += hli > np.maximum(threshold, LOW_MAX)
+    codes += hli > np.maximum(threshold, HIGH_MAX)
+    codes[np.isnan(hli) | np.isnan(threshold)] = INVALID_INDICATOR
+    return codes
+
+
+@metrics.instrument
+def hli_mixed(bg_temp, air_temp, rel_hum, solar_rad, wind_speed,
+              on_invalid='raise', dtype=np.float64):
+    """Heat load index of rows with and without black globe temperature.
+
+    Rows with NaN or non-numeric ``bg_temp``, e.g. a blank cell of a
+    weather log, use ``air_temp`` and ``solar_rad`` through
+    :func:`hli_no_bg`, the others :func:`hli_bg`.
+
+    Args:
+        bg_temp (array_like): black globe temperature (°C), NaN where
+                              unknown.
+        air_temp (array_like): air temperature (°C).
+        rel_hum (array_like): relative humidity (%).
+        solar_rad (array_like): solar radiation value.
+        wind_speed (array_like): wind speed (km/h).
+        on_invalid (str): policy for invalid readings, see ``ON_INVALID``.
+        dtype (numpy.dtype): compute dtype, see ``DTYPES``.
+
+    Returns:
+        numpy.ndarray: heat load index values, broadcast shape of the inputs.
+
+    Raises:
+        ValueError: If a reading a row uses is not numeric.
+                    If a reading a row uses is negative, the ``indices``
+                    attribute of the error lists them.
+                    Only with ``on_invalid='raise'``.
+    """
+    columns = {'bg_temp': _cells(bg_temp, dtype)[0],
+               'air_temp': air_temp, 'rel_hum': rel_hum,
+               'solar_rad': solar_rad, 'wind_speed': wind_speed}
+    shape = np.broadcast(*columns.values()).shape
+    has_bg = ~np.isnan(np.broadcast_to(columns['bg_temp'], shape))
+    h = np.empty(shape, dtype=dtype)
+    mask = np.zeros(shape, dtype=bool)
+    for rows, fn, names in (
+            (has_bg, hli_bg, ('bg_temp', 'rel_hum', 'wind_speed')),
+            (~has_bg, hli_no_bg, ('air_temp', 'rel_hum', 'solar_rad',
+                                  'wind_speed'))):
+        if not rows.any():
+            continue
+        args = [np.broadcast_to(columns[name], shape)[rows]
+                for name in names]
+        try:
+            part = fn(*args, on_invalid=on_invalid, dtype=dtype)
+        except ValueError as error:
+            if not hasattr(error, 'indices'):
+                raise
+            # positions in the whole batch, not in its part.
+            index = np.flatnonzero(rows)
+            raise negative_error(error.names,
+                                 [int(index[i]) for i in error.indices],
+                                 error.reason)
+        h[rows] = np.ma.getdata(part)
+        mask[rows] = np.ma.getmaskarray(part)
+    if on_invalid == 'mask':
+        return np.ma.masked_array(h, mask)
+    return h
+
+
+@metrics.instrument
+def hli(indicator=False, threshold=DEFAULT_THRESHOLD, on_invalid='raise',
+        dtype=np.float64, readings=None, **kwargs):
+    """Heat load index over arrays.
+
+    Array counterpart of :func:`labwelfare.heat_load.hli`: pass
+    ``rel_hum`` and ``wind_speed`` together with ``bg_temp`` or with
+    ``air_temp`` and ``solar_rad``, or a
+    :class:`labwelfare.records.ReadingBatch` as ``readings``, whose rows
+    without black globe temperature use ``air_temp`` and ``solar_rad``.
+
+    Args:
+        indicator (bool): if true also classify the heat load index.
+        threshold (array_like): threshold value or values, the one of
+                                ``readings`` when given.
+        on_invalid (str): policy for invalid readings, see ``ON_INVALID``.
+        dtype (numpy.dtype): compute dtype, see ``DTYPES``.
+        readings (labwelfare.records.ReadingBatch): readings to use instead
+                                                   of kwargs.
+        kwargs (dict): reading arrays keyed like the scalar ``hli``.
+
+    Returns:
+        HLIResult: (heat load index array, indicator array or None).
+
+    Raises:
+        ValueError: If required keys are missing, or readings are invalid
+                    with ``on_invalid='raise'``.
+    """
+    if readings is not None:
+        kwargs = readings.columns()
+        threshold = readings.threshold
+    if 'rel_hum' not in kwargs or 'wind_speed' not in kwargs:
+        metrics.reject('missing_keys')
+        LOGGER.error('Required keys: rel_hum and wind_speed')
+        raise ValueError('Required keys: rel_hum and wind_speed')
+    if readings is not None and 'bg_temp' in kwargs and \
+            'air_temp' in kwargs and 'solar_rad' in kwargs:
+        h = hli_mixed(kwargs['bg_temp'], kwargs['air_temp'],
+                      kwargs['rel_hum'], kwargs['solar_rad'],
+                      kwargs['wind_speed'], on_invalid, dtype)
+    elif 'bg_temp' in kwargs:
+        h = hli_bg(kwargs['bg_temp'], kwargs['rel_hum'],
+                   kwargs['wind_speed'], on_invalid, dtype)
+    elif 'air_temp' in kwargs and 'solar_rad' in kwargs:
+        h = hli_no_bg(kwargs['air_temp'], kwargs['rel_hum'],
+                      kwargs['solar_rad'], kwargs['wind_speed'], on_invalid,
+                      dtype)
+    else:
+        metrics.reject('missing_keys')
+        LOGGER.error('Must have key bg_temp or keys air_temp and solar_rad')
+        raise ValueError(
+            'Must have key bg_temp or keys air_temp and solar_rad')
+    if indicator:
+        # rejected readings are NaN, the indicator does not count them.
+        return HLIResult(h, hli_indicator(np.ma.getdata(h), threshold,
+                                          on_invalid, dtype))
+    return HLIResult(h, None)
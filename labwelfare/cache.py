@@ -0,0 +1,272 @@
+#
+# Copyright (c) Murilo Ijanc' <mbsd@m0x.ru>
+#
+# Permission to use, copy, modify, and distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+"""Module that caches computed heat load series on disk.
+
+Every pen is a directory with one raw binary file per column, written
+append-only and read back through ``numpy.memmap``, so reading any time
+window is a zero-copy slice. The store records a fingerprint of the model
+and is wiped when the coefficients or the default threshold change.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+
+import numpy as np
+
+from . import batch, heat_load
+from .ahl import DEFAULT_LOWER_THRESHOLD, ahl_series
+
+LOGGER = logging.getLogger(__name__)
+MANIFEST = 'manifest.json'
+COLUMNS = (
+    ('timestamp', np.int64),
+    ('hli', np.float64),
+    ('indicator', np.uint8),
+    ('ahl', np.float64),
+)
+
+# readings spanning both branches of the sigmoid blend and every indicator.
+_PROBES = (
+    (10.0, 20.0, 0.0, 0.0),
+    (25.0, 50.0, 300.0, 2.5),
+    (39.0, 93.0, 0.0, 12.9),
+    (45.0, 75.0, 900.0, 30.0),
+)
+
+
+def model_fingerprint():
+    """Fingerprint of the heat load model.
+
+    Evaluates the scalar and the :mod:`labwelfare.batch` model at fixed
+    probe readings and records the batch indicator edges, so any change of
+    a coefficient of either, of an indicator bound, of
+    ``DEFAULT_THRESHOLD`` or of the AHL lower threshold gives a different
+    fingerprint.
+
+    Returns:
+        str: hex digest.
+    """
+    values = [heat_load.DEFAULT_THRESHOLD, DEFAULT_LOWER_THRESHOLD]
+    for temp, rel_hum, solar_rad, wind_speed in _PROBES:
+        h = heat_load.hli_bg(temp, rel_hum, wind_speed)
+        values.append(h)
+        values.append(heat_load.hli_no_bg(temp, rel_hum, solar_rad,
+                                          wind_speed))
+        values.append(heat_load.hli_indicator(
+            h, heat_load.DEFAULT_THRESHOLD))
+    # the batch functions, which the store uses, keep their own copy of
+    # the coefficients and the indicator bounds.
+    temp, rel_hum, solar_rad, wind_speed = (np.array(column) for column in
+                                            zip(*_PROBES))
+    h = batch.hli_bg(temp, rel_hum, wind_speed)
+    values.extend(h.tolist())
+    values.extend(batch.hli_no_bg(temp, rel_hum, solar_rad,
+                                  wind_speed).tolist())
+    values.extend(batch.indicator_edges(
+        heat_load.DEFAULT_THRESHOLD).tolist())
+    values.extend(batch.hli_indicator(h, heat_load.DEFAULT_THRESHOLD)
+                  .tolist())
+    return hashlib.sha1(repr(values).encode('utf-8')).hexdigest()
+
+
+class HLIStore(object):
+    """Columnar on-disk store of heat load series per pen.
+
+    Columns are ``timestamp`` (int64), ``hli`` (float64), ``indicator``
+    (uint8) and ``ahl`` (float64). Timestamps of a pen must increase.
+
+    The manifest lists the pens the store created, only their directories
+    are ever removed when the model changes.
+
+    Args:
+        root (str): store directory, created when missing.
+
+    Raises:
+        ValueError: If root is a non-empty directory without a manifest.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.fingerprint = model_fingerprint()
+        if not os.path.isdir(root):
+            os.makedirs(root)
+        self._pens = set()
+        self._check_manifest()
+
+    def _check_manifest(self):
+        path = os.path.join(self.root, MANIFEST)
+        if not os.path.exists(path):
+            if os.listdir(self.root):
+                LOGGER.error('%s is not empty and has no %s', self.root,
+                             MANIFEST)
+                raise ValueError('{} is not empty and has no {}'.format(
+                    self.root, MANIFEST))
+            self._write_manifest()
+            return
+
+        with open(path) as handle:
+            manifest = json.load(handle)
+        self._pens = set(manifest.get('pens', ()))
+        if manifest.get('fingerprint') == self.fingerprint:
+            return
+        LOGGER.info('Heat load model changed, invalidating %s', self.root)
+        for pen in sorted(self._pens):
+            shutil.rmtree(self._pen_dir(pen), ignore_errors=True)
+        self._pens = set()
+        self._write_manifest()
+
+    def _write_manifest(self):
+        path = os.path.join(self.root, MANIFEST)
+        with open(path + '.tmp', 'w') as handle:
+            json.dump({'fingerprint': self.fingerprint,
+                       'pens': sorted(self._pens)}, handle)
+        os.replace(path + '.tmp', path)
+
+    def _pen_dir(self, pen):
+        pen = str(pen)
+        if not pen or pen.startswith('.') or os.sep in pen or \
+                pen == MANIFEST:
+            LOGGER.error('Invalid pen name: %r', pen)
+            raise ValueError('Invalid pen name: {!r}'.format(pen))
+        return os.path.join(self.root, pen)
+
+    def _column_path(self, pen, column):
+        return os.path.join(self._pen_dir(pen), column + '.bin')
+
+    def pens(self):
+        """list: names of the cached pens."""
+        return sorted(self._pens)
+
+    def length(self, pen):
+        """Number of complete rows cached for a pen.
+
+        Args:
+            pen (str): pen name.
+
+        Returns:
+            int: rows present in every column.
+        """
+        rows = []
+        for column, dtype in COLUMNS:
+            path = self._column_path(pen, column)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            rows.append(size // np.dtype(dtype).itemsize)
+        return min(rows)
+
+    def _column(self, pen, column, dtype, rows):
+        if not rows:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._column_path(pen, column), dtype=dtype,
+                         mode='r', shape=(rows,))
+
+    def read(self, pen, start=None, stop=None):
+        """Cached series of a pen in the time window ``[start, stop)``.
+
+        Args:
+            pen (str): pen name.
+            start (int): first timestamp, unbounded when None.
+            stop (int): timestamp after the window, unbounded when None.
+
+        Returns:
+            dict: column name to read-only memory-mapped array.
+        """
+        rows = self.length(pen)
+        columns = {column: self._column(pen, column, dtype, rows)
+                   for column, dtype in COLUMNS}
+        timestamp = columns['timestamp']
+        first = 0 if start is None else \
+            int(np.searchsorted(timestamp, start, side='left'))
+        last = rows if stop is None else \
+            int(np.searchsorted(timestamp, stop, side='left'))
+        return {column: values[first:last]
+                for column, values in columns.items()}
+
+    def append(self, pen, timestamp, hli, indicator=None, ahl=None,
+               threshold=None):
+        """Append heat load values to the series of a pen.
+
+        The indicator and the accumulated heat load are computed when not
+        given, the latter continuing from the last cached value. A NaN
+        heat load index gets ``INVALID_INDICATOR`` and leaves the load
+        unchanged.
+
+        Args:
+            pen (str): pen name.
+            timestamp (array_like): int64 timestamps, increasing and after
+                                    the last cached one.
+            hli (array_like): heat load index values.
+            indicator (array_like): ``Indicator`` values.
+            ahl (array_like): accumulated heat load values.
+            threshold (array_like): threshold value, ``DEFAULT_THRESHOLD``
+                                    when None.
+
+        Returns:
+            int: rows cached for the pen.
+
+        Raises:
+            ValueError: If timestamps do not increase, indicator or ahl is
+                        not of the length of hli, or the pen directory
+                        exists but was not created by the store.
+        """
+        pen = str(pen)
+        if threshold is None:
+            threshold = heat_load.DEFAULT_THRESHOLD
+        timestamp = np.atleast_1d(np.asarray(timestamp, dtype=np.int64))
+        hli = np.atleast_1d(np.asarray(hli, dtype=np.float64))
+        if timestamp.shape != hli.shape or timestamp.ndim != 1:
+            LOGGER.error('timestamp and hli must be 1-d of equal length')
+            raise ValueError('timestamp and hli must be 1-d of equal length')
+
+        if pen not in self._pens and os.path.exists(self._pen_dir(pen)):
+            LOGGER.error('%s was not created by the store', pen)
+            raise ValueError('{} was not created by the store'.format(pen))
+        previous = self.read(pen)
+        last_ts = previous['timestamp'][-1:]
+        if np.any(np.diff(timestamp) <= 0) or \
+                (len(last_ts) and len(timestamp) and
+                 timestamp[0] <= last_ts[0]):
+            LOGGER.error('Timestamps must increase')
+            raise ValueError('Timestamps must increase')
+
+        if indicator is None:
+            indicator = batch.hli_indicator(hli, threshold, 'nan')
+        if ahl is None:
+            initial = previous['ahl'][-1] if len(previous['ahl']) else 0.0
+            ahl = ahl_series(hli, upper=threshold, initial=initial)
+        for name, value in (('indicator', indicator), ('ahl', ahl)):
+            if np.atleast_1d(value).shape != hli.shape:
+                LOGGER.error('%s must have %d values', name, len(hli))
+                raise ValueError('{} must have {} values'.format(
+                    name, len(hli)))
+
+        os.makedirs(self._pen_dir(pen), exist_ok=True)
+        if pen not in self._pens:
+            self._pens.add(pen)
+            self._write_manifest()
+        values = {'timestamp': timestamp, 'hli': hli, 'indicator': indicator,
+                  'ahl': ahl}
+        rows = len(previous['timestamp'])
+        for column, dtype in COLUMNS:
+            path = self._column_path(pen, column)
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as out:
+                # drop the tail of a previously interrupted append.
+                out.truncate(rows * np.dtype(dtype).itemsize)
+                out.seek(0, os.SEEK_END)
+                out.write(np.ascontiguousarray(values[column],
+                                               dtype=dtype).tobytes())
+        return rows + len(timestamp)
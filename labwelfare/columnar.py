@@ -0,0 +1,210 @@
+#
+# Copyright (c) Murilo Ijanc' <mbsd@m0x.ru>
+#
+# Permission to use, copy, modify, and distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+"""Module that writes computed series as typed columnar files.
+
+Each :meth:`ColumnWriter.write` appends one row group, taken straight from
+the NumPy buffers: a column is only cast when its dtype differs from the
+schema, never converted row by row.
+
+Two formats are supported:
+
+* ``parquet``: Apache Parquet through ``pyarrow``, an optional dependency.
+* ``npz``: a NumPy zip archive with one ``.npy`` member per column and row
+  group, ``<column>.<group>``, written incrementally with the standard
+  library; :func:`read_columns` joins the groups back.
+"""
+import logging
+import os
+import zipfile
+
+import numpy as np
+
+LOGGER = logging.getLogger(__name__)
+FORMATS = ('parquet', 'npz')
+# rows per row group when a write is larger.
+DEFAULT_ROW_GROUP_ROWS = 1 << 20
+HLI_COLUMNS = (
+    ('timestamp', np.int64),
+    ('hli', np.float64),
+    ('indicator', np.uint8),
+)
+_COLUMNS_MEMBER = '__columns__'
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def default_format():
+    """``parquet`` when ``pyarrow`` is installed, ``npz`` otherwise."""
+    return 'parquet' if _pyarrow() is not None else 'npz'
+
+
+def _format(path, fmt):
+    if fmt is None:
+        ext = os.path.splitext(path)[1].lower()
+        fmt = {'.parquet': 'parquet', '.npz': 'npz'}.get(ext)
+        if fmt is None:
+            fmt = default_format()
+    if fmt not in FORMATS:
+        LOGGER.error('Format must be one of %s', FORMATS)
+        raise ValueError('Format must be one of {}'.format(FORMATS))
+    if fmt == 'parquet' and _pyarrow() is None:
+        LOGGER.error('Parquet output requires pyarrow')
+        raise ValueError('Parquet output requires pyarrow')
+    return fmt
+
+
+class ColumnWriter(object):
+    """Incremental writer of typed columns.
+
+    Use as a context manager, or call :meth:`close` to finish the file.
+
+    Args:
+        path (str): output file.
+        columns (tuple): (name, dtype) pairs of the schema.
+        fmt (str): ``parquet`` or ``npz``, by the ``path`` extension when
+                   None and :func:`default_format` without one.
+        hli_dtype (numpy.dtype): dtype of the ``hli`` column, e.g.
+                                 ``numpy.float32`` to halve its size.
+        row_group_rows (int): largest row group.
+        compression (str): Parquet codec, ignored by ``npz``.
+
+    Raises:
+        ValueError: If the format is unknown or unavailable.
+    """
+
+    def __init__(self, path, columns=HLI_COLUMNS, fmt=None, hli_dtype=None,
+                 row_group_rows=DEFAULT_ROW_GROUP_ROWS, compression='snappy'):
+        self.path = path
+        self.format = _format(path, fmt)
+        self.columns = tuple(
+            (name, np.dtype(hli_dtype if name == 'hli' and hli_dtype
+                            else dtype))
+            for name, dtype in columns)
+        self.row_group_rows = row_group_rows
+        self.rows = 0
+        self.row_groups = 0
+        if self.format == 'parquet':
+            pa = _pyarrow()
+            self._schema = pa.schema([(name, pa.from_numpy_dtype(dtype))
+                                      for name, dtype in self.columns])
+            self._file = pa.parquet.ParquetWriter(path, self._schema,
+                                                  compression=compression)
+        else:
+            self._file = zipfile.ZipFile(path, 'w', allowZip64=True)
+            # column order and dtypes, so files without rows read back too.
+            self._write_npy(_COLUMNS_MEMBER,
+                            np.array([(name, dtype.str)
+                                      for name, dtype in self.columns]))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _write_npy(self, member, array):
+        with self._file.open(member + '.npy', 'w', force_zip64=True) as fh:
+            np.lib.format.write_array(fh, array, allow_pickle=False)
+
+    def write(self, **columns):
+        """Append rows, one row group per ``row_group_rows``.
+
+        Args:
+            columns (dict): one-dimensional array per schema column, all of
+                            the same length.
+
+        Raises:
+            ValueError: If a column is missing or unknown, or the lengths
+                        differ.
+        """
+        names = [name for name, _ in self.columns]
+        if sorted(columns) != sorted(names):
+            LOGGER.error('Columns must be %s', names)
+            raise ValueError('Columns must be {}'.format(names))
+        arrays = [np.ascontiguousarray(columns[name], dtype=dtype)
+                  for name, dtype in self.columns]
+        size = len(arrays[0])
+        if any(array.shape != (size,) for array in arrays):
+            LOGGER.error('Columns must be one-dimensional of equal length')
+            raise ValueError(
+                'Columns must be one-dimensional of equal length')
+
+        for start in range(0, size, self.row_group_rows):
+            group = [array[start:start + self.row_group_rows]
+                     for array in arrays]
+            if self.format == 'parquet':
+                pa = _pyarrow()
+                table = pa.Table.from_arrays(
+                    [pa.array(array) for array in group], schema=self._schema)
+                self._file.write_table(table)
+            else:
+                for name, array in zip(names, group):
+                    self._write_npy(
+                        '{}.{:06d}'.format(name, self.row_groups), array)
+            self.row_groups += 1
+        self.rows += size
+
+    def write_hli(self, timestamp, hli, indicator):
+        """Append heat load index rows.
+
+        Args:
+            timestamp (array_like): reading times, int64 seconds.
+            hli (array_like): heat load index values.
+            indicator (array_like): ``Indicator`` values.
+        """
+        self.write(timestamp=timestamp, hli=hli, indicator=indicator)
+
+    def close(self):
+        """Finish the file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_columns(path, fmt=None):
+    """Read a file of :class:`ColumnWriter` back.
+
+    Args:
+        path (str): file to read.
+        fmt (str): ``parquet`` or ``npz``, by the ``path`` extension when
+                   None.
+
+    Returns:
+        dict: one NumPy array per column, in schema order.
+    """
+    fmt = _format(path, fmt)
+    if fmt == 'parquet':
+        table = _pyarrow().parquet.read_table(path)
+        return {name: table.column(name).to_numpy()
+                for name in table.column_names}
+
+    with np.load(path, allow_pickle=False) as archive:
+        dtypes = dict(archive[_COLUMNS_MEMBER].tolist())
+        groups = {name: [] for name in dtypes}
+        for member in sorted(archive.files):
+            name, _, group = member.rpartition('.')
+            if name in groups and group.isdigit():
+                groups[name].append(archive[member])
+    return {name: np.concatenate(parts) if parts else
+            np.empty(0, dtype=dtypes[name])
+            for name, parts in groups.items()}
@@ -0,0 +1,330 @@
+#
+# Copyright (c) Murilo Ijanc' <mbsd@m0x.ru>
+#
+# Permission to use, copy, modify, and distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+"""Module that evaluates heat load index over gridded forecasts.
+
+Forecast cubes, e.g. time x lat x lon x ensemble member, are given as
+N-dimensional arrays of any dtype, ``numpy.memmap`` included, that
+broadcast against each other. They are walked in blocks of about
+``block_size`` elements along the trailing axes, so every temporary of
+:func:`labwelfare.batch.hli_no_bg` stays block sized and the only full size
+array is the output, which can itself be a memory map (see
+``numpy.lib.format.open_memmap``).
+
+For a 50 member, 10 day hourly cube over a 200 x 240 grid of 0.25 degree
+cells (576 million values), the uint8 indicator cube takes 576 MB and the
+float64 exceedance map 92 MB, plus a few MB of block temporaries; memory
+mapped inputs are paged in one block at a time.
+
+Missing or masked forecast cells are NaN. By default they raise, like
+negative readings; with an ``on_invalid`` policy other than ``'raise'``
+(see :data:`labwelfare.batch.ON_INVALID`) they get a NaN heat load index
+and ``INVALID_INDICATOR``, or are masked, and :func:`exceedance` leaves
+them out of the member count. Cold cells with a negative heat load index
+are valid and NEGLEGIBLE.
+"""
+import logging
+
+import numpy as np
+
+from . import batch
+from .heat_load import DEFAULT_THRESHOLD, Indicator
+
+LOGGER = logging.getLogger(__name__)
+
+_NAMES = ('air_temp', 'rel_hum', 'solar_rad', 'wind_speed')
+# elements per block, the float64 temporaries of a block fit in L2 cache.
+DEFAULT_BLOCK_SIZE = 1 << 16
+
+
+def _blocks(shape, block_size):
+    """Slices of ``shape`` covering about ``block_size`` elements each.
+
+    Trailing axes are kept whole while they fit, the next one is split and
+    leading axes are walked one index at a time, so each block is a
+    contiguous run of a C ordered array.
+    """
+    inner = 1
+    axis = len(shape)
+    while axis and inner * shape[axis - 1] <= block_size:
+        axis -= 1
+        inner *= shape[axis]
+    tail = tuple(slice(0, n) for n in shape[axis:])
+    if not axis:
+        yield tail
+        return
+    split = axis - 1
+    step = max(block_size // inner, 1)
+    for outer in np.ndindex(*shape[:split]):
+        head = tuple(slice(i, i + 1) for i in outer)
+        for start in range(0, shape[split], step):
+            stop = min(start + step, shape[split])
+            yield head + (slice(start, stop),) + tail
+
+
+def _inputs(air_temp, rel_hum, solar_rad, wind_speed, threshold):
+    """Broadcast views of the inputs, threshold kept scalar if it is.
+
+    Returns:
+        tuple: (list of arrays, list of broadcast masks of the masked
+        inputs, None for the others).
+    """
+    threshold = np.asarray(threshold)
+    values = [air_temp, rel_hum, solar_rad, wind_speed]
+    if threshold.ndim:
+        values.append(threshold)
+    # masks are kept apart and applied per block, filling a masked cube
+    # with NaN up front would copy it whole.
+    arrays = np.broadcast_arrays(*([np.ma.getdata(a) for a in values] +
+                                   [np.ma.getmask(a) for a in values]))
+    masks = [mask if np.ma.isMaskedArray(a) else None
+             for a, mask in zip(values, arrays[len(values):])]
+    arrays = list(arrays[:len(values)])
+    if not threshold.ndim:
+        arrays.append(float(threshold))
+        masks.append(None)
+    return arrays, masks
+
+
+def _block(arrays, masks, index):
+    """Inputs of one block, masked cells NaN."""
+    block = []
+    for array, mask in zip(arrays, masks):
+        if np.ndim(array) == 0:
+            block.append(array)
+        elif mask is None:
+            block.append(array[index])
+        else:
+            block.append(np.where(mask[index], np.nan, array[index]))
+    return block
+
+
+def _check_not_missing(block):
+    """Raise ValueError listing the NaN cells of a block's readings."""
+    bad = None
+    names = []
+    for name, value in zip(_NAMES, block):
+        missing = np.isnan(value)
+        if missing.any():
+            names.append(name)
+            bad = missing if bad is None else bad | missing
+    if bad is None:
+        return
+    if bad.ndim <= 1:
+        indices = np.flatnonzero(bad).tolist()
+    else:
+        indices = [tuple(i) for i in np.argwhere(bad).tolist()]
+    error = batch.negative_error(names, indices, 'missing')
+    LOGGER.error(str(error))
+    raise error
+
+
+def _compute(arrays, masks, index, indicator, on_invalid, dtype):
+    """Heat load index or indicator of one block of the inputs.
+
+    Rejected cells are NaN, or ``INVALID_INDICATOR``, whatever the policy.
+    """
+    block = _block(arrays, masks, index)
+    try:
+        if on_invalid == 'raise':
+            # batch only rejects negative readings, NaN would pass.
+            _check_not_missing(block[:4])
+        h = np.ma.getdata(batch.hli_no_bg(*block[:4], on_invalid=on_invalid,
+                                          dtype=dtype))
+        if indicator:
+            return np.ma.getdata(batch.hli_indicator(h, block[4], on_invalid,
+                                                     dtype))
+        return h
+    except ValueError as error:
+        if not hasattr(error, 'indices'):
+            raise
+        # report positions in the whole cube, not in the block.
+        starts = [s.start for s in index]
+        if len(starts) == 1:
+            indices = [i + starts[0] for i in error.indices]
+        else:
+            indices = [tuple(i + s for i, s in zip(local, starts))
+                       for local in error.indices]
+        raise batch.negative_error(error.names, indices, error.reason)
+
+
+def _output(out, shape, dtype):
+    if out is None:
+        return np.empty(shape, dtype=dtype)
+    if out.shape != tuple(shape):
+        LOGGER.error('out must have shape %s, not %s', tuple(shape),
+                     out.shape)
+        raise ValueError('out must have shape {}, not {}'.format(
+            tuple(shape), out.shape))
+    return out
+
+
+def hli_cube(air_temp, rel_hum, solar_rad, wind_speed, out=None,
+             block_size=DEFAULT_BLOCK_SIZE, on_invalid='raise',
+             dtype=np.float64):
+    """Heat load index without black globe over a forecast cube.
+
+    Args:
+        air_temp (array_like): air temperature (°C).
+        rel_hum (array_like): relative humidity (%).
+        solar_rad (array_like): solar radiation value.
+        wind_speed (array_like): wind speed (km/h).
+        out (numpy.ndarray): array of the broadcast shape to write to,
+                             ``dtype`` when None.
+        block_size (int): elements evaluated at once.
+        on_invalid (str): policy for invalid readings, see
+                          :data:`labwelfare.batch.ON_INVALID`.
+        dtype (numpy.dtype): compute dtype, see
+                             :data:`labwelfare.batch.DTYPES`.
+
+    Returns:
+        numpy.ndarray: heat load index values, ``out`` if given, masked
+        where invalid with ``on_invalid='mask'``.
+
+    Raises:
+        ValueError: If any argument is not numeric or ``out`` has the
+                    wrong shape.
+                    If any reading is negative or missing, the
+                    ``indices`` attribute of the error lists them in the
+                    first block that has any.
+                    Only with ``on_invalid='raise'``.
+    """
+    arrays, masks = _inputs(air_temp, rel_hum, solar_rad, wind_speed,
+                            DEFAULT_THRESHOLD)
+    out = _output(out, arrays[0].shape, dtype)
+    for index in _blocks(out.shape, block_size):
+        out[index] = _compute(arrays, masks, index, False, on_invalid, dtype)
+    if on_invalid == 'mask':
+        return np.ma.masked_invalid(out, copy=False)
+    return out
+
+
+def indicator_cube(air_temp, rel_hum, solar_rad, wind_speed,
+                   threshold=DEFAULT_THRESHOLD, out=None,
+                   block_size=DEFAULT_BLOCK_SIZE, on_invalid='raise',
+                   dtype=np.float64):
+    """Heat load index indicator over a forecast cube.
+
+    Args:
+        air_temp (array_like): air temperature (°C).
+        rel_hum (array_like): relative humidity (%).
+        solar_rad (array_like): solar radiation value.
+        wind_speed (array_like): wind speed (km/h).
+        threshold (array_like): threshold value, or values broadcasting
+                                against the cube, e.g. one per cell.
+        out (numpy.ndarray): array of the broadcast shape to write to,
+                             uint8 when None.
+        block_size (int): elements evaluated at once.
+        on_invalid (str): policy for invalid readings, see
+                          :data:`labwelfare.batch.ON_INVALID`.
+        dtype (numpy.dtype): compute dtype, see
+                             :data:`labwelfare.batch.DTYPES`.
+
+    Returns:
+        numpy.ndarray: ``Indicator`` values, ``out`` if given, invalid
+        cells ``INVALID_INDICATOR`` or masked with ``on_invalid='mask'``.
+
+    Raises:
+        ValueError: If any argument is not numeric or ``out`` has the
+                    wrong shape.
+                    If any reading is negative or missing, the
+                    ``indices`` attribute of the error lists them in the
+                    first block that has any.
+                    Only with ``on_invalid='raise'``.
+    """
+    arrays, masks = _inputs(air_temp, rel_hum, solar_rad, wind_speed,
+                            threshold)
+    out = _output(out, arrays[0].shape, np.uint8)
+    for index in _blocks(out.shape, block_size):
+        out[index] = _compute(arrays, masks, index, True, on_invalid, dtype)
+    if on_invalid == 'mask':
+        return np.ma.masked_equal(out, batch.INVALID_INDICATOR, copy=False)
+    return out
+
+
+def exceedance(air_temp, rel_hum, solar_rad, wind_speed, member_axis=-1,
+               level=Indicator.HIGH, threshold=DEFAULT_THRESHOLD, out=None,
+               block_size=DEFAULT_BLOCK_SIZE, on_invalid='raise',
+               dtype=np.float64):
+    """Probability of reaching an indicator level across ensemble members.
+
+    Invalid members of a cell, with an ``on_invalid`` policy other than
+    ``'raise'``, count neither as exceedances nor as members; cells
+    without a valid member are NaN.
+
+    Args:
+        air_temp (array_like): air temperature (°C).
+        rel_hum (array_like): relative humidity (%).
+        solar_rad (array_like): solar radiation value.
+        wind_speed (array_like): wind speed (km/h).
+        member_axis (int): axis of the ensemble members.
+        level (Indicator): lowest indicator counted as an exceedance.
+        threshold (array_like): threshold value, or values broadcasting
+                                against the cube.
+        out (numpy.ndarray): array of the broadcast shape without
+                             ``member_axis`` to write to, float64 when None.
+        block_size (int): elements evaluated at once, members included.
+        on_invalid (str): policy for invalid readings, see
+                          :data:`labwelfare.batch.ON_INVALID`.
+        dtype (numpy.dtype): compute dtype, see
+                             :data:`labwelfare.batch.DTYPES`.
+
+    Returns:
+        numpy.ndarray: fraction of valid members at or above ``level`` per
+        cell, ``out`` if given, masked where NaN with
+        ``on_invalid='mask'``.
+
+    Raises:
+        ValueError: If any argument is not numeric or ``out`` has the
+                    wrong shape.
+                    If any reading is negative or missing, the
+                    ``indices`` attribute of the error lists them in the
+                    first block that has any.
+                    Only with ``on_invalid='raise'``.
+    """
+    arrays, masks = _inputs(air_temp, rel_hum, solar_rad, wind_speed,
+                            threshold)
+    ndim = arrays[0].ndim
+    if not ndim:
+        LOGGER.error('exceedance needs a member axis')
+        raise ValueError('exceedance needs a member axis')
+    axis = member_axis % ndim
+    # members last, so a block always holds every member of its cells.
+    arrays = [a if np.ndim(a) == 0 else np.moveaxis(a, axis, -1)
+              for a in arrays]
+    masks = [m if m is None else np.moveaxis(m, axis, -1) for m in masks]
+    shape = arrays[0].shape
+    members = shape[-1]
+    out = _output(out, shape[:-1], np.float64)
+    level = Indicator(level).value
+
+    for index in _blocks(shape[:-1], max(block_size // max(members, 1), 1)):
+        index += (slice(0, members),)
+        try:
+            ind = _compute(arrays, masks, index, True, on_invalid, dtype)
+        except ValueError as error:
+            if not hasattr(error, 'indices') or ndim == 1:
+                raise
+            # back to the axis order of the inputs.
+            indices = [i[:axis] + i[-1:] + i[axis:-1] for i in error.indices]
+            raise batch.negative_error(error.names, indices, error.reason)
+        # INVALID_INDICATOR is below every level, so only the count of
+        # members needs the invalid ones taken out.
+        valid = np.count_nonzero(ind != batch.INVALID_INDICATOR, axis=-1)
+        with np.errstate(invalid='ignore'):
+            out[index[:-1]] = np.count_nonzero(ind >= level, axis=-1) / valid
+    if on_invalid == 'mask':
+        return np.ma.masked_invalid(out, copy=False)
+    return out
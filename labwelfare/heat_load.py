@@ -22,11 +22,27 @@ conditions.
 import logging
 import math
 import numbers
+from collections import namedtuple
 from enum import Enum, unique
 
+from . import metrics
+from .metrics import METRICS
+
 LOGGER = logging.getLogger(__name__)
 DEFAULT_THRESHOLD = 86
 
+# exact types accepted without the slower ``numbers.Number`` ABC check.
+_NUMBER_TYPES = frozenset((int, float))
+# prebound for the fast path, saves the ``math`` attribute lookups.
+_exp = math.exp
+_log10 = math.log10
+_pow = math.pow
+
+
+def _is_number(value):
+    return type(value) in _NUMBER_TYPES or \
+        isinstance(value, numbers.Number)
+
 
 @unique
 class Indicator(Enum):
@@ -38,6 +54,23 @@ class Indicator(Enum):
     EXTREME = 5
 
 
+HLIResult = namedtuple('HLIResult', 'hli indicator')
+HLIResult.__doc__ = """Heat load index and indicator, a plain tuple.
+
+Attributes:
+    hli (float): heat load index value, or array of values.
+    indicator (int): ``Indicator`` value, array of values, or None when not
+                     requested.
+"""
+
+# plain ints for the fast path, enum attribute access is comparatively slow.
+_NEGLEGIBLE = Indicator.NEGLEGIBLE.value
+_LOW = Indicator.LOW.value
+_MEDIUM = Indicator.MEDIUM.value
+_HIGH = Indicator.HIGH.value
+_EXTREME = Indicator.EXTREME.value
+
+
 def hli_bg(bg_temp, rel_hum, wind_speed):
     """Heat Load Index.
 
@@ -53,29 +86,47 @@ def hli_bg(bg_temp, rel_hum, wind_speed):
         ValueError: If bg_temp, rel_hum and wind_speed not a number.
                     If rel_hum or wind_speed is a negative number.
     """
-    if not isinstance(bg_temp, numbers.Number) or \
-            not isinstance(rel_hum, numbers.Number) or \
-            not isinstance(wind_speed, numbers.Number):
-        LOGGER.exception('black globe, humidity, and wind be numeric value')
+    if METRICS.enabled:
+        METRICS.inc('labwelfare_calls_total', func='hli_bg')
+    if not _is_number(bg_temp) or not _is_number(rel_hum) or \
+            not _is_number(wind_speed):
+        metrics.reject('non_numeric')
+        LOGGER.error('black globe, humidity, and wind be numeric value')
         raise ValueError('black globe, humidity, and wind be numeric value')
 
     # wind speed and relative humidity cannot be negative.
     if rel_hum < 0 or wind_speed < 0:
-        LOGGER.exception('Relative humidity: {} or wind speed: {} '
-                         'cannot be negative.'.format(rel_hum, wind_speed))
+        metrics.reject('negative')
+        LOGGER.error('Relative humidity: {} or wind speed: {} '
+                     'cannot be negative.'.format(rel_hum, wind_speed))
         raise ValueError('Relative humidity: {} or wind speed: {} '
                          'cannot be negative.'.format(rel_hum, wind_speed))
 
+    return hli_bg_fast(bg_temp, rel_hum, wind_speed)
+
+
+def hli_bg_fast(bg_temp, rel_hum, wind_speed):
+    """Heat Load Index without validation.
+
+    Same result as :func:`hli_bg`, bit for bit, for trusted numeric
+    readings; invalid ones are not detected.
+
+    Args:
+        bg_temp (float): black globe temperature (°C).
+        rel_hum (float): relative humidity (%).
+        wind_speed (float): wind speed (km/h).
+
+    Returns:
+        float: heat load index value
+    """
     # TODO: what's it?
-    frac_high = 1.0 / (1.0 + math.exp(-((bg_temp - 25.0) / 2.25)))
+    frac_high = 1.0 / (1.0 + _exp(-((bg_temp - 25.0) / 2.25)))
     # TODO: what's it?
     hli_high = 1.55 * bg_temp + 0.38 * rel_hum - 0.5 * \
-        wind_speed + math.exp(2.4 - wind_speed) + 8.62
+        wind_speed + _exp(2.4 - wind_speed) + 8.62
     # TODO: what's it?
     hli_low = 1.3 * bg_temp + 0.28 * rel_hum - wind_speed + 10.66
-    _hli = (frac_high * hli_high) + ((1 - frac_high) * hli_low)
-
-    return _hli
+    return (frac_high * hli_high) + ((1 - frac_high) * hli_low)
 
 
 def hli_no_bg(air_temp, rel_hum, solar_rad, wind_speed):
@@ -94,26 +145,46 @@ def hli_no_bg(air_temp, rel_hum, solar_rad, wind_speed):
         ValueError: If hli and thresgold not a number.
                     If hli or threshold is a negative number.
     """
-    if not isinstance(air_temp, numbers.Number) or \
-            not isinstance(rel_hum, numbers.Number) or \
-            not isinstance(solar_rad, numbers.Number) or \
-            not isinstance(wind_speed, numbers.Number):
-        LOGGER.exception('black globe, humidity, and wind be numeric value')
+    if METRICS.enabled:
+        METRICS.inc('labwelfare_calls_total', func='hli_no_bg')
+    if not _is_number(air_temp) or not _is_number(rel_hum) or \
+            not _is_number(solar_rad) or not _is_number(wind_speed):
+        metrics.reject('non_numeric')
+        LOGGER.error('black globe, humidity, and wind be numeric value')
         raise ValueError('black globe, humidity, and wind be numeric value')
 
     # wind speed and relative humidity cannot be negative.
     if rel_hum < 0 or solar_rad < 0 or wind_speed < 0:
-        LOGGER.exception(
+        metrics.reject('negative')
+        LOGGER.error(
             'Relative humidity: {} or solar radiation: {} or wind speed: {} '
             'cannot be negative.'.format(rel_hum, solar_rad, wind_speed))
         raise ValueError(
             'Relative humidity: {} or solar radiation: {} or wind speed: {} '
             'cannot be negative.'.format(rel_hum, solar_rad, wind_speed))
 
+    return hli_no_bg_fast(air_temp, rel_hum, solar_rad, wind_speed)
+
+
+def hli_no_bg_fast(air_temp, rel_hum, solar_rad, wind_speed):
+    """Heat load index no black globe without validation.
+
+    Same result as :func:`hli_no_bg`, bit for bit, for trusted numeric
+    readings; invalid ones are not detected.
+
+    Args:
+        air_temp (float): air temperature (°C).
+        rel_hum (float): relative humidity (%).
+        solar_rad (float): solar radiation value.
+        wind_speed (float): wind speed (km/h).
+
+    Returns:
+        float: heat load index value
+    """
     # predicted black globe temperature based on air temp and solar radiation
-    pred_bg = 1.33 * air_temp - 2.65 * math.pow(
-        air_temp, 0.5) + 3.21 * math.log10(solar_rad + 1) + 3.5
-    return hli_bg(pred_bg, rel_hum, wind_speed)
+    pred_bg = 1.33 * air_temp - 2.65 * _pow(
+        air_temp, 0.5) + 3.21 * _log10(solar_rad + 1) + 3.5
+    return hli_bg_fast(pred_bg, rel_hum, wind_speed)
 
 
 def hli_indicator(hli, threshold=86):
@@ -124,39 +195,62 @@ def hli_indicator(hli, threshold=86):
         threshold (float): threshold value.
 
     Returns:
-        string: indicating the thermal risk of the animal.
+        int: ``Indicator`` value of the thermal risk of the animal.
 
     Raises:
         ValueError: If hli and threshold not a number.
-                    If hli or threshold is a negative number.
+                    If hli or threshold is NaN or a negative number.
     """
-    if not isinstance(hli, numbers.Number) or \
-            not isinstance(threshold, numbers.Number):
-        LOGGER.exception('heat load index, threshold be numeric value')
+    if METRICS.enabled:
+        METRICS.inc('labwelfare_calls_total', func='hli_indicator')
+    if not _is_number(hli) or not _is_number(threshold):
+        metrics.reject('non_numeric')
+        LOGGER.error('heat load index, threshold be numeric value')
         raise ValueError('heat load index, threshold be numeric value')
 
+    # NaN compares false against every bin edge and would be EXTREME.
+    if math.isnan(hli) or math.isnan(threshold):
+        metrics.reject('missing')
+        LOGGER.error('Heat load index: {} or threshold: {} '
+                     'cannot be NaN.'.format(hli, threshold))
+        raise ValueError('Heat load index: {} or threshold: {} '
+                         'cannot be NaN.'.format(hli, threshold))
+
     # wind speed and relative humidity cannot be negative.
     if hli < 0 or threshold < 0:
-        LOGGER.exception('Heat load index: {} or threshold: {} '
-                         'cannot be negative.'.format(hli, threshold))
+        metrics.reject('negative')
+        LOGGER.error('Heat load index: {} or threshold: {} '
+                     'cannot be negative.'.format(hli, threshold))
         raise ValueError('Heat load index: {} or threshold: {} '
                          'cannot be negative.'.format(hli, threshold))
 
-    if hli == 0:
-        indicator_value = Indicator.NEGLEGIBLE.value
-    elif 1 < hli <= 20:
-        indicator_value = Indicator.LOW.value
-    elif 21 < hli <= threshold:
-        indicator_value = Indicator.MEDIUM.value
-    elif threshold < hli <= 100:
-        indicator_value = Indicator.HIGH.value
-    else:
-        indicator_value = Indicator.EXTREME.value
+    return hli_indicator_fast(hli, threshold)
+
 
-    return indicator_value
+def hli_indicator_fast(hli, threshold=DEFAULT_THRESHOLD):
+    """Heat load index indicator without validation.
 
+    NaN values are not detected and classified EXTREME.
 
-def hli(indicator=False, **kwargs):
+    Args:
+        hli (float): heat load index value.
+        threshold (float): threshold value.
+
+    Returns:
+        int: ``Indicator`` value of the thermal risk of the animal.
+    """
+    if hli <= 1:
+        return _NEGLEGIBLE
+    if hli <= 20:
+        return _LOW
+    if hli <= threshold:
+        return _MEDIUM
+    if hli <= 100:
+        return _HIGH
+    return _EXTREME
+
+
+def hli(indicator=False, reading=None, **kwargs):
     """Heat load index.
 
     Calculate the heat load index based on the possible arguments that may be
@@ -164,16 +258,34 @@ def hli(indicator=False, **kwargs):
     will have to be passed. Already for the other arguments you must pass
     temperature of the black globe ``or`` air temperature and solar radiation.
 
+    A :class:`labwelfare.records.Reading` can be passed instead of the
+    keys, which skips the kwargs parsing.
+
     Args:
         indicator (bool): if true return heat load index and indicator.
+        reading (labwelfare.records.Reading): reading to use instead of
+                                              kwargs.
         kwargs (dict): requires keys rel_hum, wind_speed, If you have the
                        black globe temperature value use the ``bg_temp``
                        key otherwise enter the air temperature ``air_temp``,
                        solar radiation ``solar_rad`` keys.
 
     Returns:
-        tuple: if indicator true return tuple (heat load index, indicator).
+        HLIResult: (heat load index, indicator), indicator None unless
+        requested.
     """
+    if METRICS.enabled:
+        METRICS.inc('labwelfare_calls_total', func='hli')
+    if reading is not None:
+        if reading.bg_temp is not None:
+            h = hli_bg(reading.bg_temp, reading.rel_hum, reading.wind_speed)
+        else:
+            h = hli_no_bg(reading.air_temp, reading.rel_hum,
+                          reading.solar_rad, reading.wind_speed)
+        if indicator:
+            return HLIResult(h, hli_indicator(h, reading.threshold))
+        return HLIResult(h, None)
+
     args = kwargs.keys()
     h = None
     threshold = DEFAULT_THRESHOLD
@@ -183,8 +295,9 @@ def hli(indicator=False, **kwargs):
         threshold = kwargs['threshold']
 
     # required args rel_hum and wind_speed
-    if 'rel_hum' not in args and 'wind_speed' not in args:
-        LOGGER.exception('Required keys: rel_hum and wind_speed')
+    if 'rel_hum' not in args or 'wind_speed' not in args:
+        metrics.reject('missing_keys')
+        LOGGER.error('Required keys: rel_hum and wind_speed')
         raise ValueError('Required keys: rel_hum and wind_speed')
     # black globe temperature in args
     if 'bg_temp' in args:
@@ -194,11 +307,39 @@ def hli(indicator=False, **kwargs):
         h = hli_no_bg(kwargs['air_temp'], kwargs['rel_hum'],
                       kwargs['solar_rad'], kwargs['wind_speed'])
     else:
-        LOGGER.exception(
+        metrics.reject('missing_keys')
+        LOGGER.error('Must have key bg_temp or keys air_temp and solar_rad')
+        raise ValueError(
             'Must have key bg_temp or keys air_temp and solar_rad')
-        ValueError('Must have key bg_temp or keys air_temp and solar_rad')
     # return heat load index and indicator value Ex. (98.1, 4)
     if indicator:
         ind = hli_indicator(h, threshold)
-        return (h, ind)
-    return (h, None)
+        return HLIResult(h, ind)
+    return HLIResult(h, None)
+
+
+def hli_fast(rel_hum, wind_speed, bg_temp=None, air_temp=None,
+             solar_rad=None, threshold=DEFAULT_THRESHOLD):
+    """Heat load index and indicator without validation.
+
+    Trusted counterpart of ``hli(True, **kwargs)`` with plain arguments
+    instead of a kwargs dict. Uses ``bg_temp`` when given, otherwise
+    ``air_temp`` and ``solar_rad``.
+
+    Args:
+        rel_hum (float): relative humidity (%).
+        wind_speed (float): wind speed (km/h).
+        bg_temp (float): black globe temperature (°C).
+        air_temp (float): air temperature (°C).
+        solar_rad (float): solar radiation value.
+        threshold (float): threshold value.
+
+    Returns:
+        tuple: (heat load index, indicator), a plain tuple since building
+        an ``HLIResult`` would cost a third of the call.
+    """
+    if bg_temp is not None:
+        h = hli_bg_fast(bg_temp, rel_hum, wind_speed)
+    else:
+        h = hli_no_bg_fast(air_temp, rel_hum, solar_rad, wind_speed)
+    return (h, hli_indicator_fast(h, threshold))
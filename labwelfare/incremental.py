@@ -0,0 +1,297 @@
+#
+# Copyright (c) Murilo Ijanc' <mbsd@m0x.ru>
+#
+# Permission to use, copy, modify, and distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+"""Module that recomputes heat load series incrementally.
+
+Raw readings are upserted by (pen, timestamp), late corrections included.
+Only the rows whose inputs changed are recomputed; the accumulated heat
+load is then carried forward from the earliest of them and the daily
+reports of the days they touch are rebuilt. An upsert costs O(changed rows
++ tail after the earliest change), never O(history):
+
+* each pen keeps its columns in arrays with spare capacity, sorted by
+  timestamp, so inserted rows only shift the tail;
+* the accumulated heat load after a change depends only on the load just
+  before it (see :func:`labwelfare.ahl.ahl_series`);
+* a daily report row depends only on the readings of its day.
+"""
+import collections
+import logging
+
+import numpy as np
+
+from . import batch, reports
+from .ahl import DEFAULT_LOWER_THRESHOLD, ahl_series
+from .heat_load import DEFAULT_THRESHOLD
+
+LOGGER = logging.getLogger(__name__)
+INPUTS = ('bg_temp', 'air_temp', 'solar_rad', 'rel_hum', 'wind_speed')
+COLUMNS = (('timestamp', np.int64),) + \
+    tuple((name, np.float64) for name in INPUTS) + \
+    (('hli', np.float64), ('indicator', np.uint8), ('ahl', np.float64))
+
+Change = collections.namedtuple('Change', 'start rows')
+Change.__doc__ = """Recomputed part of a pen series.
+
+Attributes:
+    start (int): earliest recomputed timestamp; the accumulated heat load
+                 changed from there on.
+    rows (int): rows whose heat load index was recomputed.
+"""
+
+
+class _Series(object):
+    """Columns of a pen in growable arrays sorted by timestamp."""
+
+    def __init__(self):
+        self.size = 0
+        self.data = {name: np.empty(16, dtype=dtype)
+                     for name, dtype in COLUMNS}
+        self.days = {}
+
+    def __getitem__(self, name):
+        return self.data[name][:self.size]
+
+    def reserve(self, size):
+        capacity = len(self.data['timestamp'])
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity)
+        for name, values in self.data.items():
+            grown = np.empty(capacity, dtype=values.dtype)
+            grown[:self.size] = values[:self.size]
+            self.data[name] = grown
+
+    def insert(self, pos, rows):
+        """Insert sorted ``rows`` before positions ``pos``, O(tail)."""
+        count = len(pos)
+        first = int(pos[0])
+        size = self.size - first + count
+        self.reserve(self.size + count)
+        new = np.zeros(size, dtype=bool)
+        new[(pos - first) + np.arange(count)] = True
+        for name, values in self.data.items():
+            block = np.empty(size, dtype=values.dtype)
+            block[~new] = values[first:self.size]
+            block[new] = rows.get(name, 0)
+            values[first:first + size] = block
+        self.size += count
+
+
+def _floor(hli):
+    """Negative heat load index, e.g. under strong wind, classified as 0."""
+    return np.where(hli < 0, 0.0, hli)
+
+
+def _changed(old, new):
+    """Rows of 2-d ``new`` that differ from ``old``, NaN equal to NaN."""
+    same = (old == new) | (np.isnan(old) & np.isnan(new))
+    return ~same.all(axis=0)
+
+
+class IncrementalHLI(object):
+    """Heat load series per pen, kept up to date under upserts.
+
+    Rows with a black globe temperature use :func:`labwelfare.batch.hli_bg`,
+    the others :func:`labwelfare.batch.hli_no_bg`. Invalid readings give a
+    NaN heat load index (``on_invalid='nan'``), which leaves the
+    accumulated heat load unchanged. Negative heat load index values are
+    kept in the series but count as 0 in indicators and daily reports.
+
+    Args:
+        threshold (float): upper threshold, or a
+                           :class:`labwelfare.registry.ThresholdRegistry`
+                           holding one per pen.
+        lower (float): lower threshold of the accumulated heat load.
+        hours (float): hours covered by each reading.
+        offset (int): seconds added to timestamps to find their day, see
+                      :func:`labwelfare.reports.window_report`.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD,
+                 lower=DEFAULT_LOWER_THRESHOLD, hours=1.0, offset=0):
+        self.threshold = threshold
+        self.lower = lower
+        self.hours = hours
+        self.offset = offset
+        self._pens = {}
+
+    def __len__(self):
+        return len(self._pens)
+
+    def __contains__(self, pen):
+        return pen in self._pens
+
+    def pens(self):
+        """list: pens with readings."""
+        return sorted(self._pens)
+
+    def _threshold(self, pen):
+        if hasattr(self.threshold, 'threshold'):
+            return self.threshold.threshold(pen)
+        return self.threshold
+
+    def upsert(self, pen, timestamp, rel_hum, wind_speed, bg_temp=None,
+               air_temp=None, solar_rad=None):
+        """Insert or correct readings.
+
+        Args:
+            pen (array_like): pen of each reading, or one for all.
+            timestamp (array_like): reading time in seconds.
+            rel_hum (array_like): relative humidity (%).
+            wind_speed (array_like): wind speed (km/h).
+            bg_temp (array_like): black globe temperature (°C), NaN or None
+                                  when unknown.
+            air_temp (array_like): air temperature (°C).
+            solar_rad (array_like): solar radiation value.
+
+        Returns:
+            dict: pen to :class:`Change`, for the pens whose series
+            changed. Readings identical to the stored ones change nothing.
+        """
+        timestamp = np.atleast_1d(np.asarray(timestamp, dtype=np.int64))
+        size = len(timestamp)
+        values = {'bg_temp': bg_temp, 'air_temp': air_temp,
+                  'solar_rad': solar_rad, 'rel_hum': rel_hum,
+                  'wind_speed': wind_speed}
+        inputs = np.empty((len(INPUTS), size))
+        for i, name in enumerate(INPUTS):
+            inputs[i] = np.nan if values[name] is None else values[name]
+        pen = np.broadcast_to(np.asarray(pen), (size,))
+
+        # sorted by pen and timestamp, the last of duplicates wins.
+        order = np.lexsort((np.arange(size), timestamp, pen))
+        pen, timestamp, inputs = pen[order], timestamp[order], \
+            inputs[:, order]
+        last = np.ones(size, dtype=bool)
+        last[:-1] = (pen[1:] != pen[:-1]) | (timestamp[1:] != timestamp[:-1])
+        pen, timestamp, inputs = pen[last], timestamp[last], inputs[:, last]
+
+        changes = {}
+        bounds = np.flatnonzero(np.r_[True, pen[1:] != pen[:-1], True])
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            key = pen[start].item()
+            change = self._upsert_pen(key, timestamp[start:stop],
+                                      inputs[:, start:stop])
+            if change is not None:
+                changes[key] = change
+        return changes
+
+    def _upsert_pen(self, pen, timestamp, inputs):
+        series = self._pens.get(pen)
+        if series is None:
+            series = self._pens[pen] = _Series()
+
+        pos = np.searchsorted(series['timestamp'], timestamp)
+        exists = pos < series.size
+        exists[exists] = series['timestamp'][pos[exists]] == \
+            timestamp[exists]
+
+        updated = pos[exists]
+        stored = np.array([series[name][updated] for name in INPUTS])
+        changed = _changed(stored, inputs[:, exists])
+        updated = updated[changed]
+        for i, name in enumerate(INPUTS):
+            series[name][updated] = inputs[i, exists][changed]
+
+        inserted = ~exists
+        if inserted.any():
+            series.insert(pos[inserted], dict(
+                zip(INPUTS, inputs[:, inserted]),
+                timestamp=timestamp[inserted]))
+
+        changed_ts = np.concatenate([timestamp[exists][changed],
+                                     timestamp[inserted]])
+        if not len(changed_ts):
+            return None
+        rows = np.searchsorted(series['timestamp'], changed_ts)
+        self._recompute(pen, series, rows)
+        return Change(int(changed_ts.min()), len(rows))
+
+    def _recompute(self, pen, series, rows):
+        threshold = self._threshold(pen)
+        bg_temp = series['bg_temp'][rows]
+        with_bg = ~np.isnan(bg_temp)
+        h = np.empty(len(rows))
+        h[with_bg] = batch.hli_bg(
+            bg_temp[with_bg], series['rel_hum'][rows[with_bg]],
+            series['wind_speed'][rows[with_bg]], on_invalid='nan')
+        no_bg = rows[~with_bg]
+        h[~with_bg] = batch.hli_no_bg(
+            series['air_temp'][no_bg], series['rel_hum'][no_bg],
+            series['solar_rad'][no_bg], series['wind_speed'][no_bg],
+            on_invalid='nan')
+        series['hli'][rows] = h
+        series['indicator'][rows] = batch.hli_indicator(
+            _floor(h), threshold, on_invalid='nan')
+
+        # the load from the earliest change on, continuing the one before.
+        first = int(rows.min())
+        initial = series['ahl'][first - 1] if first else 0.0
+        series['ahl'][first:] = ahl_series(
+            series['hli'][first:], threshold, self.lower, self.hours,
+            initial)
+
+        # only the days holding a changed row get a new report row.
+        day = (series['timestamp'][rows] + self.offset) // reports.DAY
+        starts = np.unique(day) * reports.DAY - self.offset
+        lo = np.searchsorted(series['timestamp'], starts)
+        hi = np.searchsorted(series['timestamp'], starts + reports.DAY)
+        touched = np.concatenate([np.arange(a, b) for a, b in zip(lo, hi)])
+        report = reports.window_report(
+            np.zeros(len(touched), dtype=np.int8),
+            series['timestamp'][touched], _floor(series['hli'][touched]),
+            reports.DAY, threshold, self.hours, self.offset)
+        for i, start in enumerate(report.start.tolist()):
+            series.days[start] = tuple(column[i] for column in report[2:])
+
+    def series(self, pen):
+        """Current series of a pen.
+
+        Args:
+            pen (str): pen identifier.
+
+        Returns:
+            dict: column name to a read-only view, sorted by timestamp;
+            ``timestamp``, the raw inputs, ``hli``, ``indicator`` and
+            ``ahl``.
+        """
+        series = self._pens[pen]
+        out = {}
+        for name, _ in COLUMNS:
+            view = series[name]
+            view.flags.writeable = False
+            out[name] = view
+        return out
+
+    def daily_report(self, pen):
+        """Daily aggregates of a pen, see
+        :func:`labwelfare.reports.daily_report`.
+
+        Args:
+            pen (str): pen identifier.
+
+        Returns:
+            labwelfare.reports.WindowReport: one row per day with readings.
+        """
+        days = self._pens[pen].days
+        starts = sorted(days)
+        rows = [days[start] for start in starts]
+        columns = [np.array(column) for column in zip(*rows)] if rows else \
+            [np.empty(0), np.empty(0), np.empty(0, dtype=np.int64),
+             np.empty((0, reports.INDICATORS)), np.empty(0)]
+        return reports.WindowReport(
+            np.full(len(starts), pen, dtype=object),
+            np.array(starts, dtype=np.int64), *columns)
@@ -0,0 +1,334 @@
+#
+# Copyright (c) Murilo Ijanc' <mbsd@m0x.ru>
+#
+# Permission to use, copy, modify, and distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+"""Module that solves the heat load index for one of its inputs.
+
+For shade and fan planning: the highest black globe or air temperature
+that keeps the heat load index at or below a threshold, and the lowest
+wind speed that brings it back there.
+
+:func:`labwelfare.heat_load.hli_bg` is strictly increasing in the black
+globe temperature (slope about 1.3 or more over ``BG_TEMP_RANGE``) and
+decreasing in the wind speed, so each question has one root, found for
+whole arrays at once by Newton steps with the analytic derivative, kept
+inside a shrinking bracket by falling back to bisection. The predicted
+black globe temperature of :func:`labwelfare.heat_load.hli_no_bg` is a
+quadratic in the square root of the air temperature, inverted in closed
+form.
+
+For a scalar threshold, :func:`max_bg_temp` and :func:`max_air_temp`
+interpolate a :class:`ContourTable` of precomputed roots over humidity and
+wind speed instead, within ``TABLE_MAX_ABS_ERROR`` °C of the solver;
+readings off the table are solved.
+"""
+import functools
+import logging
+
+import numpy as np
+
+from . import batch
+from .approx import BG_TEMP_RANGE, WIND_SPEED_RANGE
+from .heat_load import DEFAULT_THRESHOLD
+
+LOGGER = logging.getLogger(__name__)
+REL_HUM_RANGE = (0.0, 100.0)
+REL_HUM_STEP = 1.0
+# fine enough for the bend of the exp(2.4 - wind_speed) term near 0 km/h.
+WIND_SPEED_STEP = 0.05
+TABLE_MAX_ABS_ERROR = 5e-3
+# solver stops once every step is below this many °C or km/h.
+DEFAULT_TOL = 1e-9
+MAX_ITER = 60
+
+
+def _parts(bg_temp, rel_hum, wind_speed):
+    """Sigmoid, high and low indices of :func:`hli_bg` and their blend."""
+    frac_high = batch.high_weight(bg_temp)
+    return (frac_high,) + batch.hli_branches(frac_high,
+                                             batch.wind_term(wind_speed),
+                                             bg_temp, rel_hum, wind_speed)
+
+
+def _solve(fn, lo, hi, skip, x=None, tol=DEFAULT_TOL, max_iter=MAX_ITER):
+    """Root of the increasing ``fn`` in ``[lo, hi]``, elementwise.
+
+    ``fn`` returns (value, slope). Newton steps from ``x``, the midpoint
+    when None, leaving the bracket are replaced by its midpoint, and the
+    bracket shrinks every iteration. Elements in ``skip``, without a root
+    in the bracket, do not hold up the convergence test.
+    """
+    if x is None:
+        x = 0.5 * (lo + hi)
+    for _ in range(max_iter):
+        value, slope = fn(x)
+        below = value < 0
+        lo = np.where(below, x, lo)
+        hi = np.where(below, hi, x)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = x - value / slope
+        step = np.where((step >= lo) & (step <= hi), step, 0.5 * (lo + hi))
+        done = (np.abs(step - x) <= tol) | skip
+        x = step
+        if done.all():
+            break
+    return x
+
+
+def _bounded(solved, low, high):
+    """NaN where even the low end is unsafe, inf where the high end is."""
+    return np.where(low, np.nan, np.where(high, np.inf, solved))
+
+
+def solve_bg_temp(rel_hum, wind_speed, threshold=DEFAULT_THRESHOLD,
+                  bg_range=BG_TEMP_RANGE, tol=DEFAULT_TOL):
+    """Black globe temperature with heat load index equal to ``threshold``.
+
+    Args:
+        rel_hum (array_like): relative humidity (%).
+        wind_speed (array_like): wind speed (km/h).
+        threshold (array_like): target heat load index.
+        bg_range (tuple): black globe temperature bracket (°C).
+        tol (float): solver tolerance (°C).
+
+    Returns:
+        numpy.ndarray: black globe temperature (°C); NaN where the index is
+        above ``threshold`` at the low end of ``bg_range``, inf where it is
+        not above it at the high end.
+    """
+    rel_hum, wind_speed, threshold = np.broadcast_arrays(
+        *[np.asarray(a, dtype=np.float64)
+          for a in (rel_hum, wind_speed, threshold)])
+    lo = np.full(rel_hum.shape, float(bg_range[0]))
+    hi = np.full(rel_hum.shape, float(bg_range[1]))
+
+    def fn(bg_temp):
+        frac_high, hli_high, hli_low, h = _parts(bg_temp, rel_hum,
+                                                 wind_speed)
+        slope = frac_high * (1 - frac_high) / batch.SIGMOID[1] * \
+            (hli_high - hli_low) + batch.HLI_HIGH[0] * frac_high + \
+            batch.HLI_LOW[0] * (1 - frac_high)
+        return h - threshold, slope
+
+    low = fn(lo)[0] > 0
+    high = fn(hi)[0] <= 0
+    out = _bounded(_solve(fn, lo, hi, low | high, tol=tol), low, high)
+    return out[()] if out.ndim == 0 else out
+
+
+def air_temp_for_bg(bg_temp, solar_rad):
+    """Highest air temperature with a predicted black globe temperature.
+
+    Inverts :func:`labwelfare.batch.predict_bg_temp`, the quadratic
+    ``a x**2 - b x + c`` of ``x = sqrt(air_temp)`` with the coefficients of
+    ``batch.PRED_BG``, on its increasing branch.
+
+    Args:
+        bg_temp (array_like): black globe temperature (°C).
+        solar_rad (array_like): solar radiation value.
+
+    Returns:
+        numpy.ndarray: air temperature (°C), NaN where ``bg_temp`` is below
+        every predicted black globe temperature, inf where it is inf.
+    """
+    a, b, k, d = batch.PRED_BG
+    bg_temp = np.asarray(bg_temp, dtype=np.float64)
+    const = k * np.log10(np.asarray(solar_rad, dtype=np.float64) + 1) + d
+    with np.errstate(invalid='ignore'):
+        x = (b + np.sqrt(b ** 2 - 4 * a * (const - bg_temp))) / (2 * a)
+    out = x * x
+    return out[()] if out.ndim == 0 else out
+
+
+class ContourTable(object):
+    """Maximum black globe temperature precomputed over humidity and wind.
+
+    Args:
+        threshold (float): target heat load index.
+        rel_hum_step (float): humidity grid step (%).
+        wind_step (float): wind speed grid step (km/h).
+        wind_range (tuple): wind speed range of the grid (km/h).
+        bg_range (tuple): black globe temperature bracket (°C).
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, rel_hum_step=REL_HUM_STEP,
+                 wind_step=WIND_SPEED_STEP, wind_range=WIND_SPEED_RANGE,
+                 bg_range=BG_TEMP_RANGE):
+        self.threshold = threshold
+        self.bg_range = bg_range
+        self.grids = []
+        for start, stop, step in ((REL_HUM_RANGE[0], REL_HUM_RANGE[1],
+                                   rel_hum_step),
+                                  (wind_range[0], wind_range[1], wind_step)):
+            size = int(round((stop - start) / step)) + 1
+            self.grids.append((float(start), float(step), size))
+        (h0, hs, hn), (w0, ws, wn) = self.grids
+        self.values = solve_bg_temp(h0 + hs * np.arange(hn)[:, None],
+                                    w0 + ws * np.arange(wn)[None, :],
+                                    threshold, bg_range)
+        self.values.setflags(write=False)
+
+    def max_bg_temp(self, rel_hum, wind_speed):
+        """Bilinear interpolation of the table, solved off the table.
+
+        Args:
+            rel_hum (array_like): relative humidity (%).
+            wind_speed (array_like): wind speed (km/h).
+
+        Returns:
+            numpy.ndarray: see :func:`solve_bg_temp`.
+        """
+        rel_hum, wind_speed = np.broadcast_arrays(
+            np.asarray(rel_hum, dtype=np.float64),
+            np.asarray(wind_speed, dtype=np.float64))
+        shape = rel_hum.shape
+        rel_hum = rel_hum.ravel()
+        wind_speed = wind_speed.ravel()
+        out = np.empty(rel_hum.shape)
+        inside = np.ones(rel_hum.shape, dtype=bool)
+        cells = []
+        for x, (start, step, size) in zip((rel_hum, wind_speed), self.grids):
+            pos = (x - start) / step
+            inside &= (pos >= 0) & (pos <= size - 1)
+            cells.append(pos)
+        for k, pos in enumerate(cells):
+            pos = pos[inside]
+            i = np.minimum(pos.astype(np.intp), self.grids[k][2] - 2)
+            cells[k] = (i, pos - i)
+        (i, u), (j, v) = cells
+        table = self.values
+        corners = (table[i, j], table[i, j + 1], table[i + 1, j],
+                   table[i + 1, j + 1])
+        with np.errstate(invalid='ignore'):
+            got = (1 - u) * ((1 - v) * corners[0] + v * corners[1]) + \
+                u * ((1 - v) * corners[2] + v * corners[3])
+        # the root falls with humidity and rises with wind, so a cell whose
+        # corners are all NaN or all inf is too; mixed cells are solved.
+        nan = np.isnan(corners).all(axis=0)
+        inf = np.isinf(corners).all(axis=0)
+        got[nan] = np.nan
+        got[inf] = np.inf
+        out[inside] = got
+        solve = ~inside
+        solve[inside] = ~np.isfinite(got) & ~nan & ~inf
+        if solve.any():
+            out[solve] = solve_bg_temp(rel_hum[solve], wind_speed[solve],
+                                       self.threshold, self.bg_range)
+        out = out.reshape(shape)
+        return out[()] if out.ndim == 0 else out
+
+
+@functools.lru_cache(maxsize=16)
+def contour_table(threshold=DEFAULT_THRESHOLD):
+    """Shared :class:`ContourTable` of a threshold, built once.
+
+    Args:
+        threshold (float): target heat load index.
+
+    Returns:
+        ContourTable: table with the default grid.
+    """
+    return ContourTable(threshold)
+
+
+def max_bg_temp(rel_hum, wind_speed, threshold=DEFAULT_THRESHOLD,
+                table=True):
+    """Highest black globe temperature keeping the index at ``threshold``.
+
+    Args:
+        rel_hum (array_like): relative humidity (%).
+        wind_speed (array_like): wind speed (km/h).
+        threshold (array_like): target heat load index.
+        table (bool): use :func:`contour_table` for a scalar threshold.
+
+    Returns:
+        numpy.ndarray: black globe temperature (°C), see
+        :func:`solve_bg_temp`.
+    """
+    if table and np.ndim(threshold) == 0:
+        return contour_table(float(threshold)).max_bg_temp(rel_hum,
+                                                           wind_speed)
+    return solve_bg_temp(rel_hum, wind_speed, threshold)
+
+
+def max_air_temp(rel_hum, solar_rad, wind_speed, threshold=DEFAULT_THRESHOLD,
+                 table=True):
+    """Highest air temperature keeping the index at ``threshold``.
+
+    Args:
+        rel_hum (array_like): relative humidity (%).
+        solar_rad (array_like): solar radiation value.
+        wind_speed (array_like): wind speed (km/h).
+        threshold (array_like): target heat load index.
+        table (bool): use :func:`contour_table` for a scalar threshold.
+
+    Returns:
+        numpy.ndarray: air temperature (°C); NaN where no air temperature
+        is safe, inf where every one in ``BG_TEMP_RANGE`` is.
+    """
+    return air_temp_for_bg(
+        max_bg_temp(rel_hum, wind_speed, threshold, table), solar_rad)
+
+
+def min_wind_speed(rel_hum, threshold=DEFAULT_THRESHOLD, bg_temp=None,
+                   air_temp=None, solar_rad=None,
+                   wind_range=WIND_SPEED_RANGE, tol=DEFAULT_TOL):
+    """Lowest wind speed keeping the index at ``threshold``.
+
+    Pass ``bg_temp``, or ``air_temp`` and ``solar_rad``.
+
+    Args:
+        rel_hum (array_like): relative humidity (%).
+        threshold (array_like): target heat load index.
+        bg_temp (array_like): black globe temperature (°C).
+        air_temp (array_like): air temperature (°C).
+        solar_rad (array_like): solar radiation value.
+        wind_range (tuple): wind speed bracket (km/h).
+        tol (float): solver tolerance (km/h).
+
+    Returns:
+        numpy.ndarray: wind speed (km/h); the low end of ``wind_range``
+        where it is already safe, NaN where the high end is not.
+
+    Raises:
+        ValueError: If neither bg_temp nor air_temp and solar_rad are
+                    given.
+    """
+    if bg_temp is None:
+        if air_temp is None or solar_rad is None:
+            LOGGER.error('Must have bg_temp or air_temp and solar_rad')
+            raise ValueError('Must have bg_temp or air_temp and solar_rad')
+        # negative readings give NaN, like a black globe temperature for
+        # which no wind speed is safe.
+        bg_temp = batch.predict_bg_temp(air_temp, solar_rad, 'nan')
+    bg_temp, rel_hum, threshold = np.broadcast_arrays(
+        *[np.asarray(a, dtype=np.float64)
+          for a in (bg_temp, rel_hum, threshold)])
+    lo = np.full(bg_temp.shape, float(wind_range[0]))
+    hi = np.full(bg_temp.shape, float(wind_range[1]))
+
+    def fn(wind_speed):
+        frac_high, _, _, h = _parts(bg_temp, rel_hum, wind_speed)
+        slope = frac_high * (batch.HLI_HIGH[2] +
+                             batch.wind_term(wind_speed)) + \
+            batch.HLI_LOW[2] * (1 - frac_high)
+        return threshold - h, slope
+
+    safe = fn(lo)[0] >= 0
+    unsafe = fn(hi)[0] < 0
+    # the index is convex in the wind speed, Newton steps from the slow
+    # end approach the root from one side and never leave the bracket.
+    out = _solve(fn, lo, hi, safe | unsafe, lo, tol)
+    out = np.where(safe, lo, np.where(unsafe, np.nan, out))
+    return out[()] if out.ndim == 0 else out
@@ -0,0 +1,175 @@
+#
+# Copyright (c) Murilo Ijanc' <mbsd@m0x.ru>
+#
+# Permission to use, copy, modify, and distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+"""Module that streams weather logs.
+
+Station exports in CSV or XLSX are read a chunk of rows at a time, so the
+memory used stays flat no matter how large the file is. Each chunk is a
+dict of float arrays keyed like the arguments of ``hli``.
+"""
+import csv
+import logging
+import os
+
+import numpy as np
+
+from . import batch
+from .heat_load import DEFAULT_THRESHOLD, HLIResult
+
+LOGGER = logging.getLogger(__name__)
+DEFAULT_CHUNK_ROWS = 65536
+COLUMNS = ('bg_temp', 'air_temp', 'solar_rad', 'rel_hum', 'wind_speed',
+           'threshold')
+XLSX_EXTENSIONS = ('.xlsx', '.xlsm')
+
+
+def _csv_rows(path, delimiter):
+    with open(path, newline='') as handle:
+        for row in csv.reader(handle, delimiter=delimiter):
+            yield row
+
+
+def _xlsx_rows(path, sheet):
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.active
+        for row in worksheet.iter_rows(values_only=True):
+            yield row
+    finally:
+        workbook.close()
+
+
+def _to_float(values):
+    """Float array of a column, blank or non-numeric cells become NaN."""
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        out = np.empty(len(values), dtype=np.float64)
+        for i, value in enumerate(values):
+            try:
+                out[i] = float(value)
+            except (TypeError, ValueError):
+                out[i] = np.nan
+        return out
+
+
+def _column_index(header, columns):
+    """Map argument names to positions in the header row."""
+    if columns is None:
+        columns = {name: name for name in COLUMNS}
+    names = [str(cell).strip().lower() if cell is not None else ''
+             for cell in header]
+    index = {}
+    for source, target in columns.items():
+        source = source.strip().lower()
+        if source in names:
+            index[target] = names.index(source)
+    return index
+
+
+def iter_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS, columns=None,
+                sheet=None, delimiter=','):
+    """Read a weather log a chunk of rows at a time.
+
+    The first row is the header. XLSX workbooks are opened read-only.
+
+    Args:
+        path (str): CSV or XLSX file.
+        chunk_rows (int): rows per chunk.
+        columns (dict): header name to argument name, e.g.
+                        ``{'Temp': 'air_temp'}``. By default headers named
+                        like the arguments are used.
+        sheet (str): worksheet name, the active one by default.
+        delimiter (str): CSV field delimiter.
+
+    Yields:
+        dict: argument name to float array of at most ``chunk_rows`` values.
+    """
+    if chunk_rows < 1:
+        LOGGER.error('chunk_rows must be positive')
+        raise ValueError('chunk_rows must be positive')
+    if os.path.splitext(path)[1].lower() in XLSX_EXTENSIONS:
+        rows = _xlsx_rows(path, sheet)
+    else:
+        rows = _csv_rows(path, delimiter)
+
+    header = next(rows, None)
+    if header is None:
+        return
+    index = _column_index(header, columns)
+    if not index:
+        LOGGER.error('No known columns in header: %s', header)
+        raise ValueError('No known columns in header: {}'.format(header))
+
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_rows:
+            yield _chunk_arrays(chunk, index)
+            chunk = []
+    if chunk:
+        yield _chunk_arrays(chunk, index)
+
+
+def _chunk_arrays(rows, index):
+    width = max(index.values()) + 1
+    # short rows are padded so a missing trailing cell reads as NaN.
+    rows = [row if len(row) >= width else
+            tuple(row) + (None,) * (width - len(row)) for row in rows]
+    return {name: _to_float([row[i] for row in rows])
+            for name, i in index.items()}
+
+
+def iter_hli(path, chunk_rows=DEFAULT_CHUNK_ROWS, columns=None,
+             threshold=DEFAULT_THRESHOLD, sheet=None, delimiter=',',
+             on_invalid='nan'):
+    """Heat load index and indicator of a weather log, chunk by chunk.
+
+    A ``threshold`` column, when mapped, overrides the ``threshold``
+    argument row by row. Blank or non-numeric cells are missing readings:
+    by default their rows get a NaN heat load index and
+    ``batch.INVALID_INDICATOR``. Logs with ``bg_temp`` as well as
+    ``air_temp`` and ``solar_rad`` columns use the latter two in the rows
+    without black globe temperature.
+
+    Args:
+        path (str): CSV or XLSX file.
+        chunk_rows (int): rows per chunk.
+        columns (dict): header name to argument name.
+        threshold (float): threshold value.
+        sheet (str): worksheet name, the active one by default.
+        delimiter (str): CSV field delimiter.
+        on_invalid (str): policy for invalid readings, see
+                          ``batch.ON_INVALID``.
+
+    Yields:
+        HLIResult: (heat load index array, indicator array) per chunk.
+
+    Raises:
+        ValueError: If readings are invalid with ``on_invalid='raise'``.
+    """
+    for chunk in iter_chunks(path, chunk_rows, columns, sheet, delimiter):
+        limit = chunk.pop('threshold', threshold)
+        if 'bg_temp' in chunk and 'air_temp' in chunk and \
+                'solar_rad' in chunk:
+            h = batch.hli_mixed(chunk['bg_temp'], chunk['air_temp'],
+                                chunk['rel_hum'], chunk['solar_rad'],
+                                chunk['wind_speed'], on_invalid)
+            yield HLIResult(h, batch.hli_indicator(
+                np.ma.getdata(h), limit, on_invalid))
+        else:
+            yield batch.hli(True, limit, on_invalid, **chunk)
@@ -0,0 +1,241 @@
+#
+# Copyright (c) Murilo Ijanc' <mbsd@m0x.ru>
+#
+# Permission to use, copy, modify, and distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+"""Module that collects call volume and latency metrics.
+
+Instrumentation is off by default. Every hook checks
+``METRICS.enabled`` first, so a disabled registry costs one attribute
+lookup per call. Once enabled with :func:`enable`:
+
+* ``labwelfare_calls_total{func}`` counts calls of the validated
+  :mod:`labwelfare.heat_load` functions and of the :mod:`labwelfare.batch`
+  functions.
+* ``labwelfare_rejected_total{reason}`` counts rejected readings, by
+  ``non_numeric``, ``negative``, ``missing_keys`` or ``missing``.
+* ``labwelfare_batch_seconds{func}`` is a histogram of the latency of the
+  successful batch calls, :mod:`labwelfare.serve` micro-batches included.
+* ``labwelfare_readings_total{func}`` counts readings of the batch calls
+  and micro-batches.
+
+The ``*_fast`` functions are never instrumented. Metrics are kept per
+process, workers of :mod:`labwelfare.parallel` collect their own.
+"""
+import bisect
+import functools
+import threading
+import time
+
+# latency histogram bucket upper bounds in seconds.
+DEFAULT_BUCKETS = (1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05, 0.1,
+                   0.5, 1.0, 5.0)
+
+
+class _Histogram(object):
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _prometheus_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(k, v) for k, v in pairs) + '}'
+
+
+class Metrics(object):
+    """Registry of counters and latency histograms.
+
+    Args:
+        buckets (tuple): histogram bucket upper bounds, increasing.
+        enabled (bool): collect from the start.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, enabled=False):
+        self.buckets = tuple(buckets)
+        self.enabled = enabled
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def enable(self):
+        """Start collecting."""
+        self.enabled = True
+
+    def disable(self):
+        """Stop collecting, collected values are kept."""
+        self.enabled = False
+
+    def reset(self):
+        """Drop every collected value."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def inc(self, name, value=1, **labels):
+        """Increase a counter.
+
+        Args:
+            name (str): metric name.
+            value (float): increment.
+            labels (dict): label values.
+        """
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """Add an observation to a histogram.
+
+        Args:
+            name (str): metric name.
+            value (float): observed value, e.g. seconds.
+            labels (dict): label values.
+        """
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(self.buckets)
+            histogram.observe(value)
+
+    def counter(self, name, **labels):
+        """Value of a counter, 0 if never increased."""
+        return self._counters.get((name, _labels(labels)), 0)
+
+    def to_dict(self):
+        """Collected values.
+
+        Returns:
+            dict: ``counters`` and ``histograms`` lists of dicts with
+            ``name``, ``labels`` and the values.
+        """
+        with self._lock:
+            counters = [{'name': name, 'labels': dict(labels),
+                         'value': value}
+                        for (name, labels), value in
+                        sorted(self._counters.items())]
+            histograms = [{'name': name, 'labels': dict(labels),
+                           'buckets': list(self.buckets),
+                           'counts': list(h.counts), 'sum': h.sum,
+                           'count': h.count}
+                          for (name, labels), h in
+                          sorted(self._histograms.items(),
+                                 key=lambda item: item[0])]
+        return {'counters': counters, 'histograms': histograms}
+
+    def to_prometheus(self):
+        """Collected values in the Prometheus text exposition format.
+
+        Returns:
+            str: one sample per line.
+        """
+        lines = []
+        typed = set()
+        data = self.to_dict()
+        for counter in data['counters']:
+            name = counter['name']
+            if name not in typed:
+                typed.add(name)
+                lines.append('# TYPE {} counter'.format(name))
+            lines.append('{}{} {}'.format(
+                name, _prometheus_labels(sorted(counter['labels'].items())),
+                counter['value']))
+        for histogram in data['histograms']:
+            name = histogram['name']
+            labels = sorted(histogram['labels'].items())
+            if name not in typed:
+                typed.add(name)
+                lines.append('# TYPE {} histogram'.format(name))
+            total = 0
+            bounds = ['{!r}'.format(b) for b in histogram['buckets']]
+            for bound, count in zip(bounds + ['+Inf'], histogram['counts']):
+                total += count
+                lines.append('{}_bucket{} {}'.format(
+                    name, _prometheus_labels(labels, [('le', bound)]),
+                    total))
+            lines.append('{}_sum{} {!r}'.format(
+                name, _prometheus_labels(labels), histogram['sum']))
+            lines.append('{}_count{} {}'.format(
+                name, _prometheus_labels(labels), histogram['count']))
+        return '\n'.join(lines) + '\n' if lines else ''
+
+
+METRICS = Metrics()
+
+
+def enable():
+    """Start collecting into the shared :data:`METRICS` registry."""
+    METRICS.enable()
+
+
+def disable():
+    """Stop collecting into the shared :data:`METRICS` registry."""
+    METRICS.disable()
+
+
+def _size(result):
+    """Readings in a batch result, the first item of a tuple."""
+    if isinstance(result, tuple):
+        result = result[0]
+    return getattr(result, 'size', 1)
+
+
+def instrument(fn):
+    """Count the calls of ``fn`` and time them into :data:`METRICS`.
+
+    Args:
+        fn (callable): batch function, its name is the ``func`` label.
+
+    Returns:
+        callable: wrapped function.
+    """
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not METRICS.enabled:
+            return fn(*args, **kwargs)
+        METRICS.inc('labwelfare_calls_total', func=name)
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        METRICS.observe('labwelfare_batch_seconds',
+                        time.perf_counter() - start, func=name)
+        METRICS.inc('labwelfare_readings_total', _size(result), func=name)
+        return result
+    return wrapper
+
+
+def reject(reason, count=1):
+    """Count rejected readings into :data:`METRICS` when enabled.
+
+    Args:
+        reason (str): rejection reason label.
+        count (int): readings rejected.
+    """
+    if METRICS.enabled:
+        METRICS.inc('labwelfare_rejected_total', count, reason=reason)
@@ -0,0 +1,260 @@
+#
+# Copyright (c) Murilo Ijanc' <mbsd@m0x.ru>
+#
+# Permission to use, copy, modify, and distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+"""Module that computes heat load on many cores.
+
+Inputs are split into shards that run on a ``ProcessPoolExecutor``. Arrays
+travel through memory-mapped buffers in a temporary directory: the workers
+map the same pages as the parent, so only the buffer locations and shard
+bounds are pickled. Every shard runs the serial code of
+:mod:`labwelfare.batch` and :mod:`labwelfare.ahl`, and shard bounds are
+aligned so vectorized loops see the same element blocks as a serial run,
+which keeps the results identical to the serial path.
+"""
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from . import batch, io
+from .ahl import DEFAULT_LOWER_THRESHOLD, ahl_series
+from .heat_load import DEFAULT_THRESHOLD, HLIResult
+
+# shard bounds are multiples of this many elements.
+SHARD_ALIGN = 8192
+# below this many elements the serial path is used.
+MIN_PARALLEL_SIZE = 4 * SHARD_ALIGN
+
+
+def _tmp_dir():
+    # prefer RAM backed storage for the buffers when the system has it.
+    return '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+def _buffer(directory, name, dtype, shape, value=None):
+    """Create a memory-mapped buffer and return its spec."""
+    spec = (os.path.join(directory, name + '.buf'), np.dtype(dtype).str,
+            tuple(shape))
+    array = np.memmap(spec[0], dtype=spec[1], mode='w+', shape=spec[2])
+    if value is not None:
+        array[...] = value
+    array.flush()
+    return spec
+
+
+def _open(spec, mode='r'):
+    path, dtype, shape = spec
+    return np.memmap(path, dtype=dtype, mode=mode, shape=shape)
+
+
+def _bounds(size, shards, align=SHARD_ALIGN):
+    """Aligned ``(start, stop)`` bounds of at most ``shards`` shards."""
+    step = -(-size // shards)
+    step = max(align, -(-step // align) * align)
+    return [(start, min(start + step, size))
+            for start in range(0, size, step)]
+
+
+def _workers(workers):
+    return workers or os.cpu_count() or 1
+
+
+def _hli_shard(task):
+    inputs, scalars, outputs, start, stop = task
+    kwargs = dict(scalars)
+    kwargs.update((name, _open(spec)[start:stop])
+                  for name, spec in inputs.items())
+    indicator = 'indicator' in outputs
+    try:
+        h, ind = batch.hli(indicator, **kwargs)
+    except ValueError as error:
+        if not hasattr(error, 'indices'):
+            raise
+        # report positions in the whole input, not in the shard.
+        raise batch.negative_error(
+            error.names, [i + start for i in error.indices], error.reason)
+
+    for name, values in (('hli', h), ('indicator', ind)):
+        if name in outputs:
+            out = _open(outputs[name], 'r+')
+            out[start:stop] = np.ma.getdata(values)
+            out.flush()
+    if 'mask' in outputs:
+        out = _open(outputs['mask'], 'r+')
+        out[start:stop] = np.ma.getmaskarray(h)
+        out.flush()
+
+
+def hli(indicator=False, threshold=DEFAULT_THRESHOLD, on_invalid='raise',
+        dtype=np.float64, workers=None, shards=None, **kwargs):
+    """Heat load index over arrays on many processes.
+
+    Same arguments and results as :func:`labwelfare.batch.hli`.
+
+    Args:
+        indicator (bool): if true also classify the heat load index.
+        threshold (array_like): threshold value or values.
+        on_invalid (str): policy for invalid readings, see
+                          ``batch.ON_INVALID``.
+        dtype (numpy.dtype): compute dtype, see ``batch.DTYPES``.
+        workers (int): worker processes, all cores by default.
+        shards (int): number of shards, ``workers`` by default.
+        kwargs (dict): reading arrays keyed like the scalar ``hli``.
+
+    Returns:
+        HLIResult: (heat load index array, indicator array or None).
+    """
+    kwargs['threshold'] = threshold
+    arrays = {name: np.asarray(value) for name, value in kwargs.items()}
+    shape = np.broadcast(*arrays.values()).shape
+    size = int(np.prod(shape))
+    workers = _workers(workers)
+    if workers == 1 or size < MIN_PARALLEL_SIZE:
+        return batch.hli(indicator, on_invalid=on_invalid, dtype=dtype,
+                         **kwargs)
+
+    directory = tempfile.mkdtemp(prefix='labwelfare-', dir=_tmp_dir())
+    try:
+        inputs, scalars = {}, {'on_invalid': on_invalid, 'dtype': dtype}
+        for name, value in arrays.items():
+            if value.ndim == 0:
+                scalars[name] = value[()]
+                continue
+            try:
+                value = np.broadcast_to(np.asarray(value, np.float64), shape)
+            except ValueError:
+                # let the serial path handle non-numeric readings.
+                return batch.hli(indicator, on_invalid=on_invalid,
+                                 dtype=dtype, **kwargs)
+            inputs[name] = _buffer(directory, name, np.float64, (size,),
+                                   value.reshape(-1))
+        outputs = {'hli': _buffer(directory, 'hli', dtype, (size,))}
+        if indicator:
+            outputs['indicator'] = _buffer(directory, 'indicator', np.uint8,
+                                           (size,))
+        if on_invalid == 'mask':
+            outputs['mask'] = _buffer(directory, 'mask', np.bool_, (size,))
+
+        tasks = [(inputs, scalars, outputs, start, stop)
+                 for start, stop in _bounds(size, shards or workers)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_hli_shard, tasks))
+
+        results = {name: np.array(_open(spec)).reshape(shape)
+                   for name, spec in outputs.items()}
+        mask = results.pop('mask', None)
+        if mask is not None:
+            results = {name: np.ma.masked_array(values, mask.copy())
+                       for name, values in results.items()}
+        return HLIResult(results['hli'], results.get('indicator'))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def _ahl_shard(task):
+    hli_spec, out_spec, params, start, stop = task
+    params = {name: value[start:stop] if np.ndim(value) else value
+              for name, value in params.items()}
+    out = _open(out_spec, 'r+')
+    out[:, start:stop] = ahl_series(_open(hli_spec)[:, start:stop],
+                                    **params)
+    out.flush()
+
+
+def ahl(hli, upper=DEFAULT_THRESHOLD, lower=DEFAULT_LOWER_THRESHOLD,
+        hours=1.0, initial=0.0, workers=None, shards=None):
+    """Accumulated heat load of many pens on many processes.
+
+    Pens are independent, so shards split the pen axis and each runs
+    :func:`labwelfare.ahl.ahl_series` over its columns.
+
+    Args:
+        hli (array_like): heat load index, shape ``(readings, pens)``.
+        upper (array_like): upper threshold, scalar or one per pen.
+        lower (array_like): lower threshold, scalar or one per pen.
+        hours (float): hours covered by each reading.
+        initial (array_like): starting load, scalar or one per pen.
+        workers (int): worker processes, all cores by default.
+        shards (int): number of shards, ``workers`` by default.
+
+    Returns:
+        numpy.ndarray: accumulated heat load, shape ``(readings, pens)``.
+    """
+    hli = np.asarray(hli, dtype=np.float64)
+    params = {'upper': upper, 'lower': lower, 'hours': hours,
+              'initial': initial}
+    workers = _workers(workers)
+    if hli.ndim != 2 or workers == 1 or hli.size < MIN_PARALLEL_SIZE:
+        return ahl_series(hli, **params)
+
+    directory = tempfile.mkdtemp(prefix='labwelfare-', dir=_tmp_dir())
+    try:
+        hli_spec = _buffer(directory, 'hli', np.float64, hli.shape, hli)
+        out_spec = _buffer(directory, 'ahl', np.float64, hli.shape)
+        params = {name: np.asarray(value, dtype=np.float64)
+                  for name, value in params.items()}
+        pens = hli.shape[1]
+        tasks = [(hli_spec, out_spec, params, start, stop)
+                 for start, stop in _bounds(pens, shards or workers, 1)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_ahl_shard, tasks))
+        return np.array(_open(out_spec))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def _file_shard(task):
+    number, path, out_dir, kwargs = task
+    chunks = list(io.iter_hli(path, **kwargs))
+    # the position keeps logs of the same name in other directories apart.
+    stem = '{}.{}'.format(number,
+                          os.path.splitext(os.path.basename(path))[0])
+    outputs = []
+    for column, dtype in ((0, np.float64), (1, np.uint8)):
+        values = np.concatenate([np.ma.getdata(c[column])
+                                 for c in chunks]) if chunks \
+            else np.empty(0, dtype=dtype)
+        name = os.path.join(out_dir, '{}.{}.npy'.format(
+            stem, ('hli', 'indicator')[column]))
+        np.save(name, values.astype(dtype, copy=False))
+        outputs.append(name)
+    return tuple(outputs)
+
+
+def hli_files(paths, out_dir, workers=None, **kwargs):
+    """Heat load index of many weather logs on many processes.
+
+    Each worker streams one file through :func:`labwelfare.io.iter_hli` and
+    writes ``<n>.<name>.hli.npy`` and ``<n>.<name>.indicator.npy`` to
+    ``out_dir``, ``n`` being the position of the file in ``paths``, which
+    the parent maps back without copying.
+
+    Args:
+        paths (list): CSV or XLSX files.
+        out_dir (str): directory for the result files.
+        workers (int): worker processes, all cores by default.
+        kwargs (dict): arguments of :func:`labwelfare.io.iter_hli`.
+
+    Returns:
+        list: (heat load index, indicator) memory-mapped arrays per file.
+    """
+    tasks = [(number, path, out_dir, kwargs)
+             for number, path in enumerate(paths)]
+    with ProcessPoolExecutor(max_workers=_workers(workers)) as pool:
+        names = list(pool.map(_file_shard, tasks))
+    return [(np.load(h, mmap_mode='r'), np.load(ind, mmap_mode='r'))
+            for h, ind in names]
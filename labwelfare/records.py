@@ -0,0 +1,198 @@
+#
+# Copyright (c) Murilo Ijanc' <mbsd@m0x.ru>
+#
+# Permission to use, copy, modify, and distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+"""Module with compact record types for readings and results.
+
+* :class:`Reading` holds one reading in ``__slots__``, 88 bytes against
+  192 for a kwargs dict of three readings, and goes to
+  :func:`labwelfare.heat_load.hli` as ``reading=``.
+* :class:`labwelfare.heat_load.HLIResult` is the named (hli, indicator)
+  tuple returned by the ``hli`` functions.
+* :class:`ReadingBatch` holds many readings as one contiguous array per
+  field, 8 bytes per field and reading in float64 without any per
+  reading float object, and goes to
+  :func:`labwelfare.batch.hli` as ``readings=``.
+"""
+import logging
+
+import numpy as np
+
+from .heat_load import DEFAULT_THRESHOLD, HLIResult
+
+__all__ = ['HLIResult', 'Reading', 'ReadingBatch']
+
+LOGGER = logging.getLogger(__name__)
+FIELDS = ('rel_hum', 'wind_speed', 'bg_temp', 'air_temp', 'solar_rad')
+
+
+class Reading(object):
+    """One reading.
+
+    Pass ``bg_temp`` when measured, otherwise ``air_temp`` and
+    ``solar_rad``.
+
+    Args:
+        rel_hum (float): relative humidity (%).
+        wind_speed (float): wind speed (km/h).
+        bg_temp (float): black globe temperature (°C).
+        air_temp (float): air temperature (°C).
+        solar_rad (float): solar radiation value.
+        threshold (float): threshold value.
+    """
+    __slots__ = FIELDS + ('threshold',)
+
+    def __init__(self, rel_hum, wind_speed, bg_temp=None, air_temp=None,
+                 solar_rad=None, threshold=DEFAULT_THRESHOLD):
+        self.rel_hum = rel_hum
+        self.wind_speed = wind_speed
+        self.bg_temp = bg_temp
+        self.air_temp = air_temp
+        self.solar_rad = solar_rad
+        self.threshold = threshold
+
+    def _values(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other):
+        if not isinstance(other, Reading):
+            return NotImplemented
+        return self._values() == other._values()
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __repr__(self):
+        return 'Reading({})'.format(', '.join(
+            '{}={!r}'.format(name, value) for name, value in
+            zip(self.__slots__, self._values()) if value is not None))
+
+
+def _column(value, size, dtype):
+    if value is None:
+        return None
+    return np.ascontiguousarray(np.broadcast_to(value, (size,)),
+                                dtype=dtype)
+
+
+class ReadingBatch(object):
+    """Many readings as contiguous columns.
+
+    Rows without a black globe temperature have NaN ``bg_temp`` and are
+    evaluated from ``air_temp`` and ``solar_rad``; columns not given are
+    None.
+
+    Args:
+        rel_hum (array_like): relative humidity (%).
+        wind_speed (array_like): wind speed (km/h).
+        bg_temp (array_like): black globe temperature (°C).
+        air_temp (array_like): air temperature (°C).
+        solar_rad (array_like): solar radiation value.
+        threshold (array_like): threshold value or one per reading.
+        dtype (numpy.dtype): dtype of the columns, see
+                             :data:`labwelfare.batch.DTYPES`.
+
+    Raises:
+        ValueError: If neither bg_temp nor air_temp and solar_rad are
+                    given, or the columns do not broadcast to one length.
+    """
+    __slots__ = FIELDS + ('threshold',)
+
+    def __init__(self, rel_hum, wind_speed, bg_temp=None, air_temp=None,
+                 solar_rad=None, threshold=DEFAULT_THRESHOLD,
+                 dtype=np.float64):
+        if bg_temp is None and (air_temp is None or solar_rad is None):
+            LOGGER.error('Must have bg_temp or air_temp and solar_rad')
+            raise ValueError('Must have bg_temp or air_temp and solar_rad')
+        given = [value for value in
+                 (rel_hum, wind_speed, bg_temp, air_temp, solar_rad)
+                 if value is not None]
+        try:
+            # np.broadcast_shapes needs numpy 1.20.
+            shape = np.broadcast(*given).shape
+        except ValueError:
+            LOGGER.error('Columns must have one length')
+            raise ValueError('Columns must have one length')
+        if len(shape) > 1:
+            LOGGER.error('Columns must be one-dimensional')
+            raise ValueError('Columns must be one-dimensional')
+        size = shape[0] if shape else 1
+        self.rel_hum = _column(rel_hum, size, dtype)
+        self.wind_speed = _column(wind_speed, size, dtype)
+        self.bg_temp = _column(bg_temp, size, dtype)
+        self.air_temp = _column(air_temp, size, dtype)
+        self.solar_rad = _column(solar_rad, size, dtype)
+        self.threshold = threshold if np.ndim(threshold) == 0 else \
+            _column(threshold, size, dtype)
+
+    @classmethod
+    def from_readings(cls, readings, dtype=np.float64):
+        """Batch of :class:`Reading` objects.
+
+        Args:
+            readings (iterable): readings.
+            dtype (numpy.dtype): dtype of the columns.
+
+        Returns:
+            ReadingBatch: one row per reading, in order.
+        """
+        readings = list(readings)
+        nan = float('nan')
+        columns = {}
+        for name in FIELDS:
+            values = [getattr(r, name) for r in readings]
+            if any(value is not None for value in values):
+                columns[name] = np.array(
+                    [nan if value is None else value for value in values],
+                    dtype=dtype)
+        threshold = [r.threshold for r in readings]
+        if len(set(threshold)) > 1:
+            columns['threshold'] = np.array(threshold, dtype=dtype)
+        elif threshold:
+            columns['threshold'] = threshold[0]
+        if not readings:
+            columns.update(rel_hum=np.empty(0, dtype=dtype),
+                           wind_speed=np.empty(0, dtype=dtype),
+                           bg_temp=np.empty(0, dtype=dtype))
+        return cls(dtype=dtype, **columns)
+
+    def __len__(self):
+        return len(self.rel_hum)
+
+    def __getitem__(self, index):
+        """:class:`Reading` of a row, absent values None."""
+        values = {}
+        for name in FIELDS:
+            column = getattr(self, name)
+            if column is not None and not np.isnan(column[index]):
+                values[name] = column[index].item()
+        threshold = self.threshold if np.ndim(self.threshold) == 0 else \
+            self.threshold[index].item()
+        return Reading(threshold=threshold, **values)
+
+    @property
+    def nbytes(self):
+        """int: bytes held by the columns."""
+        return sum(getattr(self, name).nbytes for name in self.__slots__
+                   if isinstance(getattr(self, name), np.ndarray))
+
+    def columns(self):
+        """Given columns keyed like :func:`labwelfare.batch.hli`.
+
+        Returns:
+            dict: column name to array, None columns left out.
+        """
+        return {name: getattr(self, name) for name in FIELDS
+                if getattr(self, name) is not None}
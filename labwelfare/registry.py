@@ -0,0 +1,173 @@
+#
+# Copyright (c) Murilo Ijanc' <mbsd@m0x.ru>
+#
+# Permission to use, copy, modify, and distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+"""Module that registers heat load thresholds per pen.
+
+Gaughan et al. (2008) set the upper heat load index threshold of 86 for
+unshaded British Bos taurus cattle and raise it for more heat tolerant
+genotypes and for shade. The registry maps pens to those adjustments and
+compiles them into a threshold array aligned with a pen index, ready for
+:func:`labwelfare.batch.hli_indicator` or
+:class:`labwelfare.ahl.AHLAccumulator` over mixed herds.
+
+The default tables can be replaced through the registry arguments. No
+days on feed adjustment is applied unless a table is given.
+"""
+import logging
+
+import numpy as np
+
+from .heat_load import DEFAULT_THRESHOLD
+
+LOGGER = logging.getLogger(__name__)
+
+# threshold adjustment per genotype.
+GENOTYPES = {
+    'bos_taurus_british': 0,
+    'bos_taurus_european': 3,
+    'bos_indicus_25': 3,
+    'bos_indicus_50': 6,
+    'bos_indicus_75': 7,
+    'bos_indicus_100': 10,
+}
+DEFAULT_GENOTYPE = 'bos_taurus_british'
+# (minimum shade area in m2 per head, adjustment), increasing areas.
+SHADE = ((0.0, 0), (2.0, 3), (3.0, 5), (4.7, 7))
+# (minimum days on feed, adjustment), increasing days.
+DAYS_ON_FEED = ((0, 0),)
+
+
+def _step(table, value):
+    """Adjustment of the last table row whose minimum is <= value."""
+    lows = [low for low, _ in table]
+    i = np.searchsorted(lows, value, side='right') - 1
+    return table[max(i, 0)][1]
+
+
+class ThresholdRegistry(object):
+    """Upper heat load thresholds of pens.
+
+    Args:
+        base (float): threshold before adjustments.
+        genotypes (dict): genotype name to adjustment.
+        shade (tuple): (minimum m2 per head, adjustment) rows.
+        days_on_feed (tuple): (minimum days, adjustment) rows.
+    """
+
+    def __init__(self, base=DEFAULT_THRESHOLD, genotypes=None, shade=SHADE,
+                 days_on_feed=DAYS_ON_FEED):
+        self.base = base
+        self.genotypes = GENOTYPES if genotypes is None else genotypes
+        self.shade = shade
+        self.days_on_feed = days_on_feed
+        self._pens = {}
+        self._compiled = None
+
+    def __len__(self):
+        return len(self._pens)
+
+    def __contains__(self, pen):
+        return pen in self._pens
+
+    def register(self, pen, genotype=DEFAULT_GENOTYPE, shade_area=0.0,
+                 days_on_feed=0, adjustment=0.0):
+        """Register or update a pen.
+
+        Args:
+            pen (str): pen identifier.
+            genotype (str): key of the genotype table.
+            shade_area (float): shade in m2 per head.
+            days_on_feed (int): days on feed.
+            adjustment (float): extra site specific adjustment.
+
+        Returns:
+            float: threshold of the pen.
+
+        Raises:
+            ValueError: If the genotype is unknown.
+        """
+        if genotype not in self.genotypes:
+            LOGGER.error('Unknown genotype: %s', genotype)
+            raise ValueError('Unknown genotype: {}'.format(genotype))
+        threshold = self.base + self.genotypes[genotype] + \
+            _step(self.shade, shade_area) + \
+            _step(self.days_on_feed, days_on_feed) + adjustment
+        self._pens[pen] = float(threshold)
+        self._compiled = None
+        return self._pens[pen]
+
+    def threshold(self, pen):
+        """Threshold of a registered pen.
+
+        Args:
+            pen (str): pen identifier.
+
+        Returns:
+            float: threshold value.
+        """
+        return self._pens[pen]
+
+    def compile(self):
+        """Pen index and aligned threshold array, cached until a change.
+
+        Returns:
+            tuple: (sorted pen identifiers array, float64 thresholds array).
+        """
+        if self._compiled is None:
+            pens = np.array(sorted(self._pens))
+            thresholds = np.array([self._pens[pen] for pen in pens.tolist()],
+                                  dtype=np.float64)
+            pens.setflags(write=False)
+            thresholds.setflags(write=False)
+            self._compiled = (pens, thresholds)
+        return self._compiled
+
+    def index(self, pens):
+        """Positions of pens in the compiled index.
+
+        Args:
+            pens (array_like): pen identifiers.
+
+        Returns:
+            numpy.ndarray: positions, aligned with ``pens``.
+
+        Raises:
+            KeyError: If a pen is not registered.
+        """
+        keys, _ = self.compile()
+        pens = np.asarray(pens)
+        pos = np.searchsorted(keys, pens)
+        found = pos < len(keys)
+        found[found] = keys[pos[found]] == pens[found]
+        if not found.all():
+            unknown = np.unique(pens[~found]).tolist()
+            LOGGER.error('Unknown pens: %s', unknown)
+            raise KeyError('Unknown pens: {}'.format(unknown))
+        return pos
+
+    def thresholds(self, pens=None):
+        """Threshold array aligned with ``pens``.
+
+        Args:
+            pens (array_like): pen identifiers, e.g. one per reading; the
+                               compiled index order when None.
+
+        Returns:
+            numpy.ndarray: float64 thresholds.
+        """
+        keys, thresholds = self.compile()
+        if pens is None:
+            return thresholds
+        return thresholds[self.index(pens)]
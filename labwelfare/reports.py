@@ -0,0 +1,201 @@
+#
+# Copyright (c) Murilo Ijanc' <mbsd@m0x.ru>
+#
+# Permission to use, copy, modify, and distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+"""Module that reports heat load history of pens.
+
+Readings come in long format: one array of pens, one of timestamps
+(seconds) and one of heat load index values, in any order. They are sorted
+once by pen and timestamp and every aggregate is a vectorized group
+reduction over the sorted arrays, without a Python loop per pen or window.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from . import batch
+from .heat_load import DEFAULT_THRESHOLD, Indicator
+
+HOUR = 3600
+DAY = 24 * HOUR
+INDICATORS = len(Indicator)
+
+WindowReport = namedtuple(
+    'WindowReport', 'pen start max mean count hours hours_above')
+WindowReport.__doc__ = """Aggregates per pen and calendar window.
+
+Attributes:
+    pen (numpy.ndarray): pen of each row.
+    start (numpy.ndarray): window start timestamp of each row.
+    max (numpy.ndarray): maximum heat load index.
+    mean (numpy.ndarray): mean heat load index.
+    count (numpy.ndarray): number of valid readings.
+    hours (numpy.ndarray): hours in each ``Indicator`` class, shape
+                           ``(rows, 5)``, column ``i`` for value ``i + 1``.
+    hours_above (numpy.ndarray): hours above the threshold.
+"""
+
+
+def _sorted(pen, timestamp, *columns):
+    """Sort readings by pen and timestamp."""
+    pen = np.asarray(pen)
+    timestamp = np.asarray(timestamp, dtype=np.int64)
+    order = np.lexsort((timestamp, pen))
+    out = [pen[order], timestamp[order], order]
+    for column in columns:
+        column = np.asarray(column)
+        out.append(column[order] if column.ndim else column)
+    return out
+
+
+def window_report(pen, timestamp, hli, window=DAY,
+                  threshold=DEFAULT_THRESHOLD, sample_hours=1.0, offset=0):
+    """Aggregate heat load index per pen and calendar window.
+
+    Windows are ``[k * window - offset, (k + 1) * window - offset)``, so
+    ``offset`` shifts the day boundary, e.g. for the farm time zone.
+    Readings with NaN heat load index are ignored.
+
+    Args:
+        pen (array_like): pen of each reading.
+        timestamp (array_like): reading time in seconds.
+        hli (array_like): heat load index of each reading.
+        window (int): window length in seconds.
+        threshold (array_like): threshold value or one per reading.
+        sample_hours (array_like): hours covered by each reading.
+        offset (int): seconds added to timestamps before binning.
+
+    Returns:
+        WindowReport: one row per pen and window with readings, sorted by
+        pen and window.
+    """
+    pen, timestamp, _, hli, threshold, sample_hours = _sorted(
+        pen, timestamp, np.asarray(hli, dtype=np.float64), threshold,
+        np.asarray(sample_hours, dtype=np.float64))
+    size = len(hli)
+    if not size:
+        empty = np.empty(0)
+        return WindowReport(pen, timestamp, empty, empty,
+                            np.empty(0, dtype=np.int64),
+                            np.empty((0, INDICATORS)), empty)
+
+    win = (timestamp + offset) // window
+    first = np.empty(size, dtype=bool)
+    first[0] = True
+    first[1:] = (pen[1:] != pen[:-1]) | (win[1:] != win[:-1])
+    starts = np.flatnonzero(first)
+    group = np.cumsum(first) - 1
+    groups = len(starts)
+
+    valid = ~np.isnan(hli)
+    values = np.where(valid, hli, 0.0)
+    hours = np.broadcast_to(sample_hours, hli.shape) * valid
+
+    count = np.bincount(group, weights=valid, minlength=groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(group, weights=values, minlength=groups) / count
+    high = np.maximum.reduceat(np.where(valid, hli, -np.inf), starts)
+    high[count == 0] = np.nan
+
+    ind = batch.hli_indicator(values, threshold)
+    by_class = np.bincount(
+        group * INDICATORS + (ind.astype(np.int64) - 1), weights=hours,
+        minlength=groups * INDICATORS).reshape(groups, INDICATORS)
+    above = np.bincount(group, weights=hours * (hli > threshold),
+                        minlength=groups)
+
+    return WindowReport(pen[starts], win[starts] * window - offset, high,
+                        mean, count.astype(np.int64), by_class, above)
+
+
+def daily_report(pen, timestamp, hli, threshold=DEFAULT_THRESHOLD,
+                 sample_hours=1.0, offset=0):
+    """Daily aggregates, see :func:`window_report`."""
+    return window_report(pen, timestamp, hli, DAY, threshold, sample_hours,
+                         offset)
+
+
+def hourly_report(pen, timestamp, hli, threshold=DEFAULT_THRESHOLD,
+                  sample_hours=1.0):
+    """Hourly aggregates, see :func:`window_report`."""
+    return window_report(pen, timestamp, hli, HOUR, threshold, sample_hours)
+
+
+def _rolling_sum(pen, timestamp, columns, window):
+    """Trailing ``(t - window, t]`` sums per pen in sorted order."""
+    first = np.empty(len(pen), dtype=bool)
+    first[:1] = True
+    first[1:] = pen[1:] != pen[:-1]
+    # pens are laid out on disjoint bands of one increasing key, so one
+    # searchsorted finds the window start of every reading.
+    band = int(timestamp.max() - timestamp.min()) + int(window) + 1
+    key = (np.cumsum(first) - 1) * band + (timestamp - timestamp.min())
+    left = np.searchsorted(key, key - window, side='right')
+    sums = []
+    for column in columns:
+        total = np.concatenate(([0.0], np.cumsum(column)))
+        sums.append(total[1:] - total[left])
+    return sums
+
+
+def rolling_mean(pen, timestamp, hli, window=DAY):
+    """Trailing mean heat load index of each reading over ``window``.
+
+    Args:
+        pen (array_like): pen of each reading.
+        timestamp (array_like): reading time in seconds.
+        hli (array_like): heat load index of each reading.
+        window (int): window length in seconds.
+
+    Returns:
+        numpy.ndarray: mean over ``(t - window, t]`` of the same pen, in
+        the input order.
+    """
+    pen, timestamp, order, hli = _sorted(
+        pen, timestamp, np.asarray(hli, dtype=np.float64))
+    out = np.empty(len(hli))
+    if len(hli):
+        valid = ~np.isnan(hli)
+        total, count = _rolling_sum(pen, timestamp,
+                                    [np.where(valid, hli, 0.0), valid],
+                                    window)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out[order] = total / count
+    return out
+
+
+def rolling_hours_above(pen, timestamp, hli, window=DAY,
+                        threshold=DEFAULT_THRESHOLD, sample_hours=1.0):
+    """Trailing hours above the threshold of each reading over ``window``.
+
+    Args:
+        pen (array_like): pen of each reading.
+        timestamp (array_like): reading time in seconds.
+        hli (array_like): heat load index of each reading.
+        window (int): window length in seconds.
+        threshold (array_like): threshold value or one per reading.
+        sample_hours (array_like): hours covered by each reading.
+
+    Returns:
+        numpy.ndarray: hours above the threshold in ``(t - window, t]`` of
+        the same pen, in the input order.
+    """
+    pen, timestamp, order, hli, threshold, sample_hours = _sorted(
+        pen, timestamp, np.asarray(hli, dtype=np.float64), threshold,
+        np.asarray(sample_hours, dtype=np.float64))
+    out = np.empty(len(hli))
+    if len(hli):
+        above = np.broadcast_to(sample_hours, hli.shape) * (hli > threshold)
+        out[order], = _rolling_sum(pen, timestamp, [above], window)
+    return out
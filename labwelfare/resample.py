@@ -0,0 +1,185 @@
+#
+# Copyright (c) Murilo Ijanc' <mbsd@m0x.ru>
+#
+# Permission to use, copy, modify, and distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+"""Module that aligns irregular sensor series onto a fixed time grid.
+
+Stations report at irregular intervals and drop out. :func:`resample`
+interpolates each reading column linearly onto ``start + k * step``, never
+across a gap longer than ``max_gap`` and never past the first or last
+reading; those grid points are NaN. The columns come back keyed like the
+:mod:`labwelfare.batch` arguments, so they go straight into
+``batch.hli(on_invalid='nan', **columns)``, see :func:`hli`.
+
+Each column costs one ``searchsorted`` of the grid into its valid readings
+plus a few array operations, O((n + m) log n) for n readings and m grid
+points, without a Python loop over either.
+"""
+import logging
+
+import numpy as np
+
+from . import batch
+from .heat_load import DEFAULT_THRESHOLD
+
+LOGGER = logging.getLogger(__name__)
+HOUR = 3600
+# longest gap interpolated across, in seconds.
+DEFAULT_MAX_GAP = HOUR
+
+
+def grid(first, last, step=HOUR, offset=0):
+    """Grid points covering ``[first, last]``.
+
+    Points are ``k * step - offset``, so ``offset`` shifts them like in
+    :func:`labwelfare.reports.window_report`.
+
+    Args:
+        first (int): first timestamp in seconds.
+        last (int): last timestamp in seconds.
+        step (int): grid spacing in seconds.
+        offset (int): seconds added to timestamps before aligning.
+
+    Returns:
+        numpy.ndarray: int64 grid timestamps.
+    """
+    start = -((-(first + offset)) // step) * step - offset
+    return np.arange(start, last + 1, step, dtype=np.int64)
+
+
+def _interpolate(timestamp, values, points, max_gap):
+    """Bounded linear interpolation of one column at ``points``."""
+    valid = ~np.isnan(values)
+    if not valid.all():
+        timestamp, values = timestamp[valid], values[valid]
+    out = np.full(len(points), np.nan)
+    if not len(timestamp):
+        return out
+    right = np.searchsorted(timestamp, points)
+    inside = (right < len(timestamp)) & (points >= timestamp[0])
+    right = right[inside]
+    t1 = timestamp[right]
+    v1 = values[right]
+    exact = t1 == points[inside]
+    left = np.maximum(right - 1, 0)
+    t0 = timestamp[left]
+    v0 = values[left]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weight = (points[inside] - t0) / (t1 - t0)
+    result = np.where(exact, v1, v0 + weight * (v1 - v0))
+    result[~exact & (t1 - t0 > max_gap)] = np.nan
+    out[inside] = result
+    return out
+
+
+def resample(timestamp, step=HOUR, max_gap=DEFAULT_MAX_GAP, start=None,
+             stop=None, offset=0, **columns):
+    """Align reading columns of one series onto a fixed grid.
+
+    NaN readings are dropped per column, so a sensor dropout only widens
+    the gaps of its own column. Duplicate timestamps keep the last reading.
+
+    Args:
+        timestamp (array_like): reading time in seconds, any order.
+        step (int): grid spacing in seconds.
+        max_gap (int): longest gap between readings interpolated across.
+        start (int): first grid point, the first reading aligned on the
+                     grid when None.
+        stop (int): last grid point, at most the last reading when None.
+                    Without readings the grid is empty unless both
+                    ``start`` and ``stop`` are given, then every column
+                    is NaN over it.
+        offset (int): seconds added to timestamps before aligning, see
+                      :func:`grid`.
+        columns (dict): reading arrays, e.g. ``bg_temp``, ``air_temp``,
+                        ``solar_rad``, ``rel_hum`` and ``wind_speed``.
+
+    Returns:
+        tuple: (int64 grid timestamps, dict of float64 arrays keyed like
+        ``columns``).
+
+    Raises:
+        ValueError: If step is not positive, or a column is not numeric or
+                    not of the length of timestamp.
+    """
+    if step <= 0:
+        LOGGER.error('step must be positive')
+        raise ValueError('step must be positive')
+    timestamp = np.asarray(timestamp, dtype=np.int64).ravel()
+    size = len(timestamp)
+    arrays = {}
+    for name, value in columns.items():
+        try:
+            array = np.asarray(value, dtype=np.float64).ravel()
+        except (TypeError, ValueError):
+            LOGGER.error('Column %s must be numeric', name)
+            raise ValueError('Column {} must be numeric'.format(name))
+        if len(array) != size:
+            LOGGER.error('Column %s must have %d readings', name, size)
+            raise ValueError(
+                'Column {} must have {} readings'.format(name, size))
+        arrays[name] = array
+
+    if size and (timestamp[1:] <= timestamp[:-1]).any():
+        order = np.argsort(timestamp, kind='stable')
+        timestamp = timestamp[order]
+        keep = np.ones(size, dtype=bool)
+        keep[:-1] = timestamp[1:] != timestamp[:-1]
+        timestamp = timestamp[keep]
+        arrays = {name: array[order][keep] for name, array in arrays.items()}
+
+    if not size and (start is None or stop is None):
+        # no reading to take the missing end of the grid from.
+        points = np.empty(0, dtype=np.int64)
+    elif start is None:
+        points = grid(timestamp[0], timestamp[-1] if stop is None else stop,
+                      step, offset)
+    else:
+        points = np.arange(start, (timestamp[-1] if stop is None else stop)
+                           + 1, step, dtype=np.int64)
+    return points, {name: _interpolate(timestamp, array, points, max_gap)
+                    for name, array in arrays.items()}
+
+
+def hli(timestamp, step=HOUR, max_gap=DEFAULT_MAX_GAP, indicator=False,
+        threshold=DEFAULT_THRESHOLD, start=None, stop=None, offset=0,
+        dtype=np.float64, **columns):
+    """Heat load index of an irregular series on a fixed grid.
+
+    Resamples the readings with :func:`resample` and evaluates
+    :func:`labwelfare.batch.hli` with ``on_invalid='nan'``, so grid points
+    left without readings are NaN.
+
+    Args:
+        timestamp (array_like): reading time in seconds, any order.
+        step (int): grid spacing in seconds.
+        max_gap (int): longest gap between readings interpolated across.
+        indicator (bool): if true also classify the heat load index.
+        threshold (array_like): threshold value or values.
+        start (int): first grid point, see :func:`resample`.
+        stop (int): last grid point, see :func:`resample`.
+        offset (int): seconds added to timestamps before aligning.
+        dtype (numpy.dtype): compute dtype, see
+                             :data:`labwelfare.batch.DTYPES`.
+        columns (dict): reading arrays keyed like
+                        :func:`labwelfare.batch.hli`.
+
+    Returns:
+        tuple: (grid timestamps, heat load index array, indicator array or
+        None).
+    """
+    points, resampled = resample(timestamp, step, max_gap, start, stop,
+                                 offset, **columns)
+    h, ind = batch.hli(indicator, threshold, 'nan', dtype, **resampled)
+    return points, h, ind
@@ -0,0 +1,317 @@
+#
+# Copyright (c) Murilo Ijanc' <mbsd@m0x.ru>
+#
+# Permission to use, copy, modify, and distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+"""Module that serves heat load index over TCP.
+
+Publishers write one reading per line::
+
+    pen,bg_temp,air_temp,solar_rad,rel_hum,wind_speed
+
+leaving ``bg_temp`` empty when only air temperature and solar radiation
+are known. Readings are micro-batched until ``window_size`` lines arrived
+or ``window_ms`` passed since the first one, and each batch goes through
+the vectorized :mod:`labwelfare.batch` functions at once. A connection
+whose first line is ``SUBSCRIBE`` receives the results, one line per
+valid reading::
+
+    pen,hli,indicator
+
+and one whose first line is ``METRICS`` receives the
+:mod:`labwelfare.metrics` registry in the Prometheus text format, collected
+when the service runs with ``--metrics``.
+
+Run it with ``python -m labwelfare.serve``.
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+import numpy as np
+
+from . import batch, metrics
+from .heat_load import DEFAULT_THRESHOLD
+
+LOGGER = logging.getLogger(__name__)
+FIELDS = ('pen', 'bg_temp', 'air_temp', 'solar_rad', 'rel_hum',
+          'wind_speed')
+SUBSCRIBE = b'SUBSCRIBE'
+SCRAPE = b'METRICS'
+DEFAULT_PORT = 8804
+DEFAULT_WINDOW_SIZE = 4096
+DEFAULT_WINDOW_MS = 50
+READ_SIZE = 1 << 16
+NAN = float('nan')
+
+
+def _float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return NAN
+
+
+def _column(values):
+    """Float array of a column of byte strings, bad cells become NaN."""
+    try:
+        # float() parses bytes directly, faster than a bytes array astype.
+        return np.array([float(v) if v else NAN for v in values])
+    except ValueError:
+        return np.array([_float(v) for v in values])
+
+
+def parse(lines):
+    """Parse reading lines into columns.
+
+    Args:
+        lines (list): reading lines as bytes, without line endings.
+
+    Returns:
+        dict: ``pen`` list of bytes and float arrays of the other fields.
+    """
+    width = len(FIELDS)
+    rows = [line.split(b',', width - 1) for line in lines]
+    rows = [row + [b''] * (width - len(row)) for row in rows]
+    columns = list(zip(*rows)) if rows else [()] * width
+    parsed = {'pen': list(columns[0])}
+    for name, values in zip(FIELDS[1:], columns[1:]):
+        parsed[name] = _column(values)
+    return parsed
+
+
+def compute(lines, threshold=DEFAULT_THRESHOLD):
+    """Heat load index of a micro-batch of reading lines.
+
+    Readings with missing or negative values are dropped, black globe
+    temperature excepted; cold readings with a negative heat load index are
+    NEGLEGIBLE.
+
+    Args:
+        lines (list): reading lines as bytes.
+        threshold (float): threshold value.
+
+    Returns:
+        tuple: (pens, heat load index array, indicator array, rejected).
+    """
+    cols = parse(lines)
+    rel_hum, wind_speed = cols['rel_hum'], cols['wind_speed']
+    valid = (rel_hum >= 0) & (wind_speed >= 0)
+    with_bg = valid & ~np.isnan(cols['bg_temp'])
+    no_bg = valid & ~with_bg & (cols['air_temp'] >= 0) & \
+        (cols['solar_rad'] >= 0)
+
+    h = np.full(len(rel_hum), np.nan)
+    h[with_bg] = batch.hli_bg(cols['bg_temp'][with_bg], rel_hum[with_bg],
+                              wind_speed[with_bg])
+    h[no_bg] = batch.hli_no_bg(cols['air_temp'][no_bg], rel_hum[no_bg],
+                               cols['solar_rad'][no_bg], wind_speed[no_bg])
+
+    keep = with_bg | no_bg
+    if metrics.METRICS.enabled:
+        missing = np.isnan(rel_hum) | np.isnan(wind_speed) | \
+            (np.isnan(cols['bg_temp']) &
+             (np.isnan(cols['air_temp']) | np.isnan(cols['solar_rad'])))
+        metrics.reject('missing', int(missing.sum()))
+        metrics.reject('negative', int((~keep & ~missing).sum()))
+    pens = [pen for pen, ok in zip(cols['pen'], keep.tolist()) if ok]
+    h = h[keep]
+    return pens, h, batch.hli_indicator(h, threshold), \
+        int(len(keep) - keep.sum())
+
+
+def format_results(pens, h, ind):
+    """Result lines of a batch as one bytes payload."""
+    return b''.join(b'%s,%.2f,%d\n' % row
+                    for row in zip(pens, h.tolist(), ind.tolist()))
+
+
+class HLIService(object):
+    """Micro-batching heat load index service.
+
+    Args:
+        window_size (int): readings that trigger a batch.
+        window_ms (float): longest wait in milliseconds of a reading
+                           before its batch is computed.
+        threshold (float): threshold value.
+        queue_size (int): batches buffered per subscriber, later batches
+                          are dropped for a subscriber that falls behind.
+    """
+
+    def __init__(self, window_size=DEFAULT_WINDOW_SIZE,
+                 window_ms=DEFAULT_WINDOW_MS, threshold=DEFAULT_THRESHOLD,
+                 queue_size=1024):
+        self.window_size = window_size
+        self.window = window_ms / 1000.0
+        self.threshold = threshold
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.stats = {'readings': 0, 'rejected': 0, 'batches': 0,
+                      'dropped': 0}
+        self._pending = []
+        self._timer = None
+
+    def submit(self, lines):
+        """Queue reading lines, computing a batch once the window is full.
+
+        Called from the event loop, which runs the window timer.
+
+        Args:
+            lines (list): reading lines as bytes.
+        """
+        self._pending.extend(lines)
+        if len(self._pending) >= self.window_size:
+            self.flush()
+        elif self._pending and self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.window, self.flush)
+
+    def flush(self):
+        """Compute the pending readings and publish the results."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            lines = self._pending[:self.window_size]
+            del self._pending[:self.window_size]
+            start = time.perf_counter()
+            pens, h, ind, rejected = compute(lines, self.threshold)
+            if metrics.METRICS.enabled:
+                metrics.METRICS.observe('labwelfare_batch_seconds',
+                                        time.perf_counter() - start,
+                                        func='serve')
+                metrics.METRICS.inc('labwelfare_readings_total', len(lines),
+                                    func='serve')
+            self.stats['readings'] += len(lines)
+            self.stats['rejected'] += rejected
+            self.stats['batches'] += 1
+            if pens:
+                self.publish(format_results(pens, h, ind))
+
+    def publish(self, payload):
+        """Send a payload to every subscriber queue."""
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                self.stats['dropped'] += 1
+
+    def subscribe(self):
+        """Queue receiving the result payloads.
+
+        Returns:
+            asyncio.Queue: result payloads as bytes.
+        """
+        queue = asyncio.Queue(self.queue_size)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        """Stop sending results to a queue."""
+        self.subscribers.discard(queue)
+
+    async def handle(self, reader, writer):
+        """Serve one TCP connection, publisher or subscriber."""
+        buffered = b''
+        try:
+            first = await reader.readline()
+            if first.rstrip(b'\r\n') == SUBSCRIBE:
+                await self._serve_subscriber(reader, writer)
+                return
+            if first.rstrip(b'\r\n') == SCRAPE:
+                writer.write(metrics.METRICS.to_prometheus().encode())
+                await writer.drain()
+                return
+            buffered = first
+            while True:
+                # lines are split from large reads, readline() per reading
+                # would dominate the cost.
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    break
+                lines = (buffered + data).split(b'\n')
+                buffered = lines.pop()
+                self.submit([line.rstrip(b'\r') for line in lines if line])
+            if buffered.strip():
+                self.submit([buffered.rstrip(b'\r\n')])
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                # the peer went away first, nothing left to flush.
+                pass
+
+    async def _serve_subscriber(self, reader, writer):
+        queue = self.subscribe()
+        closed = asyncio.ensure_future(reader.read())
+        try:
+            while True:
+                get = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait(
+                    [get, closed], return_when=asyncio.FIRST_COMPLETED)
+                if get not in done:
+                    get.cancel()
+                    break
+                writer.write(get.result())
+                await writer.drain()
+        finally:
+            closed.cancel()
+            self.unsubscribe(queue)
+
+    async def start(self, host='127.0.0.1', port=DEFAULT_PORT):
+        """Start the TCP server.
+
+        Args:
+            host (str): address to bind.
+            port (int): port to bind, 0 picks a free one.
+
+        Returns:
+            asyncio.AbstractServer: listening server.
+        """
+        return await asyncio.start_server(self.handle, host, port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Heat load index micro-batching service.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--window-size', type=int,
+                        default=DEFAULT_WINDOW_SIZE)
+    parser.add_argument('--window-ms', type=float, default=DEFAULT_WINDOW_MS)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--metrics', action='store_true',
+                        help='collect metrics, served to METRICS requests')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    if args.metrics:
+        metrics.enable()
+
+    service = HLIService(args.window_size, args.window_ms, args.threshold)
+
+    async def serve():
+        server = await service.start(args.host, args.port)
+        LOGGER.info('Serving on %s', server.sockets[0].getsockname())
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
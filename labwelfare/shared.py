@@ -0,0 +1,354 @@
+#
+# Copyright (c) Murilo Ijanc' <mbsd@m0x.ru>
+#
+# Permission to use, copy, modify, and distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+#
+"""Module that shares per-pen state between processes.
+
+One writer process, e.g. the streaming computation, :meth:`creates
+<SharedState.create>` a ``multiprocessing.shared_memory`` segment holding
+the pen index, thresholds and the latest timestamp, heat load index,
+indicator and accumulated heat load of every pen. Any number of reader
+processes, e.g. web workers, :meth:`attach <SharedState.attach>` to it by
+name and read NumPy views of it: no copy per worker and no IPC round
+trip, so memory stays constant as workers are added.
+
+Writes are guarded by a sequence lock. The writer makes the sequence
+number odd, writes, and makes it even again; :meth:`SharedState.read`
+copies the rows it needs and retries while the number was odd or changed,
+so readers never block the writer nor see a half written update. This
+relies on stores becoming visible in program order, as on x86-64. Pen
+names are stored as UTF-8 of at most ``width`` bytes.
+
+Needs Python 3.8 or newer for ``multiprocessing.shared_memory``.
+"""
+import collections
+import logging
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from .heat_load import DEFAULT_THRESHOLD
+
+LOGGER = logging.getLogger(__name__)
+MAGIC = 0x4c57534831
+DEFAULT_WIDTH = 32
+# reads retried while the writer holds the lock before giving up.
+DEFAULT_RETRIES = 10000
+_HEADER = 4
+_MAGIC, _SEQ, _PENS, _WIDTH = range(_HEADER)
+# segments created by this process or the one it was forked from.
+_CREATED = set()
+_COLUMNS = (('threshold', np.float64), ('timestamp', np.int64),
+            ('hli', np.float64), ('ahl', np.float64),
+            ('indicator', np.uint8))
+
+PenState = collections.namedtuple(
+    'PenState', 'pen threshold timestamp hli ahl indicator')
+PenState.__doc__ = """Consistent copy of the state of some pens.
+
+Attributes:
+    pen (numpy.ndarray): pen identifiers.
+    threshold (numpy.ndarray): upper threshold of each pen.
+    timestamp (numpy.ndarray): time of the latest reading, 0 if none.
+    hli (numpy.ndarray): latest heat load index, NaN if none.
+    ahl (numpy.ndarray): latest accumulated heat load.
+    indicator (numpy.ndarray): latest ``Indicator`` value, 0 if none.
+"""
+
+
+def _layout(pens, width):
+    """Offsets of the header, pen names and columns, 8 byte aligned."""
+    offsets = {}
+    offset = _HEADER * 8
+    offsets['pen'] = (offset, np.dtype('S{}'.format(width)))
+    offset += pens * width
+    for name, dtype in _COLUMNS:
+        offset = -(-offset // 8) * 8
+        offsets[name] = (offset, np.dtype(dtype))
+        offset += pens * np.dtype(dtype).itemsize
+    return offsets, max(offset, 1)
+
+
+def _attach_untracked(name):
+    """Attach a segment without the resource tracker unlinking it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # before Python 3.13 every attach is tracked and unlinked at exit,
+        # unless the tracker is the one of the creator, e.g. after a fork.
+        shm = shared_memory.SharedMemory(name=name)
+        if shm.name not in _CREATED:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+class SharedState(object):
+    """Per-pen state in shared memory.
+
+    Use :meth:`create` in the writer and :meth:`attach` in the readers
+    rather than the constructor. Both work as context managers.
+
+    Args:
+        shm (multiprocessing.shared_memory.SharedMemory): segment.
+        writer (bool): true for the creating process.
+    """
+
+    def __init__(self, shm, writer):
+        self.shm = shm
+        self.writer = writer
+        self._header = np.ndarray((_HEADER,), np.int64, shm.buf)
+        if self._header[_MAGIC] != MAGIC:
+            LOGGER.error('Shared memory %s holds no pen state', shm.name)
+            raise ValueError(
+                'Shared memory {} holds no pen state'.format(shm.name))
+        pens = int(self._header[_PENS])
+        offsets, _ = _layout(pens, int(self._header[_WIDTH]))
+        self._columns = {}
+        for name, (offset, dtype) in offsets.items():
+            column = np.ndarray((pens,), dtype, shm.buf, offset)
+            if not writer:
+                column.flags.writeable = False
+            self._columns[name] = column
+        self._pens = self._columns['pen']
+
+    @classmethod
+    def create(cls, pens, thresholds=DEFAULT_THRESHOLD, name=None,
+               width=DEFAULT_WIDTH):
+        """Create the segment, as the single writer.
+
+        Args:
+            pens (array_like): pen identifiers, unique.
+            thresholds (array_like): threshold, scalar or aligned with
+                                     ``pens``.
+            name (str): segment name, random when None.
+            width (int): bytes per pen name.
+
+        Returns:
+            SharedState: writable state, pens sorted.
+
+        Raises:
+            ValueError: If pens repeat or a name is longer than ``width``.
+        """
+        encoded = [str(pen).encode('utf-8') for pen in np.asarray(pens)]
+        if any(len(pen) > width for pen in encoded):
+            LOGGER.error('Pen names must be at most %d bytes', width)
+            raise ValueError(
+                'Pen names must be at most {} bytes'.format(width))
+        encoded = np.array(encoded, dtype='S{}'.format(width))
+        thresholds = np.broadcast_to(
+            np.asarray(thresholds, dtype=np.float64), encoded.shape)
+        order = np.argsort(encoded)
+        encoded, thresholds = encoded[order], thresholds[order]
+        if (encoded[1:] == encoded[:-1]).any():
+            LOGGER.error('Pens must be unique')
+            raise ValueError('Pens must be unique')
+
+        _, size = _layout(len(encoded), width)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _CREATED.add(shm.name)
+        header = np.ndarray((_HEADER,), np.int64, shm.buf)
+        header[:] = (MAGIC, 0, len(encoded), width)
+        state = cls(shm, True)
+        columns = state._columns
+        columns['pen'][:] = encoded
+        columns['threshold'][:] = thresholds
+        columns['timestamp'][:] = 0
+        columns['hli'][:] = np.nan
+        columns['ahl'][:] = 0.0
+        columns['indicator'][:] = 0
+        return state
+
+    @classmethod
+    def from_registry(cls, registry, name=None, width=DEFAULT_WIDTH):
+        """Create the segment for the pens of a threshold registry.
+
+        Args:
+            registry (labwelfare.registry.ThresholdRegistry): pens and
+                                                              thresholds.
+            name (str): segment name, random when None.
+            width (int): bytes per pen name.
+
+        Returns:
+            SharedState: writable state.
+        """
+        pens, thresholds = registry.compile()
+        return cls.create(pens, thresholds, name, width)
+
+    @classmethod
+    def attach(cls, name):
+        """Attach to a segment by name, as a reader.
+
+        Args:
+            name (str): segment name, see :attr:`name`.
+
+        Returns:
+            SharedState: read-only state.
+        """
+        return cls(_attach_untracked(name), False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        if self.writer:
+            self.unlink()
+
+    def __len__(self):
+        return len(self._pens)
+
+    @property
+    def name(self):
+        """str: segment name readers attach to."""
+        return self.shm.name
+
+    @property
+    def seq(self):
+        """int: sequence number, odd while the writer is writing."""
+        return int(self._header[_SEQ])
+
+    def pens(self):
+        """numpy.ndarray: pen identifiers, sorted."""
+        return np.char.decode(self._pens, 'utf-8')
+
+    def index(self, pens):
+        """Positions of pens in the segment.
+
+        Args:
+            pens (array_like): pen identifiers.
+
+        Returns:
+            numpy.ndarray: positions, aligned with ``pens``.
+
+        Raises:
+            KeyError: If a pen is unknown.
+        """
+        pens = np.atleast_1d(np.asarray(pens))
+        if pens.dtype.kind != 'S':
+            pens = np.char.encode(pens.astype(str), 'utf-8')
+        pos = np.searchsorted(self._pens, pens)
+        found = pos < len(self._pens)
+        found[found] = self._pens[pos[found]] == pens[found]
+        if not found.all():
+            unknown = np.unique(pens[~found]).tolist()
+            LOGGER.error('Unknown pens: %s', unknown)
+            raise KeyError('Unknown pens: {}'.format(unknown))
+        return pos
+
+    def view(self, name):
+        """Zero-copy view of a column, not guarded by the lock.
+
+        Args:
+            name (str): ``pen`` or a :class:`PenState` column.
+
+        Returns:
+            numpy.ndarray: column aligned with :meth:`pens`, read-only in
+            readers.
+        """
+        return self._columns[name]
+
+    def _write(self, columns, pos):
+        if not self.writer:
+            LOGGER.error('Only the writer updates the state')
+            raise ValueError('Only the writer updates the state')
+        self._header[_SEQ] += 1
+        try:
+            for name, values in columns.items():
+                self._columns[name][pos] = values
+        finally:
+            self._header[_SEQ] += 1
+
+    def publish(self, pens, timestamp, hli, indicator, ahl=None):
+        """Store the latest readings of some pens.
+
+        A pen repeated in the batch keeps its last reading.
+
+        Args:
+            pens (array_like): pen identifiers.
+            timestamp (array_like): reading times.
+            hli (array_like): heat load index values.
+            indicator (array_like): ``Indicator`` values.
+            ahl (array_like): accumulated heat load, kept when None.
+
+        Raises:
+            KeyError: If a pen is unknown.
+            ValueError: If not called by the writer.
+        """
+        pos = self.index(pens)
+        # last occurrence of each pen.
+        _, last = np.unique(pos[::-1], return_index=True)
+        rows = len(pos) - 1 - last
+        columns = {'timestamp': timestamp, 'hli': hli,
+                   'indicator': indicator}
+        if ahl is not None:
+            columns['ahl'] = ahl
+        columns = {name: np.broadcast_to(values, pos.shape)[rows]
+                   for name, values in columns.items()}
+        self._write(columns, pos[rows])
+
+    def set_thresholds(self, thresholds, pens=None):
+        """Replace thresholds, e.g. after a registry change.
+
+        Args:
+            thresholds (array_like): thresholds aligned with ``pens``.
+            pens (array_like): pen identifiers, every pen when None.
+        """
+        pos = slice(None) if pens is None else self.index(pens)
+        self._write({'threshold': thresholds}, pos)
+
+    def read(self, pens=None, retries=DEFAULT_RETRIES):
+        """Consistent copy of the state of some pens.
+
+        Args:
+            pens (array_like): pen identifiers, every pen when None.
+            retries (int): attempts while the writer holds the lock.
+
+        Returns:
+            PenState: copied columns aligned with ``pens``.
+
+        Raises:
+            KeyError: If a pen is unknown.
+            TimeoutError: If no consistent copy was made in ``retries``
+                          attempts, e.g. the writer died mid update.
+        """
+        pos = slice(None) if pens is None else self.index(pens)
+        for _ in range(retries):
+            before = self._header[_SEQ]
+            if before % 2:
+                time.sleep(0)
+                continue
+            # fancy indexing copies, a slice has to be copied.
+            rows = [self._columns[name].copy() if pens is None else
+                    self._columns[name][pos] for name, _ in _COLUMNS]
+            if self._header[_SEQ] == before:
+                threshold, timestamp, hli, ahl, indicator = rows
+                pen = np.char.decode(self._pens[pos], 'utf-8')
+                return PenState(pen, threshold, timestamp, hli, ahl,
+                                indicator)
+        LOGGER.error('No consistent read of %s', self.name)
+        raise TimeoutError('No consistent read of {}'.format(self.name))
+
+    def close(self):
+        """Release the views and detach from the segment.
+
+        Arrays returned by :meth:`view` must be released first.
+        """
+        self._columns = {}
+        self._pens = self._header = None
+        self.shm.close()
+
+    def unlink(self):
+        """Destroy the segment, once every process closed it."""
+        self.shm.unlink()
@@ -34,8 +34,13 @@ setup(
     ],
     package_dir={'labwelfare': 'labwelfare'},
     include_package_data=True,
+    python_requires='>=3.8',
     install_requires=[
+        'numpy>=1.16',
     ],
+    extras_require={
+        'parquet': ['pyarrow'],
+    },
     license='BSD',
     zip_safe=False,
     keywords='labwelfare',
@@ -44,9 +49,7 @@ setup(
         'Intended Audience :: Developers',
         'License :: OSI Approved :: MIT License',
         'Natural Language :: English',
-        'Programming Language :: Python :: 2',
-        'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
     ],
 )
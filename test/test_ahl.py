@@ -0,0 +1,75 @@
+"""
+Tests for `ahl` module.
+"""
+import numpy as np
+import pytest
+from labwelfare import hli
+from labwelfare.ahl import AHLAccumulator, ahl_delta, ahl_series
+
+
+def ahl_loop(values, upper=86, lower=77, initial=0.0):
+    """Reference accumulated heat load, one reading at a time."""
+    load, out = initial, []
+    for value in values:
+        if value > upper:
+            load += value - upper
+        elif value < lower:
+            load += value - lower
+        load = max(load, 0.0)
+        out.append(load)
+    return out
+
+
+class TestAHL(object):
+
+    def setup_method(self, method):
+        # hourly heat load index of one pen over a hot day
+        self.hli = np.array([70, 80, 88, 92, 95, 90, 84, 78, 74, 60, 88, 72])
+
+    def test_ahl_delta(self):
+        """Test load gained above, kept between and lost below thresholds."""
+        got = ahl_delta([90, 80, 70], hours=0.5)
+        assert got.tolist() == [2.0, 0.0, -3.5]
+
+    def test_ahl_series_matches_loop(self):
+        """Test vectorized series equals the step by step recurrence."""
+        got = ahl_series(self.hli)
+        assert got == pytest.approx(ahl_loop(self.hli))
+
+    def test_ahl_series_initial_per_pen(self):
+        """Test series over many pens with a starting load per pen."""
+        pens = np.stack([self.hli, self.hli[::-1]], axis=1)
+        got = ahl_series(pens, initial=[5.0, 0.0])
+        assert got[:, 0] == pytest.approx(ahl_loop(self.hli, initial=5.0))
+        assert got[:, 1] == pytest.approx(ahl_loop(self.hli[::-1]))
+
+    def test_accumulator_scalar_stream(self):
+        """Test streaming ``hli()`` results through the accumulator."""
+        acc = AHLAccumulator()
+        results = [hli(bg_temp=bg, rel_hum=80, wind_speed=2)
+                   for bg in (30, 36, 38, 25)]
+        got = list(acc.ingest(results))
+        expected = ahl_loop([h for h, _ in results])
+        assert got == pytest.approx(expected)
+        assert np.ndim(got[-1]) == 0
+
+    def test_accumulator_many_pens(self):
+        """Test one update advances every pen with its own threshold."""
+        acc = AHLAccumulator(upper=np.array([86, 96]))
+        acc.update([90, 90])
+        got = acc.update([92, 99])
+        assert got.tolist() == [10.0, 3.0]
+
+    def test_accumulator_extend_then_update(self):
+        """Test block extension continues from the streaming state."""
+        acc = AHLAccumulator()
+        acc.extend(self.hli[:6])
+        for value in self.hli[6:]:
+            got = acc.update(value)
+        assert got == pytest.approx(ahl_loop(self.hli)[-1])
+
+    def test_accumulator_pen_mismatch(self):
+        """Test readings for a different number of pens are rejected."""
+        acc = AHLAccumulator(initial=np.zeros(3))
+        with pytest.raises(ValueError):
+            acc.update([90, 90])
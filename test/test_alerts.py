@@ -0,0 +1,66 @@
+"""
+Tests for `alerts` module.
+"""
+import numpy as np
+from labwelfare import Indicator
+from labwelfare.alerts import NO_ALERT, AlertEngine, alert_level
+
+HIGH = Indicator.HIGH.value
+EXTREME = Indicator.EXTREME.value
+
+
+class TestAlerts(object):
+
+    def test_alert_level(self):
+        """Test only HIGH and EXTREME raise an alert level."""
+        got = alert_level([50, 90, 120], threshold=86)
+        assert got.tolist() == [NO_ALERT, HIGH, EXTREME]
+
+    def test_cold_readings(self):
+        """Test a negative heat load index is no alert, not an error."""
+        assert alert_level([90, -3]).tolist() == [HIGH, NO_ALERT]
+        engine = AlertEngine(2)
+        events = engine.update([90, -3])
+        assert events.pen.tolist() == [0]
+        events = engine.update([-13.04, -3])
+        assert events.pen.tolist() == [0]
+        assert events.current.tolist() == [NO_ALERT]
+
+    def test_enter_and_leave(self):
+        """Test events are emitted on entering and leaving only."""
+        engine = AlertEngine(3, hysteresis=0)
+        events = engine.update([80, 90, 101])
+        assert events.pen.tolist() == [1, 2]
+        assert events.previous.tolist() == [NO_ALERT, NO_ALERT]
+        assert events.current.tolist() == [HIGH, EXTREME]
+
+        assert len(engine.update([80, 91, 105]).pen) == 0
+        events = engine.update([80, 70, 95])
+        assert events.pen.tolist() == [1, 2]
+        assert events.current.tolist() == [NO_ALERT, HIGH]
+        assert engine.active().tolist() == [2]
+
+    def test_hysteresis(self):
+        """Test a pen stays in alert until it drops below the margin."""
+        engine = AlertEngine(1, threshold=86, hysteresis=2)
+        engine.update([87])
+        assert len(engine.update([85]).pen) == 0
+        events = engine.update([83.9])
+        assert events.current.tolist() == [NO_ALERT]
+
+    def test_min_dwell(self):
+        """Test a level must hold for min_dwell before it is reported."""
+        engine = AlertEngine(1, hysteresis=0, min_dwell=2)
+        assert len(engine.update([90]).pen) == 0
+        assert len(engine.update([70]).pen) == 0
+        assert len(engine.update([90], now=3).pen) == 0
+        assert len(engine.update([91], now=4).pen) == 0
+        assert engine.update([92], now=5).current.tolist() == [HIGH]
+
+    def test_threshold_per_pen_and_missing(self):
+        """Test per pen thresholds and NaN readings keeping the level."""
+        engine = AlertEngine(2, threshold=[86, 96], hysteresis=0)
+        events = engine.update([90, 90])
+        assert events.pen.tolist() == [0]
+        assert len(engine.update([np.nan, 97]).pen) == 1
+        assert engine.active().tolist() == [0, 1]
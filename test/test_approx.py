@@ -0,0 +1,38 @@
+"""
+Tests for `approx` module.
+"""
+import numpy as np
+from labwelfare import approx, batch
+
+
+class TestApprox(object):
+
+    def setup_method(self, method):
+        # dense grid over the documented domain of the error bound
+        self.bg_temp = np.linspace(approx.BG_TEMP_RANGE[0],
+                                   approx.BG_TEMP_RANGE[1], 1401)
+        self.r_hum = np.array([0.0, 50.0, 100.0])
+        self.w_speed = np.linspace(approx.WIND_SPEED_RANGE[0],
+                                   approx.WIND_SPEED_RANGE[1], 6007)
+
+    def test_array_error_bound(self):
+        """Test the tables stay within MAX_ABS_ERROR over the domain."""
+        bg_temp, r_hum, w_speed = np.meshgrid(
+            self.bg_temp + 0.0123, self.r_hum, self.w_speed[::7],
+            indexing='ij')
+        table = approx.default()
+        got = table.hli_bg_array(bg_temp, r_hum, w_speed)
+        exact = batch.hli_bg(bg_temp, r_hum, w_speed)
+        assert np.abs(got - exact).max() <= approx.MAX_ABS_ERROR
+
+    def test_clamped_outside_tables(self):
+        """Test readings outside the tables stay close to the exact index."""
+        got = approx.default().hli_bg_array([75, -20], [30, 30], [80, 0])
+        exact = batch.hli_bg([75, -20], [30, 30], [80, 0])
+        assert np.abs(got - exact).max() <= approx.MAX_ABS_ERROR
+
+    def test_nan(self):
+        """Test missing readings give NaN, not a table end value."""
+        got = approx.default().hli_bg_array([np.nan, 30], [50, 50],
+                                            [3, np.nan])
+        assert np.isnan(got).all()
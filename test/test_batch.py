@@ -0,0 +1,371 @@
+"""
+Tests for `batch` module.
+"""
+import numpy as np
+import pytest
+from labwelfare import (Indicator, batch, hli_bg, hli_indicator,
+                        hli_indicator_fast, hli_no_bg)
+
+
+class TestBatchHLI(object):
+
+    def setup_method(self, method):
+        # black globe temperature
+        self.bg_temp = np.array([20.0, 30.5, 39.0, 45.2])
+        # air temperature
+        self.air_temp = np.array([18.0, 24.3, 27.4, 35.0])
+        # relative humidity
+        self.r_hum = np.array([40.0, 66.0, 93.0, 55.0])
+        # solar radiation
+        self.solar_rad = np.array([0.0, 350.0, 0.0, 980.0])
+        # wind speed km/h
+        self.w_speed = np.array([0.0, 9.7, 12.9, 3.1])
+
+    def test_hli_bg_matches_scalar(self):
+        """Test array heat load index equals the scalar one element-wise."""
+        expected = [hli_bg(*args) for args in
+                    zip(self.bg_temp, self.r_hum, self.w_speed)]
+        got = batch.hli_bg(self.bg_temp, self.r_hum, self.w_speed)
+        assert got.shape == (4,)
+        assert got == pytest.approx(expected, rel=1e-12)
+
+    def test_hli_no_bg_matches_scalar(self):
+        """Test array heat load index no black globe equals the scalar one."""
+        expected = [hli_no_bg(*args) for args in
+                    zip(self.air_temp, self.r_hum, self.solar_rad,
+                        self.w_speed)]
+        got = batch.hli_no_bg(self.air_temp, self.r_hum, self.solar_rad,
+                              self.w_speed)
+        assert got == pytest.approx(expected, rel=1e-12)
+
+    def test_hli_bg_broadcast_shape(self):
+        """Test inputs of different shapes are broadcast."""
+        grid = batch.hli_bg(self.bg_temp[:, None], 60, self.w_speed[None, :])
+        assert grid.shape == (4, 4)
+        assert grid[2, 2] == pytest.approx(hli_bg(39.0, 60, 12.9))
+
+    def test_hli_bg_scalar_inputs(self):
+        """Test scalar inputs give a scalar result."""
+        got = batch.hli_bg(39, 93, 12.9)
+        assert np.ndim(got) == 0
+        assert got == pytest.approx(97.91, 0.1)
+
+    def test_hli_bg_negative_indices(self):
+        """Test negative readings are reported by index."""
+        r_hum = self.r_hum.copy()
+        r_hum[1] = -5
+        w_speed = self.w_speed.copy()
+        w_speed[3] = -1
+        with pytest.raises(ValueError, match=r".*indices: \[1, 3\]") as err:
+            batch.hli_bg(self.bg_temp, r_hum, w_speed)
+        assert err.value.indices == [1, 3]
+
+    def test_hli_no_bg_negative_indices_2d(self):
+        """Test negative readings of n-dimensional inputs are reported."""
+        solar_rad = np.zeros((2, 3))
+        solar_rad[1, 2] = -5.1
+        with pytest.raises(ValueError) as err:
+            batch.hli_no_bg(27.4, 66, solar_rad, 9.7)
+        assert err.value.indices == [(1, 2)]
+
+    def test_hli_bg_non_numeric(self):
+        """Test for invalid non-numeric values."""
+        with pytest.raises(ValueError):
+            batch.hli_bg(self.bg_temp, ['invalid'] * 4, self.w_speed)
+
+
+class TestBatchIndicator(object):
+
+    def setup_method(self, method):
+        # heat load index values covering every class and bin edge
+        self.hli = np.array([0, 0.5, 1, 1.5, 19, 20, 20.5, 21, 22, 86, 86.1,
+                             97, 100, 100.1, 300])
+
+    def test_hli_indicator_matches_scalar(self):
+        """Test batch indicator equals the scalar one element-wise."""
+        expected = [hli_indicator(h) for h in self.hli]
+        got = batch.hli_indicator(self.hli)
+        assert got.dtype == np.uint8
+        assert got.tolist() == expected
+
+    def test_hli_indicator_gaps(self):
+        """Test values in (0, 1] and (20, 21] do not fall through."""
+        got = batch.hli_indicator([0.5, 1, 20.5, 21])
+        assert got.tolist() == [Indicator.NEGLEGIBLE.value,
+                                Indicator.NEGLEGIBLE.value,
+                                Indicator.MEDIUM.value,
+                                Indicator.MEDIUM.value]
+
+    def test_hli_indicator_threshold_array(self):
+        """Test per-element thresholds against the scalar indicator."""
+        thresholds = np.array([80, 86, 96, 10, 120])
+        hli = np.array([85, 85, 97, 15, 105])
+        expected = [hli_indicator(h, t) for h, t in zip(hli, thresholds)]
+        got = batch.hli_indicator(hli, thresholds)
+        assert got.tolist() == expected
+
+    def test_hli_indicator_negative(self):
+        """Test negative hli of cold readings are NEGLEGIBLE."""
+        got = batch.hli_indicator([98, -1, 3, -13.04])
+        assert got.tolist() == [Indicator.HIGH.value,
+                                Indicator.NEGLEGIBLE.value,
+                                Indicator.LOW.value,
+                                Indicator.NEGLEGIBLE.value]
+        assert got.tolist() == [hli_indicator_fast(h)
+                                for h in [98, -1, 3, -13.04]]
+        with pytest.raises(ValueError) as err:
+            batch.hli_indicator([98, 98], threshold=[86, -1])
+        assert err.value.indices == [1]
+        h, ind = batch.hli(True, bg_temp=[-5, 40], rel_hum=10,
+                           wind_speed=20)
+        assert h[0] < 0 and ind[0] == Indicator.NEGLEGIBLE.value
+
+    def test_hli_indicator_threshold_non_numeric(self):
+        """Test for invalid non-numeric value for threshold."""
+        with pytest.raises(ValueError):
+            batch.hli_indicator(98, threshold='invalid_number')
+
+    def test_hli_indicator_nan(self):
+        """Test NaN values raise by default and are never EXTREME."""
+        with pytest.raises(ValueError) as err:
+            batch.hli_indicator([98, np.nan, 3])
+        assert err.value.indices == [1]
+        got = batch.hli_indicator([98, np.nan, 3], on_invalid='nan')
+        assert got.tolist() == [Indicator.HIGH.value,
+                                batch.INVALID_INDICATOR,
+                                Indicator.LOW.value]
+
+    def test_hli_indicator_nan_threshold(self):
+        """Test NaN thresholds raise by default and are never EXTREME."""
+        with pytest.raises(ValueError):
+            batch.hli_indicator(98, threshold=np.nan)
+        with pytest.raises(ValueError) as err:
+            batch.hli_indicator([98, 98], threshold=[86, np.nan])
+        assert err.value.indices == [1]
+        got = batch.hli_indicator([98, 98], [86, np.nan], on_invalid='nan')
+        assert got.tolist() == [Indicator.HIGH.value,
+                                batch.INVALID_INDICATOR]
+        got = batch.hli_indicator([98, 98], np.nan, on_invalid='mask')
+        assert got.mask.all()
+
+
+class TestBatchDispatch(object):
+
+    def test_hli_from_bg(self):
+        """Test array heat load index from black globe arguments."""
+        h, ind = batch.hli(True, bg_temp=[39, 39], rel_hum=93,
+                           wind_speed=12.9)
+        assert h == pytest.approx([97.91, 97.91], 0.1)
+        assert ind.tolist() == [Indicator.HIGH.value] * 2
+
+    def test_hli_from_no_bg(self):
+        """Test array heat load index from no black globe arguments."""
+        h, ind = batch.hli(air_temp=[27.4], rel_hum=[66], solar_rad=[0],
+                           wind_speed=[9.7])
+        assert h == pytest.approx([63.15], 0.1)
+        assert ind is None
+
+    def test_hli_mixed(self):
+        """Test rows without black globe use air temperature."""
+        got = batch.hli_mixed([39, np.nan, 39], 27.4, [93, 66, 93], 0,
+                              [12.9, 9.7, -1], on_invalid='nan')
+        assert got[:2].tolist() == pytest.approx([hli_bg(39, 93, 12.9),
+                                                  hli_no_bg(27.4, 66, 0,
+                                                            9.7)])
+        assert np.isnan(got[2])
+        with pytest.raises(ValueError) as err:
+            batch.hli_mixed([39, np.nan], 27.4, 66, -1, 2)
+        assert err.value.indices == [1]
+
+    def test_hli_required_arguments(self):
+        """Test for missing required arguments."""
+        with pytest.raises(ValueError):
+            batch.hli(True, air_temp=[27.4], rel_hum=[66], wind_speed=[9.7])
+
+
+class TestBgTempCache(object):
+
+    def setup_method(self, method):
+        # air temperature and solar radiation grid of a scenario sweep
+        self.air_temp = np.linspace(15, 40, 50)[:, None]
+        self.solar_rad = np.linspace(0, 1000, 40)[None, :]
+
+    def test_predict_bg_temp(self):
+        """Test the stage equals the inline prediction of hli_no_bg."""
+        pred_bg = batch.predict_bg_temp(self.air_temp, self.solar_rad)
+        assert pred_bg.shape == (50, 40)
+        got = batch.hli_bg(pred_bg, 66, 9.7)
+        expected = batch.hli_no_bg(self.air_temp, 66, self.solar_rad, 9.7)
+        assert np.array_equal(got, expected)
+
+    def test_predict_bg_temp_negative(self):
+        """Test for invalid negative solar radiation."""
+        with pytest.raises(ValueError):
+            batch.predict_bg_temp(20, [0, -5.1])
+
+    def test_cache_sweep(self):
+        """Test a sweep predicts the grid once."""
+        cache = batch.BgTempCache()
+        for rel_hum in (40, 60, 80):
+            for wind_speed in (1, 5):
+                got = cache.hli_no_bg(self.air_temp, rel_hum,
+                                      self.solar_rad, wind_speed)
+                expected = batch.hli_no_bg(self.air_temp, rel_hum,
+                                           self.solar_rad, wind_speed)
+                assert np.array_equal(got, expected)
+        assert (cache.misses, cache.hits) == (1, 5)
+        assert self.air_temp.flags.writeable
+
+    def test_cache_lru_eviction(self):
+        """Test the least recently used grid is evicted."""
+        cache = batch.BgTempCache(maxsize=2)
+        grids = [np.full(3, t) for t in (20.0, 25.0, 30.0)]
+        cache(grids[0], 100)
+        cache(grids[1], 100)
+        cache(grids[0], 100)
+        cache(grids[2], 100)
+        assert len(cache) == 2
+        cache(grids[0], 100)
+        assert cache.hits == 2
+        cache(grids[1], 100)
+        assert cache.misses == 4
+
+    def test_cache_content_keys(self):
+        """Test grids changed through another view are recomputed."""
+        cache = batch.BgTempCache()
+        base = np.linspace(15, 40, 50)
+        first = cache(base[:, None], self.solar_rad)
+        assert cache(base.copy()[:, None], self.solar_rad) is first
+        base[3] = 10.0
+        got = cache(base[:, None], self.solar_rad)
+        assert np.array_equal(got, batch.predict_bg_temp(base[:, None],
+                                                         self.solar_rad))
+        assert (cache.misses, cache.hits) == (2, 1)
+        assert cache(20.0, 100) == batch.predict_bg_temp(20.0, 100)
+
+
+class TestBatchInvalid(object):
+
+    def setup_method(self, method):
+        # black globe temperature, one missing
+        self.bg_temp = np.array([39.0, 30.5, np.nan, 45.2, 41.0])
+        # relative humidity, one negative
+        self.r_hum = np.array([93.0, -5.0, 60.0, 55.0, 70.0])
+        # wind speed km/h, one non-numeric
+        self.w_speed = [12.9, 1.0, 2.0, 'x', 0.5]
+
+    def test_raise_is_default(self):
+        """Test invalid readings still raise by default."""
+        with pytest.raises(ValueError):
+            batch.hli_bg(self.bg_temp, self.r_hum, self.w_speed)
+
+    def test_nan(self):
+        """Test invalid readings give NaN and the others are computed."""
+        got = batch.hli_bg(self.bg_temp, self.r_hum, self.w_speed,
+                           on_invalid='nan')
+        assert np.isnan(got[1:4]).all()
+        assert got[[0, 4]] == pytest.approx([hli_bg(39, 93, 12.9),
+                                             hli_bg(41, 70, 0.5)])
+
+    def test_mask(self):
+        """Test invalid readings are masked."""
+        got = batch.hli_no_bg([27.4, -1.0, 27.4], 66, [0, 0, None], 9.7,
+                              on_invalid='mask')
+        assert isinstance(got, np.ma.MaskedArray)
+        assert got.mask.tolist() == [False, True, True]
+        assert got[0] == pytest.approx(hli_no_bg(27.4, 66, 0, 9.7))
+
+    def test_clip(self):
+        """Test negative readings are clipped to zero."""
+        got = batch.hli_bg(self.bg_temp, self.r_hum, self.w_speed,
+                           on_invalid='clip')
+        assert got[1] == pytest.approx(hli_bg(30.5, 0, 1.0))
+        assert np.isnan(got[[2, 3]]).all()
+
+    def test_indicator(self):
+        """Test rejected readings get the invalid indicator."""
+        h, ind = batch.hli(True, on_invalid='nan', bg_temp=self.bg_temp,
+                           rel_hum=self.r_hum, wind_speed=self.w_speed)
+        assert ind.tolist() == [Indicator.HIGH.value, 0, 0, 0,
+                                hli_indicator(h[4])]
+        assert batch.INVALID_INDICATOR == 0
+
+    def test_check_readings(self):
+        """Test rejection counts by reason, each reading counted once."""
+        rejections = batch.check_readings(
+            bg_temp=self.bg_temp, rel_hum=self.r_hum,
+            wind_speed=self.w_speed)
+        assert rejections.mask.tolist() == [False, True, True, True, False]
+        assert rejections.counts == {'non_numeric': 1, 'missing': 1,
+                                     'negative': 1}
+
+    def test_summary_logged_once(self, caplog):
+        """Test a single warning per batch instead of one per reading."""
+        batch.hli_bg(np.full(1000, 30.0), np.full(1000, -1.0), 2,
+                     on_invalid='nan')
+        assert len(caplog.records) == 1
+        assert "'negative': 1000" in caplog.records[0].getMessage()
+
+    def test_unknown_policy(self):
+        """Test an unknown policy is rejected."""
+        with pytest.raises(ValueError):
+            batch.hli_bg(self.bg_temp, 60, 2, on_invalid='ignore')
+
+
+class TestBatchFloat32(object):
+
+    def setup_method(self, method):
+        rng = np.random.RandomState(804)
+        size = 200000
+        # readings over the documented ranges, low winds oversampled
+        self.bg_temp = rng.uniform(-10, 60, size)
+        self.air_temp = rng.uniform(0, 50, size)
+        self.r_hum = rng.uniform(0, 100, size)
+        self.solar_rad = rng.uniform(0, 1400, size)
+        self.w_speed = np.concatenate([rng.uniform(0, 5, size // 2),
+                                       rng.uniform(0, 60, size // 2)])
+
+    def test_no_upcast(self):
+        """Test float32 is kept end to end, scalars included."""
+        assert batch.hli_bg(39, 93, 12.9, dtype=np.float32).dtype == \
+            np.float32
+        h, ind = batch.hli(True, on_invalid='clip', dtype=np.float32,
+                           air_temp=self.air_temp,
+                           rel_hum=self.r_hum, solar_rad=self.solar_rad,
+                           wind_speed=self.w_speed)
+        assert h.dtype == np.float32
+        assert ind.dtype == np.uint8
+        assert batch.predict_bg_temp(27.4, 0, dtype=np.float32).dtype == \
+            np.float32
+
+    def test_error_budget(self):
+        """Test float32 stays within the documented deviation."""
+        for low in (False, True):
+            w_speed = np.zeros(1) if low else self.w_speed
+            h64 = batch.hli_bg(self.bg_temp, self.r_hum, w_speed)
+            h32 = batch.hli_bg(self.bg_temp, self.r_hum, w_speed,
+                               dtype=np.float32)
+            assert np.abs(h32 - h64).max() <= batch.FLOAT32_MAX_ABS_ERROR
+        h64 = batch.hli_no_bg(self.air_temp, self.r_hum, self.solar_rad,
+                              self.w_speed)
+        h32 = batch.hli_no_bg(self.air_temp, self.r_hum, self.solar_rad,
+                              self.w_speed, dtype=np.float32)
+        assert np.abs(h32 - h64).max() <= batch.FLOAT32_MAX_ABS_ERROR
+
+    def test_indicator_identical_off_edges(self):
+        """Test indicators only differ right at a bin edge."""
+        h64, ind64 = batch.hli(True, 89, bg_temp=self.bg_temp,
+                               rel_hum=self.r_hum, wind_speed=self.w_speed,
+                               on_invalid='clip')
+        h32, ind32 = batch.hli(True, 89, bg_temp=self.bg_temp,
+                               rel_hum=self.r_hum, wind_speed=self.w_speed,
+                               on_invalid='clip', dtype=np.float32)
+        edges = batch.indicator_edges(89)
+        near = (np.abs(h64[:, None] - edges) <=
+                batch.FLOAT32_MAX_ABS_ERROR).any(axis=1)
+        assert np.array_equal(ind32[~near], ind64[~near])
+
+    def test_unknown_dtype(self):
+        """Test unsupported dtypes are rejected."""
+        with pytest.raises(ValueError):
+            batch.hli_bg(39, 93, 12.9, dtype=np.float16)
@@ -0,0 +1,111 @@
+"""
+Tests for `cache` module.
+"""
+import json
+
+import numpy as np
+import pytest
+from labwelfare import Indicator, ahl, batch, heat_load
+from labwelfare.cache import HLIStore, model_fingerprint
+
+
+class TestHLIStore(object):
+
+    def setup_method(self, method):
+        # hourly timestamps and heat load index of one pen
+        self.timestamp = 1577836800 + 3600 * np.arange(6)
+        self.hli = np.array([80.0, 88.0, 95.0, 90.0, 76.0, 70.0])
+
+    def test_append_and_read(self, tmp_path):
+        """Test appended chunks read back as one series."""
+        store = HLIStore(str(tmp_path))
+        store.append('pen1', self.timestamp[:4], self.hli[:4])
+        rows = store.append('pen1', self.timestamp[4:], self.hli[4:])
+        assert rows == 6
+        assert store.pens() == ['pen1']
+
+        got = store.read('pen1')
+        assert isinstance(got['hli'], np.memmap)
+        assert got['hli'].tolist() == self.hli.tolist()
+        assert got['indicator'][2] == Indicator.HIGH.value
+        assert got['ahl'] == pytest.approx(ahl.ahl_series(self.hli))
+
+    def test_read_window(self, tmp_path):
+        """Test reading the time window [start, stop)."""
+        store = HLIStore(str(tmp_path))
+        store.append('pen1', self.timestamp, self.hli)
+        got = store.read('pen1', self.timestamp[1], self.timestamp[3])
+        assert got['timestamp'].tolist() == self.timestamp[1:3].tolist()
+        assert got['hli'].tolist() == [88.0, 95.0]
+
+    def test_append_not_increasing(self, tmp_path):
+        """Test timestamps before the cached ones are rejected."""
+        store = HLIStore(str(tmp_path))
+        store.append('pen1', self.timestamp[3:], self.hli[3:])
+        with pytest.raises(ValueError):
+            store.append('pen1', self.timestamp[:3], self.hli[:3])
+
+    def test_invalidated_by_threshold(self, tmp_path, monkeypatch):
+        """Test the store is wiped when DEFAULT_THRESHOLD changes."""
+        HLIStore(str(tmp_path)).append('pen1', self.timestamp, self.hli)
+        assert HLIStore(str(tmp_path)).length('pen1') == 6
+
+        fingerprint = model_fingerprint()
+        monkeypatch.setattr(heat_load, 'DEFAULT_THRESHOLD', 90)
+        assert model_fingerprint() != fingerprint
+        store = HLIStore(str(tmp_path))
+        assert store.pens() == []
+        assert store.length('pen1') == 0
+
+    def test_append_cold_and_missing(self, tmp_path):
+        """Test negative and NaN heat load index values are cached."""
+        store = HLIStore(str(tmp_path))
+        store.append('p', [0, 1, 2], [90, -2, np.nan])
+        got = store.read('p')
+        assert got['indicator'].tolist() == [Indicator.HIGH.value,
+                                             Indicator.NEGLEGIBLE.value,
+                                             batch.INVALID_INDICATOR]
+        assert got['ahl'].tolist() == pytest.approx([4, 0, 0])
+
+    def test_append_ragged(self, tmp_path):
+        """Test indicator and ahl of another length than hli are rejected."""
+        store = HLIStore(str(tmp_path))
+        with pytest.raises(ValueError):
+            store.append('p', [0, 1], [90, 80], indicator=[4])
+        with pytest.raises(ValueError):
+            store.append('p', [0, 1], [90, 80], ahl=[4, 4, 4])
+        assert store.pens() == []
+
+    def test_invalidated_by_batch_coefficients(self, monkeypatch):
+        """Test the fingerprint covers the batch copy of the model."""
+        fingerprint = model_fingerprint()
+        high = list(batch.HLI_HIGH)
+        high[0] += 0.01
+        monkeypatch.setattr(batch, 'HLI_HIGH', tuple(high))
+        assert model_fingerprint() != fingerprint
+
+    def test_foreign_directory_survives(self, tmp_path):
+        """Test only the pens of the store are removed on a model change."""
+        store = HLIStore(str(tmp_path / 'store'))
+        store.append('pen1', self.timestamp, self.hli)
+        foreign = tmp_path / 'store' / 'notes'
+        foreign.mkdir()
+        (foreign / 'keep.txt').write_text('keep')
+        assert store.pens() == ['pen1']
+        with pytest.raises(ValueError):
+            store.append('notes', self.timestamp, self.hli)
+
+        with open(str(tmp_path / 'store' / 'manifest.json'), 'w') as out:
+            json.dump({'fingerprint': 'old', 'pens': ['pen1']}, out)
+        store = HLIStore(str(tmp_path / 'store'))
+        assert store.pens() == []
+        assert not (tmp_path / 'store' / 'pen1').exists()
+        assert (foreign / 'keep.txt').read_text() == 'keep'
+
+    def test_non_empty_root(self, tmp_path):
+        """Test a directory that is not a store is left alone."""
+        (tmp_path / 'photos').mkdir()
+        with pytest.raises(ValueError):
+            HLIStore(str(tmp_path))
+        assert (tmp_path / 'photos').is_dir()
+        assert not (tmp_path / 'manifest.json').exists()
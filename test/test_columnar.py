@@ -0,0 +1,74 @@
+"""
+Tests for `columnar` module.
+"""
+import numpy as np
+import pytest
+from labwelfare import batch, columnar
+
+
+class TestColumnar(object):
+
+    def setup_method(self, method):
+        rng = np.random.RandomState(804)
+        # hourly readings of a season
+        self.timestamp = np.arange(1000, dtype=np.int64) * 3600
+        self.hli, self.ind = batch.hli(
+            True, bg_temp=rng.uniform(15, 45, 1000),
+            rel_hum=rng.uniform(10, 100, 1000),
+            wind_speed=rng.uniform(0, 20, 1000))
+
+    def write_and_read(self, path, **kwargs):
+        with columnar.ColumnWriter(path, row_group_rows=300,
+                                   **kwargs) as writer:
+            writer.write_hli(self.timestamp[:700], self.hli[:700],
+                             self.ind[:700])
+            writer.write_hli(self.timestamp[700:], self.hli[700:],
+                             self.ind[700:])
+        assert writer.rows == 1000
+        assert writer.row_groups == 4
+        return columnar.read_columns(path)
+
+    def test_npz_round_trip(self, tmp_path):
+        """Test typed columns written in row groups read back exactly."""
+        got = self.write_and_read(str(tmp_path / 'hli.npz'))
+        assert list(got) == ['timestamp', 'hli', 'indicator']
+        assert got['timestamp'].dtype == np.int64
+        assert got['indicator'].dtype == np.uint8
+        assert np.array_equal(got['timestamp'], self.timestamp)
+        assert np.array_equal(got['hli'], self.hli)
+        assert np.array_equal(got['indicator'], self.ind)
+
+    def test_npz_float32(self, tmp_path):
+        """Test a float32 heat load index column."""
+        got = self.write_and_read(str(tmp_path / 'hli.npz'),
+                                  hli_dtype=np.float32)
+        assert got['hli'].dtype == np.float32
+        assert np.array_equal(got['hli'], self.hli.astype(np.float32))
+
+    def test_npz_empty(self, tmp_path):
+        """Test a file without rows keeps its schema."""
+        path = str(tmp_path / 'empty.npz')
+        columnar.ColumnWriter(path).close()
+        got = columnar.read_columns(path)
+        assert got['indicator'].dtype == np.uint8
+        assert len(got['hli']) == 0
+
+    def test_parquet_round_trip(self, tmp_path):
+        """Test the Parquet output when pyarrow is installed."""
+        pytest.importorskip('pyarrow.parquet')
+        got = self.write_and_read(str(tmp_path / 'hli.parquet'))
+        assert np.array_equal(got['hli'], self.hli)
+        assert got['indicator'].dtype == np.uint8
+
+    def test_columns_checked(self, tmp_path):
+        """Test missing columns and unequal lengths are rejected."""
+        with columnar.ColumnWriter(str(tmp_path / 'bad.npz')) as writer:
+            with pytest.raises(ValueError):
+                writer.write(timestamp=self.timestamp, hli=self.hli)
+            with pytest.raises(ValueError):
+                writer.write_hli(self.timestamp[:10], self.hli, self.ind)
+
+    def test_unknown_format(self, tmp_path):
+        """Test an unknown format is rejected."""
+        with pytest.raises(ValueError):
+            columnar.ColumnWriter(str(tmp_path / 'hli.csv'), fmt='csv')
@@ -0,0 +1,160 @@
+"""
+Tests for `forecast` module.
+"""
+import numpy as np
+import pytest
+from labwelfare import Indicator, batch, forecast
+
+
+class TestForecast(object):
+
+    def setup_method(self, method):
+        rng = np.random.RandomState(804)
+        # time x lat x lon x member cube
+        shape = (6, 5, 7, 9)
+        self.air_temp = rng.uniform(15, 45, shape).astype(np.float32)
+        self.r_hum = rng.uniform(10, 100, shape).astype(np.float32)
+        # one solar radiation field per time step and cell
+        self.solar_rad = rng.uniform(0, 1000, shape[:3] + (1,))
+        self.w_speed = rng.uniform(0, 20, shape).astype(np.float32)
+        self.args = (self.air_temp, self.r_hum, self.solar_rad, self.w_speed)
+
+    def test_blocks_cover_shape(self):
+        """Test blocks cover every element exactly once."""
+        seen = np.zeros((6, 5, 7, 9), dtype=int)
+        for index in forecast._blocks(seen.shape, 20):
+            assert seen[index].size <= 20
+            seen[index] += 1
+        assert (seen == 1).all()
+
+    def test_hli_cube_matches_batch(self):
+        """Test blockwise heat load index equals the whole array one."""
+        expected = batch.hli_no_bg(*self.args)
+        got = forecast.hli_cube(*self.args, block_size=100)
+        assert np.array_equal(got, expected)
+
+    def test_indicator_cube_memmap(self, tmp_path):
+        """Test indicator cube of memory mapped inputs into a memmap."""
+        path = str(tmp_path / 'air_temp.npy')
+        air = np.lib.format.open_memmap(path, 'w+', np.float32,
+                                        self.air_temp.shape)
+        air[:] = self.air_temp
+        out = np.lib.format.open_memmap(str(tmp_path / 'ind.npy'), 'w+',
+                                        np.uint8, self.air_temp.shape)
+        got = forecast.indicator_cube(np.load(path, mmap_mode='r'),
+                                      *self.args[1:], threshold=89, out=out,
+                                      block_size=64)
+        assert got is out
+        expected = batch.hli_indicator(batch.hli_no_bg(*self.args), 89)
+        assert np.array_equal(out, expected)
+
+    def test_indicator_cube_threshold_per_cell(self):
+        """Test thresholds broadcast against the cube."""
+        threshold = np.linspace(80, 96, 7)[:, None]
+        got = forecast.indicator_cube(*self.args, threshold=threshold,
+                                      block_size=50)
+        expected = batch.hli_indicator(batch.hli_no_bg(*self.args),
+                                       threshold)
+        assert np.array_equal(got, expected)
+
+    def test_exceedance(self):
+        """Test exceedance is the fraction of members at the level."""
+        ind = batch.hli_indicator(batch.hli_no_bg(*self.args))
+        expected = (ind >= Indicator.HIGH.value).mean(axis=-1)
+        got = forecast.exceedance(*self.args, block_size=40)
+        assert got.shape == (6, 5, 7)
+        assert np.array_equal(got, expected)
+
+    def test_exceedance_member_axis(self):
+        """Test members on a leading axis."""
+        args = [np.moveaxis(np.broadcast_to(a, self.air_temp.shape), -1, 0)
+                for a in self.args]
+        expected = forecast.exceedance(*self.args, level=Indicator.EXTREME)
+        got = forecast.exceedance(*args, member_axis=0,
+                                  level=Indicator.EXTREME, block_size=30)
+        assert np.array_equal(got, expected)
+
+    def test_negative_indices(self):
+        """Test negative readings are reported at their cube index."""
+        self.r_hum[4, 2, 6, 3] = -1
+        with pytest.raises(ValueError) as err:
+            forecast.indicator_cube(*self.args, block_size=32)
+        assert err.value.indices == [(4, 2, 6, 3)]
+        args = [np.moveaxis(np.broadcast_to(a, self.air_temp.shape), -1, 1)
+                for a in self.args]
+        with pytest.raises(ValueError) as err:
+            forecast.exceedance(*args, member_axis=1, block_size=32)
+        assert err.value.indices == [(4, 3, 2, 6)]
+
+    def test_out_shape(self):
+        """Test an output of the wrong shape is rejected."""
+        with pytest.raises(ValueError):
+            forecast.exceedance(*self.args, out=np.empty((6, 5)))
+
+    def test_hli_cube_float32(self):
+        """Test a float32 cube matches the float32 batch result."""
+        got = forecast.hli_cube(*self.args, block_size=100,
+                                dtype=np.float32)
+        assert got.dtype == np.float32
+        assert np.array_equal(got, batch.hli_no_bg(*self.args,
+                                                   dtype=np.float32))
+
+    def test_invalid_cells(self):
+        """Test missing cells are invalid, not EXTREME, and not members."""
+        self.air_temp[0, 0, 0, :3] = np.nan
+        self.air_temp[0, 0, 1, :] = np.nan
+        for fn in (forecast.hli_cube, forecast.indicator_cube):
+            with pytest.raises(ValueError) as err:
+                fn(*self.args, block_size=32)
+            assert err.value.reason == 'missing'
+        ind = forecast.indicator_cube(*self.args, block_size=32,
+                                      on_invalid='nan')
+        assert (ind[0, 0, 0, :3] == batch.INVALID_INDICATOR).all()
+        h = forecast.hli_cube(*self.args, block_size=32, on_invalid='mask')
+        assert h.mask[0, 0, 0, :3].all() and h.mask.sum() == 12
+
+        got = forecast.exceedance(*self.args, level=Indicator.EXTREME,
+                                  block_size=40, on_invalid='nan')
+        # the three missing members are neither counted nor exceedances.
+        assert got[0, 0, 0] == \
+            (ind[0, 0, 0, 3:] == Indicator.EXTREME.value).mean()
+        assert np.isnan(got[0, 0, 1])
+        masked = forecast.exceedance(*self.args, block_size=40,
+                                     on_invalid='mask')
+        assert masked.mask.sum() == 1
+
+    def test_masked_cells(self):
+        """Test masked cells are missing, not computed from fill values."""
+        mask = np.zeros(self.air_temp.shape, dtype=bool)
+        mask[2, 1, 3, :2] = True
+        air = np.ma.masked_array(np.where(mask, 1e20, self.air_temp), mask)
+        args = (air,) + self.args[1:]
+        with pytest.raises(ValueError) as err:
+            forecast.hli_cube(*args, block_size=32)
+        assert err.value.reason == 'missing'
+        assert err.value.indices == [(2, 1, 3, 0), (2, 1, 3, 1)]
+        h = forecast.hli_cube(*args, block_size=32, on_invalid='nan')
+        assert np.isnan(h[mask]).all()
+        assert np.array_equal(h[~mask], batch.hli_no_bg(*self.args)[~mask])
+        ind = forecast.indicator_cube(*args, block_size=32, on_invalid='nan')
+        assert (ind[mask] == batch.INVALID_INDICATOR).all()
+
+    def test_cold_members(self):
+        """Test sub-zero members are NEGLEGIBLE and counted as members."""
+        self.air_temp[1, 2, 3, :4] = 0
+        self.r_hum[1, 2, 3, :4] = 20
+        self.solar_rad[1, 2, 3] = 0
+        self.w_speed[1, 2, 3, :4] = 25
+        h = forecast.hli_cube(*self.args, block_size=32)
+        assert (h[1, 2, 3, :4] < 0).all()
+        ind = forecast.indicator_cube(*self.args, block_size=32,
+                                      on_invalid='nan')
+        assert (ind[1, 2, 3, :4] == Indicator.NEGLEGIBLE.value).all()
+        expected = (ind[1, 2, 3] >= Indicator.HIGH.value).mean()
+        for on_invalid in ('raise', 'nan'):
+            got = forecast.exceedance(*self.args, block_size=40,
+                                      on_invalid=on_invalid)
+            assert got[1, 2, 3] == expected
+        got = forecast.exceedance(*self.args, level=Indicator.NEGLEGIBLE,
+                                  on_invalid='nan')
+        assert got[1, 2, 3] == 1.0
@@ -1,8 +1,12 @@
 """
 Tests for `heat_load` module.
 """
+import itertools
+
 import pytest
-from labwelfare import Indicator, hli, hli_bg, hli_indicator, hli_no_bg
+from labwelfare import (Indicator, hli, hli_bg, hli_bg_fast, hli_fast,
+                        hli_indicator, hli_indicator_fast, hli_no_bg,
+                        hli_no_bg_fast)
 
 
 class TestHLI(object):
@@ -128,6 +132,13 @@ class TestHLI(object):
         indicator = hli_indicator(300)
         assert indicator == expected
 
+    def test_hli_indicator_gaps(self):
+        """Test values in (0, 1] and (20, 21] do not fall through."""
+        assert hli_indicator(0.5) == Indicator.NEGLEGIBLE.value
+        assert hli_indicator(1) == Indicator.NEGLEGIBLE.value
+        assert hli_indicator(20) == Indicator.LOW.value
+        assert hli_indicator(20.5) == Indicator.MEDIUM.value
+
     def test_hli_indicator_hli_non_numeric(self):
         """Test for invalid non-numeric value for hli."""
         with pytest.raises(ValueError):
@@ -148,6 +159,15 @@ class TestHLI(object):
         with pytest.raises(ValueError):
             hli_indicator(98, threshold=-1)
 
+    def test_hli_indicator_nan(self):
+        """Test NaN hli or threshold raise instead of being EXTREME."""
+        with pytest.raises(ValueError):
+            hli_indicator(float('nan'))
+        with pytest.raises(ValueError):
+            hli_indicator(98, threshold=float('nan'))
+        with pytest.raises(ValueError):
+            hli(True, bg_temp=float('nan'), rel_hum=50, wind_speed=2)
+
     def test_hli_from_bg(self):
         """Teste heat load index from black globe arguments."""
         expected_hli = pytest.approx(97.91, 0.1)
@@ -184,6 +204,40 @@ class TestHLI(object):
             }
             hli(True, **arguments)
 
+    def test_hli_one_required_argument_missing(self):
+        """Test a missing wind speed alone is reported."""
+        with pytest.raises(ValueError):
+            hli(True, bg_temp=self.bg_temp, rel_hum=self.r_hum)
+
+    def test_hli_missing_temperature(self):
+        """Test missing black globe and air temperature raise."""
+        with pytest.raises(ValueError):
+            hli(True, rel_hum=self.r_hum, wind_speed=self.w_speed,
+                solar_rad=self.solar_rad)
+
+    def test_hli_fast_bit_identical(self):
+        """Test the fast path gives exactly the validated results."""
+        temps = [0, 12.5, 25, 27.4, 39, 47.3]
+        hums = [0, 33.3, 93]
+        winds = [0, 0.7, 12.9]
+        for temp, r_hum, w_speed in itertools.product(temps, hums, winds):
+            assert hli_bg_fast(temp, r_hum, w_speed) == \
+                hli_bg(temp, r_hum, w_speed)
+            assert hli_no_bg_fast(temp, r_hum, 410.5, w_speed) == \
+                hli_no_bg(temp, r_hum, 410.5, w_speed)
+        for value in [0, 0.5, 19, 20.5, 86, 97, 100, 300]:
+            assert hli_indicator_fast(value) == hli_indicator(value)
+
+    def test_hli_fast_dispatch(self):
+        """Test the fast dispatcher against ``hli``."""
+        assert hli_fast(self.r_hum, self.w_speed, bg_temp=self.bg_temp) == \
+            hli(True, bg_temp=self.bg_temp, rel_hum=self.r_hum,
+                wind_speed=self.w_speed)
+        assert hli_fast(66, 9.7, air_temp=self.air_temp,
+                        solar_rad=self.solar_rad, threshold=60) == \
+            hli(True, air_temp=self.air_temp, rel_hum=66, wind_speed=9.7,
+                solar_rad=self.solar_rad, threshold=60)
+
     def teardown_method(self, method):
         pass
 
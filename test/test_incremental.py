@@ -0,0 +1,120 @@
+"""
+Tests for `incremental` module.
+"""
+import numpy as np
+from labwelfare import ahl, batch, incremental, reports
+
+
+class TestIncremental(object):
+
+    def setup_method(self, method):
+        rng = np.random.RandomState(804)
+        # three days of hourly readings of two pens
+        size = 72
+        self.pen = np.repeat(['a', 'b'], size)
+        self.timestamp = 1577836800 + 3600 * np.tile(np.arange(size), 2)
+        # black globe readings, a third of them without one
+        self.bg_temp = rng.uniform(25, 45, 2 * size)
+        self.bg_temp[::3] = np.nan
+        self.air_temp = rng.uniform(20, 40, 2 * size)
+        self.rel_hum = rng.uniform(30, 95, 2 * size)
+        self.solar_rad = rng.uniform(0, 1000, 2 * size)
+        self.wind_speed = rng.uniform(0, 8, 2 * size)
+        self.inc = incremental.IncrementalHLI(threshold=86)
+
+    def upsert(self, index):
+        return self.inc.upsert(
+            self.pen[index], self.timestamp[index], self.rel_hum[index],
+            self.wind_speed[index], self.bg_temp[index],
+            self.air_temp[index], self.solar_rad[index])
+
+    def expected(self, pen):
+        """Full recompute of a pen from the fixture readings."""
+        rows = self.pen == pen
+        bg = self.bg_temp[rows]
+        h = np.where(
+            np.isnan(bg),
+            batch.hli_no_bg(self.air_temp[rows], self.rel_hum[rows],
+                            self.solar_rad[rows], self.wind_speed[rows]),
+            batch.hli_bg(np.nan_to_num(bg), self.rel_hum[rows],
+                         self.wind_speed[rows]))
+        floor = np.maximum(h, 0)
+        return (h, batch.hli_indicator(floor, 86), ahl.ahl_series(h, 86),
+                reports.daily_report(self.pen[rows], self.timestamp[rows],
+                                     floor, 86))
+
+    def check(self, pen):
+        series = self.inc.series(pen)
+        h, ind, load, report = self.expected(pen)
+        assert np.array_equal(series['timestamp'],
+                              self.timestamp[self.pen == pen])
+        assert np.allclose(series['hli'], h)
+        assert np.array_equal(series['indicator'], ind)
+        assert np.allclose(series['ahl'], load)
+        got = self.inc.daily_report(pen)
+        assert got.pen.tolist() == report.pen.tolist()
+        for name in reports.WindowReport._fields[1:]:
+            assert np.allclose(np.asarray(getattr(got, name), dtype=float),
+                               np.asarray(getattr(report, name), dtype=float))
+
+    def test_initial_load(self):
+        """Test a shuffled first load equals a full computation."""
+        changes = self.upsert(np.random.RandomState(1).permutation(144))
+        assert self.inc.pens() == ['a', 'b']
+        assert changes['a'] == incremental.Change(1577836800, 72)
+        self.check('a')
+        self.check('b')
+
+    def test_late_correction(self):
+        """Test a correction recomputes its row and the tail only."""
+        self.upsert(np.arange(144))
+        self.rel_hum[40] = 99.0
+        self.bg_temp[41] = 44.0
+        changes = self.upsert(np.arange(144))
+        assert list(changes) == ['a']
+        assert changes['a'] == incremental.Change(
+            int(self.timestamp[40]), 2)
+        self.check('a')
+        self.check('b')
+
+    def test_unchanged_upsert(self):
+        """Test readings equal to the stored ones change nothing."""
+        self.upsert(np.arange(144))
+        assert self.upsert(np.arange(144)) == {}
+
+    def test_late_insert(self):
+        """Test late readings are merged in timestamp order."""
+        missing = np.r_[3, 10, 11, 50, 100]
+        self.upsert(np.setdiff1d(np.arange(144), missing))
+        changes = self.upsert(missing)
+        assert changes['a'].start == self.timestamp[3]
+        assert changes['a'].rows == 4
+        assert changes['b'].rows == 1
+        self.check('a')
+        self.check('b')
+
+    def test_duplicates_last_wins(self):
+        """Test the last duplicate of a (pen, timestamp) wins."""
+        self.upsert(np.arange(144))
+        inc = self.inc
+        inc.upsert('a', [self.timestamp[5]] * 2, [10.0, self.rel_hum[5]],
+                   self.wind_speed[5], self.bg_temp[5], self.air_temp[5],
+                   self.solar_rad[5])
+        self.check('a')
+
+    def test_threshold_registry(self):
+        """Test thresholds looked up per pen."""
+        class Registry(object):
+            def threshold(self, pen):
+                return {'a': 86, 'b': 80}[pen]
+
+        self.inc = incremental.IncrementalHLI(threshold=Registry())
+        self.upsert(np.arange(144))
+        self.check('a')
+        rows = self.pen == 'b'
+        h = self.inc.series('b')['hli']
+        assert np.allclose(self.inc.series('b')['ahl'],
+                           ahl.ahl_series(h, 80))
+        assert np.array_equal(self.inc.series('b')['indicator'],
+                              batch.hli_indicator(np.maximum(h, 0), 80))
+        assert rows.sum() == len(h)
@@ -0,0 +1,120 @@
+"""
+Tests for `inverse` module.
+"""
+import numpy as np
+import pytest
+from labwelfare import batch, hli_bg, hli_no_bg, inverse
+
+
+class TestInverse(object):
+
+    def setup_method(self, method):
+        rng = np.random.RandomState(804)
+        # random conditions of a pen
+        self.rel_hum = rng.uniform(0, 100, 500)
+        self.wind_speed = rng.uniform(0, 30, 500)
+        self.solar_rad = rng.uniform(0, 1200, 500)
+        self.bg_temp = rng.uniform(25, 45, 500)
+
+    def test_solve_bg_temp(self):
+        """Test the solved temperature gives the threshold index."""
+        bg = inverse.solve_bg_temp(self.rel_hum, self.wind_speed, 86)
+        found = np.isfinite(bg)
+        assert found.any()
+        assert np.allclose(batch.hli_bg(bg[found], self.rel_hum[found],
+                                        self.wind_speed[found]), 86)
+
+    def test_solve_bg_temp_scalar(self):
+        """Test scalar conditions against the scalar hli_bg."""
+        bg = inverse.solve_bg_temp(93, 12.9, 90)
+        assert hli_bg(bg, 93, 12.9) == pytest.approx(90, abs=1e-9)
+        assert hli_bg(bg + 0.01, 93, 12.9) > 90
+
+    def test_out_of_bracket(self):
+        """Test NaN when nothing is safe and inf when everything is."""
+        got = inverse.solve_bg_temp([100, 0], [0, 60], [20, 86])
+        assert np.isnan(got[0])
+        assert np.isinf(got[1])
+
+    def test_threshold_array(self):
+        """Test one threshold per condition."""
+        threshold = np.linspace(70, 100, 500)
+        bg = inverse.max_bg_temp(self.rel_hum, self.wind_speed, threshold)
+        found = np.isfinite(bg)
+        assert np.allclose(batch.hli_bg(bg[found], self.rel_hum[found],
+                                        self.wind_speed[found]),
+                           threshold[found])
+
+    def test_contour_table(self):
+        """Test table lookups stay within the table error bound."""
+        for threshold in (70, 86, 100):
+            solved = inverse.solve_bg_temp(self.rel_hum, self.wind_speed,
+                                           threshold)
+            got = inverse.max_bg_temp(self.rel_hum, self.wind_speed,
+                                      threshold)
+            assert np.array_equal(np.isnan(got), np.isnan(solved))
+            assert np.array_equal(np.isinf(got), np.isinf(solved))
+            found = np.isfinite(solved)
+            assert np.abs(got[found] - solved[found]).max() <= \
+                inverse.TABLE_MAX_ABS_ERROR
+
+    def test_contour_table_off_grid(self):
+        """Test conditions off the table are solved."""
+        table = inverse.ContourTable(86, wind_range=(0, 10))
+        got = table.max_bg_temp([50, 50], [5, 20])
+        assert got[1] == inverse.solve_bg_temp(50, 20, 86)
+        assert inverse.contour_table(86.0) is inverse.contour_table(86.0)
+
+    def test_max_air_temp(self):
+        """Test the solved air temperature gives the threshold index."""
+        air = inverse.max_air_temp(self.rel_hum, self.solar_rad,
+                                   self.wind_speed, 86, table=False)
+        found = np.isfinite(air)
+        assert found.any()
+        assert np.allclose(
+            batch.hli_no_bg(air[found], self.rel_hum[found],
+                            self.solar_rad[found], self.wind_speed[found]),
+            86)
+        air = inverse.max_air_temp(60, 800, 3, 86)
+        assert hli_no_bg(air, 60, 800, 3) == pytest.approx(86, abs=0.01)
+
+    def test_air_temp_for_bg(self):
+        """Test the closed form inverts the predicted temperature."""
+        air = np.linspace(1, 50, 50)
+        bg = batch.predict_bg_temp(air, 500)
+        assert np.allclose(inverse.air_temp_for_bg(bg, 500), air)
+        assert np.isnan(inverse.air_temp_for_bg(-5, 500))
+
+    def test_follows_batch_coefficients(self, monkeypatch):
+        """Test the inversion reads the coefficients of batch."""
+        monkeypatch.setattr(batch, 'PRED_BG', (1.4, 2.5, 3.0, 4.0))
+        monkeypatch.setattr(batch, 'HLI_LOW', (1.2, 0.3, 1.1, 10.0))
+        air = np.linspace(1, 50, 50)
+        bg = batch.predict_bg_temp(air, 500)
+        assert np.allclose(inverse.air_temp_for_bg(bg, 500), air)
+        wind = inverse.min_wind_speed(self.rel_hum, 86,
+                                      bg_temp=self.bg_temp)
+        solved = np.isfinite(wind) & (wind > 0)
+        assert np.allclose(batch.hli_bg(self.bg_temp[solved],
+                                        self.rel_hum[solved], wind[solved]),
+                           86)
+
+    def test_min_wind_speed(self):
+        """Test the solved wind speed gives the threshold index."""
+        wind = inverse.min_wind_speed(self.rel_hum, 86, bg_temp=self.bg_temp)
+        solved = np.isfinite(wind) & (wind > 0)
+        assert solved.any()
+        assert np.allclose(batch.hli_bg(self.bg_temp[solved],
+                                        self.rel_hum[solved], wind[solved]),
+                           86)
+        safe = wind == 0
+        assert (batch.hli_bg(self.bg_temp[safe], self.rel_hum[safe], 0) <=
+                86).all()
+
+    def test_min_wind_speed_no_bg(self):
+        """Test wind speed from air temperature and solar radiation."""
+        wind = inverse.min_wind_speed(70, 86, air_temp=33, solar_rad=900)
+        assert hli_no_bg(33, 70, 900, wind) == pytest.approx(86, abs=1e-9)
+        assert np.isnan(inverse.min_wind_speed(100, 20, bg_temp=60))
+        with pytest.raises(ValueError):
+            inverse.min_wind_speed(70, 86, air_temp=33)
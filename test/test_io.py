@@ -0,0 +1,92 @@
+"""
+Tests for `io` module.
+"""
+import numpy as np
+import pytest
+from labwelfare import Indicator, batch, hli, hli_bg, hli_no_bg
+from labwelfare.io import iter_chunks, iter_hli
+
+
+class TestIO(object):
+
+    def setup_method(self, method):
+        # hourly readings of a station export
+        self.rows = [(39, 93, 12.9), (30, 60, 3.0), (25, 50, 1.0),
+                     (41, 70, 0.5), (33, 80, 2.2)]
+
+    def write_csv(self, path):
+        lines = ['Globe,Humidity,Wind,Station']
+        lines += ['{},{},{},A'.format(*row) for row in self.rows]
+        path.write_text('\n'.join(lines) + '\n')
+        return str(path)
+
+    def test_iter_chunks_csv(self, tmp_path):
+        """Test CSV chunks hold at most chunk_rows rows."""
+        path = self.write_csv(tmp_path / 'station.csv')
+        columns = {'Globe': 'bg_temp', 'Humidity': 'rel_hum',
+                   'Wind': 'wind_speed'}
+        chunks = list(iter_chunks(path, chunk_rows=2, columns=columns))
+        assert [len(c['bg_temp']) for c in chunks] == [2, 2, 1]
+        assert sorted(chunks[0]) == ['bg_temp', 'rel_hum', 'wind_speed']
+        assert chunks[2]['wind_speed'].tolist() == [2.2]
+
+    def test_iter_hli_csv_matches_scalar(self, tmp_path):
+        """Test streamed heat load index equals the scalar ``hli``."""
+        path = self.write_csv(tmp_path / 'station.csv')
+        columns = {'Globe': 'bg_temp', 'Humidity': 'rel_hum',
+                   'Wind': 'wind_speed'}
+        got_h, got_ind = [], []
+        for h, ind in iter_hli(path, chunk_rows=3, columns=columns):
+            got_h.extend(h.tolist())
+            got_ind.extend(ind.tolist())
+        expected = [hli(True, bg_temp=bg, rel_hum=rh, wind_speed=ws)
+                    for bg, rh, ws in self.rows]
+        assert got_h == pytest.approx([h for h, _ in expected])
+        assert got_ind == [ind for _, ind in expected]
+
+    def test_iter_hli_xlsx(self, tmp_path):
+        """Test XLSX workbooks with default column names."""
+        openpyxl = pytest.importorskip('openpyxl')
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet('log')
+        sheet.append(['air_temp', 'rel_hum', 'solar_rad', 'wind_speed'])
+        sheet.append([27.4, 66, 0, 9.7])
+        sheet.append([27.4, 66, None, 9.7])
+        path = str(tmp_path / 'station.xlsx')
+        workbook.save(path)
+        (h, ind), = list(iter_hli(path, sheet='log'))
+        assert h[0] == pytest.approx(63.15, 0.1)
+        assert np.isnan(h[1])
+        assert ind.tolist() == [Indicator.MEDIUM.value,
+                                batch.INVALID_INDICATOR]
+
+    def test_iter_hli_csv_blank(self, tmp_path):
+        """Test blank cells are invalid readings, never EXTREME."""
+        path = tmp_path / 'station.csv'
+        path.write_text('bg_temp,rel_hum,wind_speed\n39,93,12.9\n'
+                        ',60,3.0\n30,x,3.0\n')
+        (h, ind), = list(iter_hli(str(path)))
+        assert np.isnan(h[1:]).all()
+        assert ind.tolist() == [Indicator.HIGH.value,
+                                batch.INVALID_INDICATOR,
+                                batch.INVALID_INDICATOR]
+        with pytest.raises(ValueError):
+            list(iter_hli(str(path), on_invalid='raise'))
+
+    def test_iter_hli_mixed(self, tmp_path):
+        """Test rows without black globe use air temperature."""
+        path = tmp_path / 'station.csv'
+        path.write_text('bg_temp,air_temp,solar_rad,rel_hum,wind_speed\n'
+                        '39,,,93,12.9\n,27.4,0,66,9.7\n,,,66,9.7\n')
+        (h, ind), = list(iter_hli(str(path)))
+        assert h[0] == pytest.approx(hli_bg(39, 93, 12.9))
+        assert h[1] == pytest.approx(hli_no_bg(27.4, 66, 0, 9.7))
+        assert np.isnan(h[2])
+        assert ind[2] == batch.INVALID_INDICATOR
+
+    def test_iter_chunks_unknown_columns(self, tmp_path):
+        """Test files without any known column are rejected."""
+        path = tmp_path / 'station.csv'
+        path.write_text('a,b\n1,2\n')
+        with pytest.raises(ValueError):
+            list(iter_chunks(str(path)))
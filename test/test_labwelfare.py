@@ -0,0 +1,49 @@
+"""
+Tests for `labwelfare` package.
+"""
+import os
+import subprocess
+import sys
+
+import labwelfare
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(labwelfare.__file__)))
+
+
+def run(code):
+    """Run ``code`` in a fresh interpreter importing this checkout."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.check_output([sys.executable, '-c', code], env=env,
+                                   cwd=ROOT).decode().strip()
+
+
+class TestPackage(object):
+
+    def test_import_is_lean(self):
+        """Test importing the package loads no heavy dependency."""
+        loaded = run('import sys, labwelfare; print(sorted(m for m in '
+                     '("numpy", "openpyxl", "lxml", "asyncio") '
+                     'if m in sys.modules))')
+        assert loaded == '[]'
+
+    def test_scalar_api_is_lean(self):
+        """Test computing scalar values loads no heavy dependency."""
+        loaded = run('import sys, labwelfare; '
+                     'labwelfare.hli(True, bg_temp=39, rel_hum=93, '
+                     'wind_speed=12.9); print("numpy" in sys.modules)')
+        assert loaded == 'False'
+
+    def test_lazy_submodule(self):
+        """Test submodules are imported on first attribute access."""
+        loaded = run('import sys, labwelfare; labwelfare.batch; '
+                     'print("numpy" in sys.modules)')
+        assert loaded == 'True'
+        assert labwelfare.batch.hli_bg(39, 93, 12.9) == \
+            pytest.approx(labwelfare.hli_bg(39, 93, 12.9))
+        assert 'forecast' in dir(labwelfare)
+
+    def test_unknown_attribute(self):
+        """Test unknown attributes still raise AttributeError."""
+        with pytest.raises(AttributeError):
+            labwelfare.not_a_module
@@ -0,0 +1,109 @@
+"""
+Tests for `metrics` module.
+"""
+import numpy as np
+import pytest
+from labwelfare import batch, hli, hli_bg, metrics
+from labwelfare.metrics import METRICS, Metrics
+from labwelfare.serve import compute
+
+
+class TestMetrics(object):
+
+    def setup_method(self, method):
+        self.metrics = Metrics(buckets=(0.1, 1.0), enabled=True)
+
+    def test_counter_labels(self):
+        """Test counters are kept per label set."""
+        self.metrics.inc('calls', func='a')
+        self.metrics.inc('calls', 2, func='a')
+        self.metrics.inc('calls', func='b')
+        assert self.metrics.counter('calls', func='a') == 3
+        assert self.metrics.counter('calls', func='b') == 1
+        assert self.metrics.counter('calls', func='c') == 0
+
+    def test_to_dict(self):
+        """Test histogram counts per bucket, the last one unbounded."""
+        for value in (0.05, 0.5, 0.7, 3):
+            self.metrics.observe('latency', value, func='a')
+        histogram, = self.metrics.to_dict()['histograms']
+        assert histogram['labels'] == {'func': 'a'}
+        assert histogram['counts'] == [1, 2, 1]
+        assert histogram['count'] == 4
+        assert histogram['sum'] == pytest.approx(4.25)
+
+    def test_to_prometheus(self):
+        """Test the text exposition format."""
+        self.metrics.inc('calls_total', func='a')
+        self.metrics.observe('seconds', 0.5)
+        text = self.metrics.to_prometheus()
+        assert text.splitlines() == [
+            '# TYPE calls_total counter',
+            'calls_total{func="a"} 1',
+            '# TYPE seconds histogram',
+            'seconds_bucket{le="0.1"} 0',
+            'seconds_bucket{le="1.0"} 1',
+            'seconds_bucket{le="+Inf"} 1',
+            'seconds_sum 0.5',
+            'seconds_count 1']
+
+    def test_reset(self):
+        """Test reset drops collected values."""
+        self.metrics.inc('calls')
+        self.metrics.reset()
+        assert self.metrics.to_prometheus() == ''
+
+
+class TestInstrumentation(object):
+
+    def setup_method(self, method):
+        METRICS.reset()
+        metrics.enable()
+
+    def teardown_method(self, method):
+        metrics.disable()
+        METRICS.reset()
+
+    def test_disabled(self):
+        """Test nothing is collected while disabled."""
+        metrics.disable()
+        hli_bg(39, 93, 12.9)
+        batch.hli_bg(np.ones(3), 60, 2)
+        assert METRICS.to_dict() == {'counters': [], 'histograms': []}
+
+    def test_scalar_calls_and_rejections(self):
+        """Test scalar calls and rejected readings by reason."""
+        hli(True, bg_temp=39, rel_hum=93, wind_speed=12.9)
+        with pytest.raises(ValueError):
+            hli_bg(39, -1, 12.9)
+        with pytest.raises(ValueError):
+            hli_bg('39', 93, 12.9)
+        assert METRICS.counter('labwelfare_calls_total', func='hli') == 1
+        assert METRICS.counter('labwelfare_calls_total', func='hli_bg') == 3
+        assert METRICS.counter('labwelfare_rejected_total',
+                               reason='negative') == 1
+        assert METRICS.counter('labwelfare_rejected_total',
+                               reason='non_numeric') == 1
+
+    def test_batch_latency(self):
+        """Test batch calls are counted and timed."""
+        batch.hli(True, bg_temp=np.full(5, 30.0), rel_hum=60, wind_speed=2)
+        with pytest.raises(ValueError):
+            batch.hli_bg(np.ones(4), [60, -1, -2, 60], 2)
+        assert METRICS.counter('labwelfare_calls_total', func='hli') == 1
+        assert METRICS.counter('labwelfare_calls_total', func='hli_bg') == 2
+        assert METRICS.counter('labwelfare_readings_total', func='hli') == 5
+        assert METRICS.counter('labwelfare_rejected_total',
+                               reason='negative') == 2
+        timed = {h['labels']['func']: h['count']
+                 for h in METRICS.to_dict()['histograms']}
+        assert timed == {'hli': 1, 'hli_bg': 1, 'hli_indicator': 1}
+
+    def test_serve_rejections(self):
+        """Test micro-batch rejections by reason."""
+        compute([b'pen1,39,,,93,12.9', b'pen2,30,,,-5,1', b'pen3,,,,60,1',
+                 b'pen4,bad,,,60,1'])
+        assert METRICS.counter('labwelfare_rejected_total',
+                               reason='missing') == 2
+        assert METRICS.counter('labwelfare_rejected_total',
+                               reason='negative') == 1
@@ -0,0 +1,103 @@
+"""
+Tests for `parallel` module.
+"""
+import numpy as np
+import pytest
+from labwelfare import HLIResult, ahl, batch, parallel
+
+
+class TestParallel(object):
+
+    def setup_method(self, method):
+        rng = np.random.RandomState(804)
+        size = parallel.MIN_PARALLEL_SIZE + 2 * parallel.SHARD_ALIGN + 1234
+        # random readings of many pens
+        self.bg_temp = rng.uniform(15, 45, size)
+        self.r_hum = rng.uniform(10, 100, size)
+        self.w_speed = rng.uniform(0, 20, size)
+        self.threshold = rng.choice([86, 89, 96], size)
+
+    def test_hli_identical_to_serial(self):
+        """Test sharded heat load index equals the serial one exactly."""
+        expected = batch.hli(True, self.threshold, bg_temp=self.bg_temp,
+                             rel_hum=self.r_hum, wind_speed=self.w_speed)
+        got = parallel.hli(True, self.threshold, workers=2, shards=3,
+                           bg_temp=self.bg_temp, rel_hum=self.r_hum,
+                           wind_speed=self.w_speed)
+        assert isinstance(got, HLIResult)
+        assert np.array_equal(got.hli, expected.hli)
+        assert np.array_equal(got.indicator, expected.indicator)
+
+    def test_hli_on_invalid(self):
+        """Test the invalid policies and dtype reach every shard."""
+        self.r_hum[[3, -1]] = [-1, np.nan]
+        for on_invalid in ('nan', 'mask', 'clip'):
+            expected = batch.hli(True, self.threshold, on_invalid,
+                                 np.float32, bg_temp=self.bg_temp,
+                                 rel_hum=self.r_hum, wind_speed=self.w_speed)
+            got = parallel.hli(True, self.threshold, on_invalid, np.float32,
+                               workers=2, bg_temp=self.bg_temp,
+                               rel_hum=self.r_hum, wind_speed=self.w_speed)
+            assert got.hli.dtype == np.float32
+            assert np.array_equal(np.ma.getdata(got.hli),
+                                  np.ma.getdata(expected.hli),
+                                  equal_nan=True)
+            assert np.array_equal(np.ma.getdata(got.indicator),
+                                  np.ma.getdata(expected.indicator))
+            assert np.array_equal(np.ma.getmaskarray(got.hli),
+                                  np.ma.getmaskarray(expected.hli))
+
+    def test_hli_negative_indices(self):
+        """Test rejected readings are reported at their global index."""
+        self.r_hum[-1] = -1
+        with pytest.raises(ValueError) as err:
+            parallel.hli(bg_temp=self.bg_temp, rel_hum=self.r_hum,
+                         wind_speed=self.w_speed, workers=2)
+        assert err.value.indices == [len(self.r_hum) - 1]
+        self.r_hum[-1] = 50
+        self.bg_temp[-2] = np.nan
+        with pytest.raises(ValueError) as err:
+            parallel.hli(True, bg_temp=self.bg_temp, rel_hum=self.r_hum,
+                         wind_speed=self.w_speed, workers=2)
+        assert err.value.indices == [len(self.r_hum) - 2]
+        assert err.value.reason == 'missing'
+
+    def test_ahl_identical_to_serial(self):
+        """Test accumulated heat load sharded by pen equals the serial."""
+        hli = batch.hli_bg(self.bg_temp, self.r_hum, self.w_speed)
+        hli = hli[:100 * 400].reshape(100, 400)
+        upper = np.repeat([86.0, 96.0], 200)
+        expected = ahl.ahl_series(hli, upper=upper)
+        got = parallel.ahl(hli, upper=upper, workers=2, shards=4)
+        assert np.array_equal(got, expected)
+
+    def test_hli_files(self, tmp_path):
+        """Test weather logs computed in workers and mapped back."""
+        paths = []
+        for n in range(2):
+            path = tmp_path / 'pen{}.csv'.format(n)
+            lines = ['bg_temp,rel_hum,wind_speed']
+            lines += ['{},{},{}'.format(bg, rh, ws) for bg, rh, ws in
+                      zip(self.bg_temp[:10 + n], self.r_hum, self.w_speed)]
+            path.write_text('\n'.join(lines) + '\n')
+            paths.append(str(path))
+        results = parallel.hli_files(paths, str(tmp_path), workers=2,
+                                     chunk_rows=4)
+        assert [len(h) for h, _ in results] == [10, 11]
+        expected = batch.hli_bg(self.bg_temp[:11], self.r_hum[:11],
+                                self.w_speed[:11])
+        assert results[1][0] == pytest.approx(expected)
+
+    def test_hli_files_same_name(self, tmp_path):
+        """Test logs of the same name in other directories stay apart."""
+        paths = []
+        for n in range(2):
+            path = tmp_path / 'pen{}'.format(n) / 'pen.csv'
+            path.parent.mkdir()
+            path.write_text('bg_temp,rel_hum,wind_speed\n{},{},{}\n'.format(
+                self.bg_temp[n], self.r_hum[n], self.w_speed[n]))
+            paths.append(str(path))
+        results = parallel.hli_files(paths, str(tmp_path), workers=2)
+        expected = batch.hli_bg(self.bg_temp[:2], self.r_hum[:2],
+                                self.w_speed[:2])
+        assert [h[0] for h, _ in results] == pytest.approx(expected)
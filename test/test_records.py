@@ -0,0 +1,110 @@
+"""
+Tests for `records` module.
+"""
+import sys
+
+import numpy as np
+import pytest
+from labwelfare import (HLIResult, batch, hli, hli_bg, hli_indicator,
+                        hli_no_bg)
+from labwelfare.records import Reading, ReadingBatch
+
+
+class TestRecords(object):
+
+    def setup_method(self, method):
+        # reading with black globe temperature
+        self.bg = Reading(rel_hum=93, wind_speed=12.9, bg_temp=39)
+        # reading without black globe temperature
+        self.no_bg = Reading(rel_hum=60, wind_speed=2, air_temp=27.4,
+                             solar_rad=800, threshold=80)
+
+    def test_reading_slots(self):
+        """Test readings have no instance dict."""
+        assert not hasattr(self.bg, '__dict__')
+        with pytest.raises(AttributeError):
+            self.bg.pen = 'a'
+        assert sys.getsizeof(self.bg) < sys.getsizeof(
+            {'rel_hum': 93, 'wind_speed': 12.9, 'bg_temp': 39})
+
+    def test_reading_eq_repr(self):
+        """Test readings compare by value."""
+        assert self.bg == Reading(93, 12.9, 39)
+        assert self.bg != self.no_bg
+        assert repr(self.bg) == \
+            'Reading(rel_hum=93, wind_speed=12.9, bg_temp=39, threshold=86)'
+
+    def test_hli_reading(self):
+        """Test scalar hli of a reading equals the kwargs one."""
+        assert hli(True, reading=self.bg) == hli(
+            True, rel_hum=93, wind_speed=12.9, bg_temp=39)
+        h, ind = hli(True, reading=self.no_bg)
+        assert h == hli_no_bg(27.4, 60, 800, 2)
+        assert ind == hli_indicator(h, 80)
+
+    def test_hli_result(self):
+        """Test hli returns named results that are still tuples."""
+        result = hli(True, reading=self.bg)
+        assert isinstance(result, HLIResult)
+        assert result.hli == hli_bg(39, 93, 12.9)
+        assert result == (result.hli, result.indicator)
+        assert hli(reading=self.bg).indicator is None
+
+    def test_hli_reading_invalid(self):
+        """Test an invalid reading raises like the kwargs hli."""
+        with pytest.raises(ValueError):
+            hli(reading=Reading(-1, 2, bg_temp=30))
+        with pytest.raises(ValueError):
+            hli(reading=Reading(60, 2, air_temp=30))
+
+    def test_batch_from_readings(self):
+        """Test a batch round trips its readings."""
+        readings = [self.bg, self.no_bg, self.bg]
+        rb = ReadingBatch.from_readings(readings)
+        assert len(rb) == 3
+        assert rb.rel_hum.flags.c_contiguous
+        assert np.isnan(rb.bg_temp[1])
+        assert rb.threshold.tolist() == [86, 80, 86]
+        assert [rb[i] for i in range(3)] == [
+            Reading(93.0, 12.9, 39.0), Reading(60.0, 2.0, air_temp=27.4,
+                                               solar_rad=800.0,
+                                               threshold=80.0),
+            Reading(93.0, 12.9, 39.0)]
+        assert rb.nbytes == 3 * 8 * 6
+
+    def test_batch_hli_mixed(self):
+        """Test batch hli of a mixed batch equals the scalar results."""
+        rb = ReadingBatch.from_readings([self.bg, self.no_bg, self.bg])
+        h, ind = batch.hli(True, readings=rb)
+        expected = [hli(True, reading=r) for r in
+                    (self.bg, self.no_bg, self.bg)]
+        assert np.allclose(h, [e.hli for e in expected])
+        assert ind.tolist() == [e.indicator for e in expected]
+
+    def test_batch_hli_columns(self):
+        """Test batch hli of a batch equals the kwargs one."""
+        rb = ReadingBatch(rel_hum=[60, 70], wind_speed=2, bg_temp=[30, 35],
+                          dtype=np.float32)
+        assert rb.wind_speed.dtype == np.float32
+        result = batch.hli(True, readings=rb, dtype=np.float32)
+        expected = batch.hli(True, bg_temp=[30, 35], rel_hum=[60, 70],
+                             wind_speed=2, dtype=np.float32)
+        assert isinstance(result, HLIResult)
+        assert np.array_equal(result.hli, expected.hli)
+
+    def test_batch_hli_invalid(self):
+        """Test negative readings are reported at their batch index."""
+        rb = ReadingBatch.from_readings(
+            [self.bg, self.no_bg, Reading(-1, 2, air_temp=30, solar_rad=0)])
+        with pytest.raises(ValueError) as err:
+            batch.hli(readings=rb)
+        assert err.value.indices == [2]
+        h = batch.hli(readings=rb, on_invalid='mask').hli
+        assert h.mask.tolist() == [False, False, True]
+
+    def test_batch_invalid(self):
+        """Test batches without a complete set of columns are rejected."""
+        with pytest.raises(ValueError):
+            ReadingBatch([60], [2], air_temp=[30])
+        with pytest.raises(ValueError):
+            ReadingBatch([60, 70], [2, 3, 4], bg_temp=30)
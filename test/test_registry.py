@@ -0,0 +1,58 @@
+"""
+Tests for `registry` module.
+"""
+import numpy as np
+import pytest
+from labwelfare import Indicator, batch
+from labwelfare.ahl import AHLAccumulator
+from labwelfare.registry import ThresholdRegistry
+
+
+class TestThresholdRegistry(object):
+
+    def setup_method(self, method):
+        self.registry = ThresholdRegistry()
+        self.registry.register('pen1')
+        self.registry.register('pen2', genotype='bos_indicus_100')
+        self.registry.register('pen3', shade_area=3.5, adjustment=-1)
+
+    def test_register(self):
+        """Test genotype, shade and site adjustments."""
+        assert self.registry.threshold('pen1') == 86
+        assert self.registry.threshold('pen2') == 96
+        assert self.registry.threshold('pen3') == 90
+        assert len(self.registry) == 3
+
+    def test_unknown_genotype(self):
+        """Test unknown genotypes are rejected."""
+        with pytest.raises(ValueError):
+            self.registry.register('pen4', genotype='unknown')
+
+    def test_compile_cached(self):
+        """Test the compiled arrays are reused until a pen changes."""
+        pens, thresholds = self.registry.compile()
+        assert pens.tolist() == ['pen1', 'pen2', 'pen3']
+        assert thresholds.tolist() == [86, 96, 90]
+        assert self.registry.compile()[1] is thresholds
+        self.registry.register('pen1', genotype='bos_indicus_50')
+        assert self.registry.thresholds().tolist() == [92, 96, 90]
+
+    def test_thresholds_per_reading(self):
+        """Test a mixed herd is classified in one batch call."""
+        pens = np.array(['pen2', 'pen1', 'pen3', 'pen1'])
+        thresholds = self.registry.thresholds(pens)
+        assert thresholds.tolist() == [96, 86, 90, 86]
+        ind = batch.hli_indicator([90, 90, 90, 80], thresholds)
+        assert ind.tolist() == [Indicator.MEDIUM.value, Indicator.HIGH.value,
+                                Indicator.MEDIUM.value,
+                                Indicator.MEDIUM.value]
+
+    def test_ahl_mixed_herd(self):
+        """Test compiled thresholds drive the accumulated heat load."""
+        acc = AHLAccumulator(upper=self.registry.thresholds())
+        assert acc.update([97, 97, 97]).tolist() == [11, 1, 7]
+
+    def test_unknown_pen(self):
+        """Test unknown pens are reported."""
+        with pytest.raises(KeyError):
+            self.registry.thresholds(['pen1', 'pen9'])
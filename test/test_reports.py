@@ -0,0 +1,76 @@
+"""
+Tests for `reports` module.
+"""
+import numpy as np
+import pytest
+from labwelfare import Indicator, reports
+
+
+class TestReports(object):
+
+    def setup_method(self, method):
+        rng = np.random.RandomState(804)
+        # two days of hourly readings of three pens, shuffled
+        hours = np.arange(48)
+        self.pen = np.repeat(['a', 'b', 'c'], 48)
+        self.timestamp = 1577836800 + 3600 * np.tile(hours, 3)
+        self.hli = rng.uniform(60, 110, 3 * 48)
+        self.hli[5] = np.nan
+        self.order = rng.permutation(3 * 48)
+
+    def shuffled(self):
+        return (self.pen[self.order], self.timestamp[self.order],
+                self.hli[self.order])
+
+    def test_daily_report(self):
+        """Test daily aggregates against a direct computation."""
+        report = reports.daily_report(*self.shuffled())
+        assert report.pen.tolist() == ['a', 'a', 'b', 'b', 'c', 'c']
+        assert report.start.tolist() == [1577836800, 1577923200] * 3
+
+        day = self.hli[48:72]
+        assert report.max[2] == day.max()
+        assert report.mean[2] == pytest.approx(day.mean())
+        assert report.hours_above[2] == (day > 86).sum()
+        assert report.hours[2].sum() == 24
+
+        first = self.hli[:24]
+        assert report.count[0] == 23
+        assert report.max[0] == np.nanmax(first)
+        assert report.mean[0] == pytest.approx(np.nanmean(first))
+
+    def test_hours_per_indicator(self):
+        """Test hours in each indicator class with sample_hours."""
+        report = reports.hourly_report(['a'] * 4, [0, 600, 1200, 3600],
+                                       [50, 90, 101, 90], sample_hours=0.25)
+        assert report.start.tolist() == [0, 3600]
+        medium = Indicator.MEDIUM.value - 1
+        high = Indicator.HIGH.value - 1
+        extreme = Indicator.EXTREME.value - 1
+        assert report.hours[0, [medium, high, extreme]].tolist() == \
+            [0.25, 0.25, 0.25]
+        assert report.hours_above.tolist() == [0.5, 0.25]
+
+    def test_cold_night(self):
+        """Test a negative hourly heat load index is a NEGLEGIBLE hour."""
+        report = reports.daily_report(['a', 'a'], [0, 3600], [90, -2])
+        assert report.count.tolist() == [2]
+        assert report.mean.tolist() == [44.0]
+        neglegible = Indicator.NEGLEGIBLE.value - 1
+        high = Indicator.HIGH.value - 1
+        assert report.hours[0, [neglegible, high]].tolist() == [1.0, 1.0]
+        assert report.hours_above.tolist() == [1.0]
+
+    def test_rolling_mean(self):
+        """Test trailing window means in the input order."""
+        pen, timestamp, hli = self.shuffled()
+        got = reports.rolling_mean(pen, timestamp, hli, window=3 * 3600)
+        at = 1577836800 + 10 * 3600
+        i = int(np.flatnonzero((pen == 'b') & (timestamp == at))[0])
+        assert got[i] == pytest.approx(self.hli[48 + 8:48 + 11].mean())
+
+    def test_rolling_hours_above(self):
+        """Test trailing hours above the threshold stay within a pen."""
+        got = reports.rolling_hours_above(['a', 'a', 'b'], [0, 3600, 3600],
+                                          [90, 95, 99], window=2 * 3600)
+        assert got.tolist() == [1.0, 2.0, 1.0]
@@ -0,0 +1,126 @@
+"""
+Tests for `resample` module.
+"""
+import numpy as np
+import pytest
+from labwelfare import Indicator, batch, resample
+
+
+class TestResample(object):
+
+    def setup_method(self, method):
+        rng = np.random.RandomState(804)
+        # a day of readings 1 to 15 minutes apart
+        steps = rng.randint(60, 901, 200)
+        self.timestamp = 1577836800 + 30 + np.cumsum(steps)
+        self.bg_temp = rng.uniform(25, 45, 200)
+        self.rel_hum = rng.uniform(30, 95, 200)
+        self.wind_speed = rng.uniform(0, 8, 200)
+
+    def test_grid(self):
+        """Test grid points are aligned on the step."""
+        points = resample.grid(1000, 10000, 3600)
+        assert points.tolist() == [3600, 7200]
+        assert resample.grid(3600, 7200, 3600).tolist() == [3600, 7200]
+        assert resample.grid(1000, 10000, 3600, 1800).tolist() == \
+            [1800, 5400, 9000]
+
+    def test_matches_interp(self):
+        """Test interpolation equals numpy.interp within the readings."""
+        points, columns = resample.resample(
+            self.timestamp, max_gap=900, rel_hum=self.rel_hum,
+            bg_temp=self.bg_temp)
+        assert (points % 3600 == 0).all()
+        assert points[0] >= self.timestamp[0]
+        assert points[-1] <= self.timestamp[-1]
+        for name in ('rel_hum', 'bg_temp'):
+            expected = np.interp(points, self.timestamp, getattr(self, name))
+            assert np.allclose(columns[name], expected)
+
+    def test_max_gap(self):
+        """Test grid points in long gaps are NaN."""
+        timestamp = np.array([0, 600, 4200, 7200, 7500])
+        values = np.array([1.0, 2.0, 3.0, 4.0, 5.0])
+        points, columns = resample.resample(timestamp, max_gap=3000,
+                                            start=0, stop=10800, v=values)
+        assert points.tolist() == [0, 3600, 7200, 10800]
+        got = columns['v']
+        assert got[0] == 1.0
+        assert np.isnan(got[1])
+        assert got[2] == 4.0
+        # past the last reading
+        assert np.isnan(got[3])
+
+    def test_column_dropouts(self):
+        """Test NaN readings widen the gaps of their column only."""
+        timestamp = np.arange(0, 7201, 1800)
+        a = np.array([0.0, np.nan, np.nan, np.nan, 4.0])
+        b = np.arange(5.0)
+        _, columns = resample.resample(timestamp, max_gap=3600, a=a, b=b)
+        assert np.isnan(columns['a'][1])
+        assert columns['b'].tolist() == [0.0, 2.0, 4.0]
+
+    def test_unsorted_duplicates(self):
+        """Test unsorted readings are sorted and the last duplicate kept."""
+        timestamp = np.array([3600, 0, 1800, 1800])
+        values = np.array([3.0, 1.0, 5.0, 2.0])
+        points, columns = resample.resample(timestamp, step=1800, v=values)
+        assert points.tolist() == [0, 1800, 3600]
+        assert columns['v'].tolist() == [1.0, 2.0, 3.0]
+
+    def test_invalid(self):
+        """Test invalid arguments are rejected."""
+        with pytest.raises(ValueError):
+            resample.resample([0, 1], step=0, v=[1, 2])
+        with pytest.raises(ValueError):
+            resample.resample([0, 1], v=[1, 2, 3])
+        with pytest.raises(ValueError):
+            resample.resample([0, 1], v=['a', 'b'])
+
+    def test_empty(self):
+        """Test no readings give an empty grid, or NaN over a given one."""
+        for start, stop in [(None, None), (None, 7200), (0, None)]:
+            points, columns = resample.resample([], v=[], start=start,
+                                                stop=stop)
+            assert len(points) == 0
+            assert len(columns['v']) == 0
+        points, columns = resample.resample([], v=[], start=0, stop=7200)
+        assert points.tolist() == [0, 3600, 7200]
+        assert np.isnan(columns['v']).all()
+
+    def test_hli(self):
+        """Test heat load index of the resampled readings."""
+        self.timestamp[100:] += 7200
+        points, h, ind = resample.hli(
+            self.timestamp, max_gap=1800, indicator=True,
+            bg_temp=self.bg_temp, rel_hum=self.rel_hum,
+            wind_speed=self.wind_speed)
+        _, columns = resample.resample(
+            self.timestamp, max_gap=1800, bg_temp=self.bg_temp,
+            rel_hum=self.rel_hum, wind_speed=self.wind_speed)
+        valid = ~np.isnan(columns['bg_temp'])
+        assert not valid.all()
+        assert np.isnan(h[~valid]).all()
+        assert np.allclose(h[valid], batch.hli_bg(
+            columns['bg_temp'][valid], columns['rel_hum'][valid],
+            columns['wind_speed'][valid]))
+        assert (ind[~valid] == batch.INVALID_INDICATOR).all()
+        assert len(points) == len(h)
+
+    def test_hli_start_stop(self):
+        """Test the grid bounds reach hli, also without readings."""
+        points, h, ind = resample.hli([], indicator=True, start=0,
+                                      stop=7200, bg_temp=[], rel_hum=[],
+                                      wind_speed=[])
+        assert points.tolist() == [0, 3600, 7200]
+        assert np.isnan(h).all()
+        assert (ind == batch.INVALID_INDICATOR).all()
+
+    def test_hli_cold(self):
+        """Test sub-zero grid points are NEGLEGIBLE, not invalid."""
+        points, h, ind = resample.hli(
+            [0, 3600, 7200], indicator=True, start=0, stop=7200,
+            bg_temp=[-5, -6, -4], rel_hum=[10, 10, 10],
+            wind_speed=[20, 20, 20])
+        assert (h < 0).all()
+        assert (ind == Indicator.NEGLEGIBLE.value).all()
@@ -0,0 +1,107 @@
+"""
+Tests for `serve` module.
+"""
+import asyncio
+
+import pytest
+from labwelfare import Indicator, hli_bg, hli_no_bg, metrics
+from labwelfare.serve import HLIService, compute
+
+
+async def fake_publisher(port, lines):
+    """Send reading lines to the service like a sensor gateway."""
+    _, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(b''.join(line + b'\n' for line in lines))
+    await writer.drain()
+    writer.close()
+
+
+async def collect(lines, window_size, window_ms=20):
+    service = HLIService(window_size=window_size, window_ms=window_ms)
+    server = await service.start(port=0)
+    port = server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(b'SUBSCRIBE\n')
+    await writer.drain()
+    while not service.subscribers:
+        await asyncio.sleep(0.001)
+
+    await fake_publisher(port, lines)
+    results = []
+    while len(results) < len(lines) - service.stats['rejected']:
+        line = await asyncio.wait_for(reader.readline(), 5)
+        results.append(line.rstrip(b'\n').split(b','))
+    writer.close()
+    server.close()
+    await server.wait_closed()
+    return service, results
+
+
+class TestServe(object):
+
+    def setup_method(self, method):
+        # readings with black globe, without it and an invalid one
+        self.lines = [b'pen1,39,,,93,12.9', b'pen2,,27.4,0,66,9.7',
+                      b'pen3,30,,,-5,1', b'pen4,41,,,70,0.5']
+
+    def test_compute(self):
+        """Test a micro-batch against the scalar functions."""
+        pens, h, ind, rejected = compute(self.lines)
+        assert pens == [b'pen1', b'pen2', b'pen4']
+        assert h.tolist() == pytest.approx([
+            hli_bg(39, 93, 12.9), hli_no_bg(27.4, 66, 0, 9.7),
+            hli_bg(41, 70, 0.5)])
+        assert ind.tolist()[:2] == [Indicator.HIGH.value,
+                                    Indicator.MEDIUM.value]
+        assert rejected == 1
+
+    def test_compute_cold(self):
+        """Test sub-zero readings are NEGLEGIBLE, not a failed batch."""
+        lines = self.lines + [b'pen5,,0,0,20,25', b'pen6,-5,,,10,20']
+        pens, h, ind, rejected = compute(lines)
+        assert pens[-2:] == [b'pen5', b'pen6']
+        assert h[-2:].tolist() == pytest.approx([
+            hli_no_bg(0, 20, 0, 25), hli_bg(-5, 10, 20)])
+        assert (h[-2:] < 0).all()
+        assert ind[-2:].tolist() == [Indicator.NEGLEGIBLE.value] * 2
+        assert rejected == 1
+
+    def test_service_window_timeout(self):
+        """Test readings below the window size are flushed by the timer."""
+        service, results = asyncio.run(collect(self.lines, window_size=100))
+        assert [r[0] for r in results] == [b'pen1', b'pen2', b'pen4']
+        assert float(results[0][1]) == pytest.approx(97.91, 0.1)
+        assert service.stats['batches'] == 1
+        assert service.stats['rejected'] == 1
+
+    def test_service_window_size(self):
+        """Test many readings are computed in batches of window_size."""
+        lines = [b'pen%d,%d,,,60,2' % (i, 20 + i % 20) for i in range(1000)]
+        service, results = asyncio.run(collect(lines, window_size=256,
+                                               window_ms=1000))
+        assert len(results) == 1000
+        assert results[999][0] == b'pen999'
+        assert service.stats['batches'] >= 4
+
+    def test_service_metrics(self):
+        """Test a METRICS connection receives the Prometheus text."""
+        async def scrape():
+            service = HLIService()
+            server = await service.start(port=0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b'METRICS\n')
+            text = await asyncio.wait_for(reader.read(), 5)
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return text
+
+        metrics.enable()
+        try:
+            compute(self.lines)
+            text = asyncio.run(scrape())
+        finally:
+            metrics.disable()
+            metrics.METRICS.reset()
+        assert b'labwelfare_rejected_total{reason="negative"} 1\n' in text
@@ -0,0 +1,134 @@
+"""
+Tests for `shared` module.
+"""
+import multiprocessing
+
+import numpy as np
+import pytest
+from labwelfare import registry
+from labwelfare.shared import SharedState
+
+
+def _reader(name, queue):
+    """Read from another process until the writer is done."""
+    state = SharedState.attach(name)
+    torn = 0
+    reads = 0
+    while True:
+        snapshot = state.read(['p1', 'p7'])
+        reads += 1
+        # the writer keeps every column of a pen equal.
+        torn += int((snapshot.hli != snapshot.timestamp).any() or
+                    (snapshot.ahl != snapshot.timestamp).any())
+        if snapshot.timestamp[0] == -1:
+            break
+    state.close()
+    queue.put((reads, torn))
+
+
+class TestSharedState(object):
+
+    def setup_method(self, method):
+        # writer state of ten pens
+        self.pens = ['p{}'.format(i) for i in range(10)]
+        self.state = SharedState.create(self.pens, np.arange(80, 90))
+
+    def teardown_method(self, method):
+        self.state.close()
+        self.state.unlink()
+
+    def test_create(self):
+        """Test a new state holds the pens and thresholds."""
+        assert len(self.state) == 10
+        assert self.state.pens().tolist() == sorted(self.pens)
+        snapshot = self.state.read(['p3', 'p0'])
+        assert snapshot.threshold.tolist() == [83, 80]
+        assert np.isnan(snapshot.hli).all()
+        assert snapshot.indicator.tolist() == [0, 0]
+
+    def test_publish_attach(self):
+        """Test readers see the published values without copies."""
+        self.state.publish(['p2', 'p5', 'p2'], [10, 20, 30],
+                           [80.0, 90.0, 95.0], [3, 4, 4], [0, 1, 2])
+        reader = SharedState.attach(self.state.name)
+        snapshot = reader.read(['p2', 'p5'])
+        assert snapshot.pen.tolist() == ['p2', 'p5']
+        assert snapshot.timestamp.tolist() == [30, 20]
+        assert snapshot.hli.tolist() == [95.0, 90.0]
+        assert snapshot.ahl.tolist() == [2, 1]
+        view = reader.view('hli')
+        assert not view.flags.writeable
+        assert not view.flags.owndata
+        self.state.publish('p2', 40, 70.0, 3)
+        assert view[reader.index(['p2'])[0]] == 70.0
+        assert reader.read(['p2']).ahl.tolist() == [2]
+        del view
+        reader.close()
+
+    def test_reader_cannot_write(self):
+        """Test only the writer updates the state."""
+        reader = SharedState.attach(self.state.name)
+        with pytest.raises(ValueError):
+            reader.publish(['p1'], 1, 80.0, 3)
+        with pytest.raises(ValueError):
+            reader.view('hli')[0] = 1.0
+        reader.close()
+
+    def test_unknown_pen(self):
+        """Test unknown pens are rejected."""
+        with pytest.raises(KeyError):
+            self.state.read(['nope'])
+        with pytest.raises(KeyError):
+            self.state.publish(['nope'], 1, 80.0, 3)
+
+    def test_invalid_create(self):
+        """Test repeated and too long pen names are rejected."""
+        with pytest.raises(ValueError):
+            SharedState.create(['a', 'a'])
+        with pytest.raises(ValueError):
+            SharedState.create(['a' * 40])
+
+    def test_locked_read(self):
+        """Test reads wait for the writer to finish."""
+        reader = SharedState.attach(self.state.name)
+        self.state._header[1] += 1
+        assert self.state.seq % 2
+        with pytest.raises(TimeoutError):
+            reader.read(retries=10)
+        self.state._header[1] += 1
+        assert len(reader.read().pen) == 10
+        reader.close()
+
+    def test_set_thresholds(self):
+        """Test thresholds are replaced for some or every pen."""
+        self.state.set_thresholds([90], ['p1'])
+        assert self.state.read(['p1']).threshold.tolist() == [90]
+        self.state.set_thresholds(86)
+        assert (self.state.read().threshold == 86).all()
+
+    def test_from_registry(self):
+        """Test a state built from a threshold registry."""
+        reg = registry.ThresholdRegistry()
+        reg.register('a', 'bos_indicus_50')
+        reg.register('b')
+        with SharedState.from_registry(reg) as state:
+            assert state.read().threshold.tolist() == [92, 86]
+
+    def test_concurrent_reads(self):
+        """Test readers in other processes never see torn updates."""
+        ctx = multiprocessing.get_context('fork')
+        queue = ctx.Queue()
+        # pens start with NaN, equal columns from the first read on.
+        self.state.publish(['p1', 'p7'], 0, 0.0, 3, 0.0)
+        readers = [ctx.Process(target=_reader, args=(self.state.name, queue))
+                   for _ in range(2)]
+        for process in readers:
+            process.start()
+        for i in range(1, 5000):
+            self.state.publish(['p1', 'p7'], i, float(i), 3, float(i))
+        self.state.publish(['p1', 'p7'], -1, -1.0, 0, -1.0)
+        results = [queue.get(timeout=30) for _ in readers]
+        for process in readers:
+            process.join(timeout=30)
+        assert all(torn == 0 for _, torn in results)
+        assert all(reads > 0 for reads, _ in results)